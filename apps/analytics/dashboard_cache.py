@@ -0,0 +1,103 @@
+"""
+Host dashboard cache.
+
+The range-dependent part (stats, charts) and the today cards are cached
+separately per (host, range, local date), with a short TTL for the today
+cards. Keys carry a per-host version bumped on reservation and like writes
+and whenever the host's rollups are rewritten, so changes show up at once.
+Computation is single-flight: one request computes an entry while
+concurrent requests for the same key wait for it instead of stampeding.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import services
+
+WINDOW_TTL = 60 * 15
+TODAY_TTL = 60
+
+# a computation holding the lock longer than this is presumed dead
+LOCK_TTL = 30
+# how long a waiting request polls before computing itself
+WAIT_SECONDS = 5
+POLL_INTERVAL = 0.05
+
+
+# ----------------------------
+# Keys / invalidation
+# ----------------------------
+def _version_key(host_pkid):
+    return f"host_dashboard:version:{host_pkid}"
+
+
+def _host_version(host_pkid):
+    version = cache.get(_version_key(host_pkid))
+    if version is None:
+        version = time.time_ns()
+        cache.add(_version_key(host_pkid), version, None)
+    return version
+
+
+def invalidate_host(host_pkid):
+    cache.set(_version_key(host_pkid), time.time_ns(), None)
+
+
+def window_key(host_pkid, range, day):
+    return f"host_dashboard:window:{host_pkid}:{_host_version(host_pkid)}:{range}:{day.isoformat()}"
+
+
+def today_key(host_pkid, day):
+    return f"host_dashboard:today:{host_pkid}:{_host_version(host_pkid)}:{day.isoformat()}"
+
+
+# ----------------------------
+# Single flight
+# ----------------------------
+def single_flight(key, ttl, compute):
+    """
+    cache.get(key), or compute and store it with only one caller computing
+    at a time across processes.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, LOCK_TTL):
+        try:
+            value = compute()
+            cache.set(key, value, ttl)
+            return value
+        finally:
+            cache.delete(lock)
+
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    # the computing request is slow or died; don't fail this one
+    return compute()
+
+
+# ----------------------------
+# Public API
+# ----------------------------
+def get_cached_dashboard(user, range):
+    day = timezone.localdate()
+
+    window = single_flight(
+        window_key(user.pkid, range, day),
+        WINDOW_TTL,
+        lambda: services.get_host_window(user, range),
+    )
+    today = single_flight(
+        today_key(user.pkid, day),
+        TODAY_TTL,
+        lambda: services.get_host_today(user, window["stats"]["active_properties"]),
+    )
+    return services.assemble_dashboard(window, today)
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.services import (
+    _compute_period_stats,
+    _compute_windows_stats,
+    get_date_range,
+    get_previous_date_range,
+)
+from apps.properties.models import Property, PropertyStatus
+
+User = get_user_model()
+
+FIELDS = ["total_income", "occupied_nights", "adr", "occupancy_rate", "revpar"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the SQL period stats (_compute_windows_stats) against the Python "
+        "reference (_compute_period_stats) for every host and dashboard range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", help="email of one host; all hosts when omitted")
+
+    def handle(self, *args, **options):
+        hosts = User.objects.filter(properties__isnull=False).distinct()
+        if options["host"]:
+            hosts = hosts.filter(email=options["host"])
+
+        checked, mismatches = 0, []
+        for host in hosts.iterator():
+            active = Property.objects.filter(user=host, status=PropertyStatus.ACTIVE).count()
+
+            for range in ["week", "month", "year"]:
+                start, end = get_date_range(range)
+                windows = [(start, end), get_previous_date_range(start, end)]
+                sql = _compute_windows_stats(host, windows, active)
+
+                for (window_start, window_end), from_sql in zip(windows, sql):
+                    from_python = _compute_period_stats(host, window_start, window_end, active)
+                    checked += 1
+                    for field in FIELDS:
+                        a = Decimal(getattr(from_python, field)).quantize(Decimal("0.01"))
+                        b = Decimal(getattr(from_sql, field)).quantize(Decimal("0.01"))
+                        if a != b:
+                            mismatches.append(f"{host.email} {window_start}..{window_end} {field}: python={a} sql={b}")
+
+        for line in mismatches:
+            self.stderr.write(line)
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} mismatches in {checked} windows")
+        self.stdout.write(self.style.SUCCESS(f"{checked} windows match"))
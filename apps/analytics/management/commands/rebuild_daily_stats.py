@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.analytics.rollups import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the host dashboard daily rollups over a date range. "
+        "Safe to re-run; use it to backfill after deploying."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="defaults to Jan 1 of last year")
+        parser.add_argument("--end", type=date.fromisoformat, help="defaults to a year from today")
+        parser.add_argument("--chunk-days", type=int, default=7)
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options["start"] or date(today.year - 1, 1, 1)
+        end = options["end"] or today + timedelta(days=365)
+        if end < start:
+            raise CommandError("--end is before --start")
+
+        written = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options["chunk_days"] - 1), end)
+            written += refresh_daily_stats(chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(f"Wrote {written} daily stats rows for {start} to {end}")
+        if not settings.HOST_DASHBOARD_USE_ROLLUPS:
+            self.stdout.write("Set HOST_DASHBOARD_USE_ROLLUPS=True to serve the host dashboard from them.")
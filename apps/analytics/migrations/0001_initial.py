@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:45
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('properties', '0017_property_view_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('occupied_nights', models.PositiveIntegerField(default=0)),
+                ('income', models.DecimalField(decimal_places=6, default=Decimal('0'), max_digits=16)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_daily_stats', to=settings.AUTH_USER_MODEL)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['host', 'date'], name='analytics_p_host_id_90e353_idx')],
+                'unique_together': {('property', 'date')},
+            },
+        ),
+    ]
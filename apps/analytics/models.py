@@ -1,3 +1,39 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.db import models
 
-# Create your models here.
+from apps.properties.models import Property
+
+User = get_user_model()
+
+
+class PropertyDailyStats(models.Model):
+    """
+    One row per property per local date with activity, maintained by
+    apps.analytics.rollups. The host dashboard sums these instead of
+    scanning reservations, views and likes.
+    """
+    property = models.ForeignKey(Property, related_name="daily_stats", on_delete=models.CASCADE)
+    # denormalized property.user, the dashboard filters on it
+    host = models.ForeignKey(User, related_name="property_daily_stats", on_delete=models.CASCADE)
+    date = models.DateField()
+
+    # nights of APPROVED/ONGOING/COMPLETED stays falling on this date
+    occupied_nights = models.PositiveIntegerField(default=0)
+    # host_pay of those stays spread evenly over their nights
+    income = models.DecimalField(max_digits=16, decimal_places=6, default=Decimal("0"))
+    # host_pay of COMPLETED stays checking out on this date
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    checkins = models.PositiveIntegerField(default=0)
+    checkouts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("property", "date")
+        indexes = [
+            models.Index(fields=["host", "date"]),
+        ]
@@ -0,0 +1,209 @@
+"""
+Per-property daily rollups (PropertyDailyStats) for the host dashboard.
+
+refresh_daily_stats recomputes the rows of some (or all) properties over a
+date range from the raw tables and upserts them, so a refresh is
+idempotent and any range can be rebuilt. Occupied nights and income come
+from the BlockedNight index; the rest are grouped counts.
+
+Rows are kept fresh by:
+- reservation and like signals, for the dates a change touches
+- refresh_recent_daily_stats_task, for today and yesterday, which picks up
+  buffered views and set-based reservation status updates
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.properties.models import (
+    BlockedNight,
+    Property,
+    PropertyLike,
+    PropertyView,
+    Reservation,
+    ReservationStatus,
+)
+
+from .dashboard_cache import invalidate_host
+from .models import PropertyDailyStats
+from .services import OCCUPANCY_STATUSES, AsDecimal
+
+ROLLUP_FIELDS = [
+    "occupied_nights",
+    "income",
+    "revenue",
+    "views",
+    "likes",
+    "bookings",
+    "checkins",
+    "checkouts",
+]
+
+WRITE_BATCH_SIZE = 1000
+
+
+def _day_bounds(start, end):
+    # [start 00:00, end+1 00:00) local time, so created_at indexes are usable
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def _sources(start, end):
+    """
+    (queryset, day expression, aggregates) for every rollup column.
+    """
+    created_range = _day_bounds(start, end)
+
+    return [
+        (
+            BlockedNight.objects.filter(
+                date__range=(start, end),
+                reservation__status__in=OCCUPANCY_STATUSES,
+                reservation__number_of_nights__gt=0,
+            ),
+            F("date"),
+            {
+                "occupied_nights": Count("id"),
+                "income": Sum(
+                    ExpressionWrapper(
+                        AsDecimal("reservation__host_pay") / F("reservation__number_of_nights"),
+                        output_field=DecimalField(max_digits=16, decimal_places=6),
+                    )
+                ),
+            },
+        ),
+        (
+            PropertyView.objects.filter(created_at__range=created_range),
+            TruncDate("created_at"),
+            {"views": Count("pkid")},
+        ),
+        (
+            PropertyLike.objects.filter(created_at__range=created_range),
+            TruncDate("created_at"),
+            {"likes": Count("pkid")},
+        ),
+        (
+            Reservation.objects.filter(created_at__range=created_range),
+            TruncDate("created_at"),
+            {"bookings": Count("pkid")},
+        ),
+        (
+            Reservation.objects.filter(start_date__range=(start, end), status__in=OCCUPANCY_STATUSES),
+            F("start_date"),
+            {"checkins": Count("pkid")},
+        ),
+        (
+            Reservation.objects.filter(end_date__range=(start, end), status__in=OCCUPANCY_STATUSES),
+            F("end_date"),
+            {
+                "checkouts": Count("pkid"),
+                "revenue": Sum("host_pay", filter=Q(status=ReservationStatus.COMPLETED)),
+            },
+        ),
+    ]
+
+
+def compute_daily_stats(start, end, property_pkids=None):
+    """
+    {(property pkid, date): {column: value}} for days with any activity.
+    """
+    rows = defaultdict(dict)
+
+    for queryset, day, aggregates in _sources(start, end):
+        if property_pkids is not None:
+            queryset = queryset.filter(property_id__in=property_pkids)
+
+        grouped = (
+            queryset.annotate(day=day)
+            .values("property_id", "day")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for row in grouped:
+            # __range on the day bounds can include a row's neighbour day
+            # under DST shifts; keep only days inside the window
+            if start <= row["day"] <= end:
+                rows[(row["property_id"], row["day"])].update(
+                    {name: row[name] or 0 for name in aggregates}
+                )
+
+    return rows
+
+
+def _as_stored(name, value):
+    # computed sums carry more places than the column keeps
+    field = PropertyDailyStats._meta.get_field(name)
+    if isinstance(field, DecimalField):
+        return Decimal(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+
+def refresh_daily_stats(start, end, property_pkids=None):
+    """
+    Recompute and upsert the rollups of [start, end] (inclusive), for the
+    given properties or all of them. Only rows whose values changed are
+    written, and only their hosts' dashboard caches are invalidated.
+    Returns the number of rows written.
+    """
+    rows = compute_daily_stats(start, end, property_pkids)
+
+    hosts = dict(
+        Property.objects.filter(pkid__in={pkid for pkid, _ in rows}).values_list("pkid", "user_id")
+    )
+    computed = {
+        key: tuple(_as_stored(name, values.get(name, 0)) for name in ROLLUP_FIELDS)
+        for key, values in rows.items()
+        if key[0] in hosts
+    }
+
+    with transaction.atomic():
+        existing = PropertyDailyStats.objects.filter(date__range=(start, end))
+        if property_pkids is not None:
+            existing = existing.filter(property_id__in=property_pkids)
+
+        stored = {}
+        stale, changed_hosts = [], set()
+        for id, pkid, day, host_pkid, *values in existing.values_list(
+            "id", "property_id", "date", "host_id", *ROLLUP_FIELDS
+        ):
+            if (pkid, day) in computed:
+                stored[(pkid, day)] = tuple(values)
+            else:
+                # days that no longer have any activity
+                stale.append(id)
+                changed_hosts.add(host_pkid)
+        if stale:
+            PropertyDailyStats.objects.filter(id__in=stale).delete()
+
+        stats = [
+            PropertyDailyStats(
+                property_id=pkid,
+                host_id=hosts[pkid],
+                date=day,
+                **dict(zip(ROLLUP_FIELDS, values)),
+            )
+            for (pkid, day), values in computed.items()
+            if stored.get((pkid, day)) != values
+        ]
+        PropertyDailyStats.objects.bulk_create(
+            stats,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["property", "date"],
+            update_fields=ROLLUP_FIELDS,
+        )
+        changed_hosts.update(stat.host_id for stat in stats)
+
+    # covers buffered views, which have no signals of their own; the
+    # periodic refresh mostly finds nothing changed and leaves caches alone
+    for host_pkid in changed_hosts:
+        transaction.on_commit(lambda host_pkid=host_pkid: invalidate_host(host_pkid))
+
+    return len(stats)
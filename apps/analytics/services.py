@@ -4,9 +4,10 @@ from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.db.models import Count
-from django.db.models import Sum
-from django.db.models.functions import TruncDate, Coalesce
+from django.conf import settings
+from django.db.models import Count, Q, F, Func, Value
+from django.db.models import Sum, DateField, DecimalField, IntegerField, ExpressionWrapper
+from django.db.models.functions import Cast, TruncDate, Coalesce, Greatest, Least
 from django.utils import timezone
 
 from apps.properties.models import (
@@ -18,6 +19,8 @@ from apps.properties.models import (
     PropertyStatus,
 )
 
+from .models import PropertyDailyStats
+
 # statuses that can "occupy" a night
 OCCUPANCY_STATUSES = [
     ReservationStatus.APPROVED,
@@ -102,9 +105,90 @@ class PeriodStats:
     revpar: Decimal
 
 
+class AsDecimal(Cast):
+    """
+    Cast to numeric so dividing by an integer column keeps the cents.
+    SQLite has no decimal type (whole amounts are stored as integers and
+    would divide as integers), so there it casts to REAL.
+    """
+    def __init__(self, expression, max_digits=12, decimal_places=2):
+        super().__init__(expression, DecimalField(max_digits=max_digits, decimal_places=decimal_places))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="CAST(%(expressions)s AS REAL)", **extra_context)
+
+
+class _DaysBetween(Func):
+    """
+    Whole days from the second date to the first.
+    """
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+def _overlap_nights_expr(start: date, end: date):
+    """
+    _overlap_nights as SQL: LEAST(end_date, window end) - GREATEST(start_date, start), floored at 0.
+    """
+    window_start = Value(start, output_field=DateField())
+    window_end = Value(_window_end_exclusive(end), output_field=DateField())
+    return Greatest(
+        _DaysBetween(Least("end_date", window_end), Greatest("start_date", window_start)),
+        Value(0),
+    )
+
+
+def _compute_windows_stats(user, windows, active_properties: int) -> list[PeriodStats]:
+    """
+    _compute_period_stats for several (start, end) windows in one aggregate
+    query, with night clipping and income allocation done in the database.
+    """
+    aggregates = {}
+    for i, (start, end) in enumerate(windows):
+        nights = _overlap_nights_expr(start, end)
+        overlaps = Q(start_date__lt=_window_end_exclusive(end), end_date__gt=start)
+
+        aggregates[f"nights_{i}"] = Coalesce(Sum(nights, filter=overlaps), Value(0))
+        aggregates[f"income_{i}"] = Coalesce(
+            Sum(
+                ExpressionWrapper(
+                    AsDecimal("host_pay") * nights / F("number_of_nights"),
+                    output_field=DecimalField(max_digits=20, decimal_places=6),
+                ),
+                filter=overlaps & Q(status__in=INCOME_STATUSES, number_of_nights__gt=0),
+            ),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=20, decimal_places=6),
+        )
+
+    totals = Reservation.objects.filter(
+        property__user=user,
+        status__in=OCCUPANCY_STATUSES,
+        start_date__lt=_window_end_exclusive(max(end for _, end in windows)),
+        end_date__gt=min(start for start, _ in windows),
+    ).aggregate(**aggregates)
+
+    return [
+        _period_stats(Decimal(totals[f"income_{i}"]), int(totals[f"nights_{i}"]), start, end, active_properties)
+        for i, (start, end) in enumerate(windows)
+    ]
+
+
 def _compute_period_stats(user, start: date, end: date, active_properties: int) -> PeriodStats:
     """
     Income/ADR/Occ/RevPAR computed using overlap nights inside the window.
+    Reference implementation of _compute_windows_stats, see
+    manage.py check_period_stats.
 
     host_pay is allocated proportionally:
       revenue_in_window = host_pay * (overlap_nights / number_of_nights)
@@ -132,6 +216,10 @@ def _compute_period_stats(user, start: date, end: date, active_properties: int)
                 per_night = Decimal(r.host_pay or 0) / Decimal(nights_total)
                 income += per_night * Decimal(on)
 
+    return _period_stats(income, occupied_nights, start, end, active_properties)
+
+
+def _period_stats(income, occupied_nights, start: date, end: date, active_properties: int) -> PeriodStats:
     days_in_range = (end - start).days + 1
     available_nights = (active_properties * days_in_range) if active_properties and days_in_range > 0 else 0
 
@@ -156,17 +244,68 @@ def _compute_period_stats(user, start: date, end: date, active_properties: int)
 
 
 # ----------------------------
-# Public API
+# Window figures
 # ----------------------------
-def get_host_dashboard(user, range: str):
-    start, end = get_date_range(range)
-    prev_start, prev_end = get_previous_date_range(start, end)
+@dataclass
+class WindowFigures:
+    cur: PeriodStats
+    prev: PeriodStats
+    views: int
+    likes: int
+    reservations: int
+    bookings_chart: list
+    revenue_chart: list
 
-    properties = Property.objects.filter(user=user, status=PropertyStatus.ACTIVE)
-    active_properties = properties.count()
 
-    cur = _compute_period_stats(user, start, end, active_properties)
-    prev = _compute_period_stats(user, prev_start, prev_end, active_properties)
+def _figures_from_rollups(user, start, end, prev_start, prev_end, active_properties) -> WindowFigures:
+    """
+    Both windows from PropertyDailyStats: one grouped query, one row per day.
+    """
+    days = (
+        PropertyDailyStats.objects.filter(host=user, date__range=(prev_start, end))
+        .values("date")
+        .annotate(
+            occupied_nights=Sum("occupied_nights"),
+            income=Sum("income"),
+            revenue=Sum("revenue"),
+            views=Sum("views"),
+            likes=Sum("likes"),
+            bookings=Sum("bookings"),
+        )
+        .order_by("date")
+    )
+
+    totals = {
+        "cur": {"occupied_nights": 0, "income": Decimal("0.00"), "views": 0, "likes": 0, "bookings": 0},
+        "prev": {"occupied_nights": 0, "income": Decimal("0.00"), "views": 0, "likes": 0, "bookings": 0},
+    }
+    bookings_chart, revenue_chart = [], []
+
+    for day in days:
+        window = totals["cur" if day["date"] >= start else "prev"]
+        for name in window:
+            window[name] += day[name] or 0
+
+        if day["date"] >= start:
+            if day["bookings"]:
+                bookings_chart.append({"date": day["date"], "count": day["bookings"]})
+            if day["revenue"]:
+                revenue_chart.append({"date": day["date"], "revenue": day["revenue"]})
+
+    cur, prev = totals["cur"], totals["prev"]
+    return WindowFigures(
+        cur=_period_stats(Decimal(cur["income"]), cur["occupied_nights"], start, end, active_properties),
+        prev=_period_stats(Decimal(prev["income"]), prev["occupied_nights"], prev_start, prev_end, active_properties),
+        views=cur["views"],
+        likes=cur["likes"],
+        reservations=cur["bookings"],
+        bookings_chart=bookings_chart,
+        revenue_chart=revenue_chart,
+    )
+
+
+def _figures_from_raw(user, start, end, prev_start, prev_end, active_properties) -> WindowFigures:
+    cur, prev = _compute_windows_stats(user, [(start, end), (prev_start, prev_end)], active_properties)
 
     total_views = PropertyView.objects.filter(
         property__user=user,
@@ -183,35 +322,6 @@ def get_host_dashboard(user, range: str):
         created_at__date__range=(start, end),
     ).count()
 
-    # ----- Today cards -----
-    today = timezone.localdate()
-
-    checkins = Reservation.objects.filter(
-        property__user=user,
-        start_date=today,
-        status__in=[ReservationStatus.APPROVED, ReservationStatus.ONGOING],
-    ).count()
-
-    checkouts = Reservation.objects.filter(
-        property__user=user,
-        end_date=today,
-        status__in=[ReservationStatus.ONGOING, ReservationStatus.COMPLETED],
-    ).count()
-
-    ongoing_stays = Reservation.objects.filter(
-        property__user=user,
-        start_date__lte=today,
-        end_date__gt=today,
-        status=ReservationStatus.ONGOING,
-    ).count()
-
-    occupancy_today = (
-        (Decimal(ongoing_stays) / Decimal(active_properties)) * Decimal("100")
-        if active_properties
-        else Decimal("0.00")
-    )
-
-    # ----- Charts -----
     bookings_chart = (
         Reservation.objects.filter(
             property__user=user,
@@ -231,12 +341,45 @@ def get_host_dashboard(user, range: str):
             end_date__gte=start,
             end_date__lt=_window_end_exclusive(end),
         )
-        .annotate(date=TruncDate("end_date"))
+        .annotate(date=F("end_date"))
         .values("date")
         .annotate(revenue=Coalesce(Sum("host_pay"), Decimal("0.00")))
         .order_by("date")
     )
 
+    return WindowFigures(
+        cur=cur,
+        prev=prev,
+        views=total_views,
+        likes=total_likes,
+        reservations=reservations_created,
+        bookings_chart=list(bookings_chart),
+        revenue_chart=list(revenue_chart),
+    )
+
+
+# ----------------------------
+# Public API
+# ----------------------------
+def get_host_window(user, range: str):
+    """
+    Range-dependent part of the dashboard: meta, stats and charts.
+    """
+    start, end = get_date_range(range)
+    prev_start, prev_end = get_previous_date_range(start, end)
+
+    properties = Property.objects.filter(user=user, status=PropertyStatus.ACTIVE)
+    active_properties = properties.count()
+
+    # rollups are maintained by apps.analytics.rollups but only cover the
+    # past once backfilled (manage.py rebuild_daily_stats); until then the
+    # raw path is used, see HOST_DASHBOARD_USE_ROLLUPS
+    if settings.HOST_DASHBOARD_USE_ROLLUPS:
+        figures = _figures_from_rollups(user, start, end, prev_start, prev_end, active_properties)
+    else:
+        figures = _figures_from_raw(user, start, end, prev_start, prev_end, active_properties)
+    cur, prev = figures.cur, figures.prev
+
     return {
         "meta": {
             "range": range,
@@ -245,12 +388,6 @@ def get_host_dashboard(user, range: str):
             "prev_start": prev_start,
             "prev_end": prev_end,
         },
-        "today": {
-            "checkins": checkins,
-            "checkouts": checkouts,
-            "ongoing_stays": ongoing_stays,
-            "occupancy_rate_today": float(occupancy_today.quantize(Decimal("0.01"))),
-        },
         "stats": {
             "total_income": cur.total_income.quantize(Decimal("0.01")),
             "total_income_change_pct": pct_change(cur.total_income, prev.total_income).quantize(Decimal("0.01")),
@@ -264,14 +401,69 @@ def get_host_dashboard(user, range: str):
             "revpar": cur.revpar.quantize(Decimal("0.01")),
             "revpar_change_pct": pct_change(cur.revpar, prev.revpar).quantize(Decimal("0.01")),
 
-            "views": total_views,
-            "likes": total_likes,
-            "reservations": reservations_created,
+            "views": figures.views,
+            "likes": figures.likes,
+            "reservations": figures.reservations,
             "active_properties": active_properties,
             "occupancy_nights": cur.occupied_nights,
         },
         "charts": {
-            "bookings": list(bookings_chart),
-            "revenue": list(revenue_chart),
+            "bookings": figures.bookings_chart,
+            "revenue": figures.revenue_chart,
         },
     }
+
+
+def get_host_today(user, active_properties: int):
+    """
+    Today cards, read live from reservations in one query.
+    """
+    today = timezone.localdate()
+
+    today_counts = Reservation.objects.filter(
+        property__user=user,
+        start_date__lte=today,
+        end_date__gte=today,
+    ).aggregate(
+        checkins=Count(
+            "pkid",
+            filter=Q(start_date=today, status__in=[ReservationStatus.APPROVED, ReservationStatus.ONGOING]),
+        ),
+        checkouts=Count(
+            "pkid",
+            filter=Q(end_date=today, status__in=[ReservationStatus.ONGOING, ReservationStatus.COMPLETED]),
+        ),
+        ongoing_stays=Count(
+            "pkid",
+            filter=Q(end_date__gt=today, status=ReservationStatus.ONGOING),
+        ),
+    )
+    ongoing_stays = today_counts["ongoing_stays"]
+
+    occupancy_today = (
+        (Decimal(ongoing_stays) / Decimal(active_properties)) * Decimal("100")
+        if active_properties
+        else Decimal("0.00")
+    )
+
+    return {
+        "checkins": today_counts["checkins"],
+        "checkouts": today_counts["checkouts"],
+        "ongoing_stays": ongoing_stays,
+        "occupancy_rate_today": float(occupancy_today.quantize(Decimal("0.01"))),
+    }
+
+
+def assemble_dashboard(window, today):
+    return {
+        "meta": window["meta"],
+        "today": today,
+        "stats": window["stats"],
+        "charts": window["charts"],
+    }
+
+
+def get_host_dashboard(user, range: str):
+    window = get_host_window(user, range)
+    today = get_host_today(user, window["stats"]["active_properties"])
+    return assemble_dashboard(window, today)
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.properties.models import Property, Reservation, PropertyLike
+
+from .dashboard_cache import invalidate_host
+from .tasks import refresh_property_daily_stats_task
+
+
+def refresh_property_days(property_pkid, start, end):
+    """
+    Queue a rollup refresh of [start, end] for one property after commit.
+    """
+    transaction.on_commit(
+        lambda: refresh_property_daily_stats_task.delay(property_pkid, start.isoformat(), end.isoformat())
+    )
+
+
+def invalidate_property_host(instance):
+    """
+    Drop the cached dashboard of the host owning instance.property.
+    """
+    if instance._meta.get_field("property").is_cached(instance):
+        host_pkid = instance.property.user_id
+    else:
+        # also covers cascade deletes, where the property is already gone
+        host_pkid = Property.objects.filter(pkid=instance.property_id).values_list("user_id", flat=True).first()
+
+    if host_pkid is not None:
+        transaction.on_commit(lambda: invalidate_host(host_pkid))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_on_property(sender, instance: Property, **kwargs):
+    # active property count
+    transaction.on_commit(lambda: invalidate_host(instance.user_id))
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def refresh_on_reservation(sender, instance: Reservation, **kwargs):
+    invalidate_property_host(instance)
+
+    # booking day plus every night of the stay
+    created = timezone.localdate(instance.created_at)
+    refresh_property_days(
+        instance.property_id,
+        min(created, instance.start_date),
+        max(created, instance.end_date),
+    )
+
+@receiver(post_save, sender=PropertyLike)
+@receiver(post_delete, sender=PropertyLike)
+def refresh_on_like(sender, instance: PropertyLike, **kwargs):
+    invalidate_property_host(instance)
+    created = timezone.localdate(instance.created_at)
+    refresh_property_days(instance.property_id, created, created)
@@ -0,0 +1,19 @@
+from datetime import date, timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .rollups import refresh_daily_stats
+
+
+@shared_task
+def refresh_property_daily_stats_task(property_pkid, start, end):
+    written = refresh_daily_stats(date.fromisoformat(start), date.fromisoformat(end), [property_pkid])
+    return f"Refreshed {written} daily stats rows for property {property_pkid}"
+
+
+@shared_task
+def refresh_recent_daily_stats_task():
+    today = timezone.localdate()
+    written = refresh_daily_stats(today - timedelta(days=1), today)
+    return f"Refreshed {written} daily stats rows"
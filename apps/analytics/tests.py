@@ -1,3 +1,204 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.properties.models import BlockedNight, PropertyView, Reservation, ReservationStatus
+from apps.properties.tasks import update_reservations_status_task
+from apps.properties.tests import NO_SILK, login, make_property, make_user
+
+from . import dashboard_cache
+from .models import PropertyDailyStats
+from .rollups import refresh_daily_stats
+from .services import (
+    _compute_period_stats,
+    _compute_windows_stats,
+    get_date_range,
+    get_host_window,
+    get_previous_date_range,
+)
+
+
+def make_reservation(property, guest, start, nights, host_pay, status=ReservationStatus.APPROVED):
+    return Reservation.objects.create(
+        user=guest,
+        property=property,
+        status=status,
+        start_date=start,
+        end_date=start + timedelta(days=nights),
+        number_of_nights=nights,
+        guests=1,
+        host_pay=host_pay,
+    )
+
+
+class DailyStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.property = make_property(cls.host)
+
+    def test_income_keeps_cents(self):
+        # 100 / 3 per night: integer division would give 33 * 3 = 99
+        start = date(2026, 5, 1)
+        make_reservation(self.property, self.guest, start, 3, Decimal("100.00"))
+        self.assertEqual(BlockedNight.objects.count(), 3)
+
+        refresh_daily_stats(start, start + timedelta(days=3))
+
+        stats = PropertyDailyStats.objects.filter(property=self.property)
+        self.assertEqual(stats.filter(occupied_nights=1).count(), 3)
+        income = stats.aggregate(total=Sum("income"))["total"]
+        self.assertEqual(income.quantize(Decimal("0.01")), Decimal("100.00"))
+
+    def test_rollups_match_raw_dashboard(self):
+        today = timezone.localdate()
+        for offset, nights, host_pay, status in (
+            (-40, 3, "100.00", ReservationStatus.COMPLETED),
+            (-10, 5, "1709.63", ReservationStatus.COMPLETED),
+            (-2, 4, "333.33", ReservationStatus.ONGOING),
+            (3, 7, "999.99", ReservationStatus.APPROVED),
+        ):
+            make_reservation(self.property, self.guest, today + timedelta(days=offset), nights, Decimal(host_pay), status)
+        refresh_daily_stats(today - timedelta(days=800), today + timedelta(days=400))
+
+        for range in ("week", "month", "year"):
+            with self.subTest(range=range):
+                with override_settings(HOST_DASHBOARD_USE_ROLLUPS=False):
+                    raw = get_host_window(self.host, range)["stats"]
+                with override_settings(HOST_DASHBOARD_USE_ROLLUPS=True):
+                    rollups = get_host_window(self.host, range)["stats"]
+                self.assertEqual(rollups, raw)
+
+
+class RefreshInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        guest = make_user("guest@example.com")
+        cls.hosts = [make_user(f"host{i}@example.com") for i in range(2)]
+        cls.properties = [make_property(host) for host in cls.hosts]
+        for property in cls.properties:
+            make_reservation(property, guest, timezone.localdate(), 2, Decimal("100.00"))
+
+    def refresh(self):
+        today = timezone.localdate()
+        versions = [dashboard_cache._host_version(host.pkid) for host in self.hosts]
+        with self.captureOnCommitCallbacks(execute=True):
+            written = refresh_daily_stats(today - timedelta(days=1), today + timedelta(days=2))
+        changed = [dashboard_cache._host_version(host.pkid) != v for host, v in zip(self.hosts, versions)]
+        return written, changed
+
+    def test_only_hosts_with_changed_rollups_are_invalidated(self):
+        self.refresh()
+
+        self.assertEqual(self.refresh(), (0, [False, False]))
+
+        # buffered views land without signals
+        PropertyView.objects.create(property=self.properties[1], ip_address="10.0.0.1")
+        self.assertEqual(self.refresh(), (1, [False, True]))
+
+        Reservation.objects.filter(property=self.properties[0]).delete()
+        written, changed = self.refresh()
+        self.assertEqual(changed, [True, False])
+        self.assertFalse(PropertyDailyStats.objects.filter(property=self.properties[0]).exists())
+
+
+class WindowsStatsTests(TestCase):
+    """
+    _compute_windows_stats (SQL) against _compute_period_stats (Python).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        guest = make_user("guest@example.com")
+        properties = [make_property(cls.host, title=f"Property {i}") for i in range(2)]
+        today = timezone.localdate()
+
+        # stays inside, across and around the dashboard windows; whole and
+        # fractional amounts that don't divide evenly by the nights
+        for i, (offset, nights, host_pay, status) in enumerate((
+            (-400, 10, "1708.00", ReservationStatus.COMPLETED),
+            (-35, 6, "1709.63", ReservationStatus.COMPLETED),
+            (-9, 3, "100.00", ReservationStatus.COMPLETED),
+            (-5, 7, "999.99", ReservationStatus.ONGOING),
+            (-1, 2, "250.00", ReservationStatus.ONGOING),
+            (4, 30, "4321.00", ReservationStatus.APPROVED),
+            (-20, 4, "500.00", ReservationStatus.CANCELLED),
+            (10, 3, "301.00", ReservationStatus.PENDING),
+        )):
+            make_reservation(properties[i % 2], guest, today + timedelta(days=offset), nights, Decimal(host_pay), status)
+
+        # and one straddling each edge of every window, so only part of its
+        # income falls inside (100.00 * 2 / 3 nights)
+        for name in ("week", "month", "year"):
+            for edge in get_date_range(name):
+                make_reservation(properties[0], guest, edge - timedelta(days=1), 3, Decimal("100.00"), ReservationStatus.COMPLETED)
+
+    def test_sql_matches_python(self):
+        for range in ("week", "month", "year"):
+            start, end = get_date_range(range)
+            windows = [(start, end), get_previous_date_range(start, end)]
+            sql = _compute_windows_stats(self.host, windows, 2)
+
+            for window, from_sql in zip(windows, sql):
+                from_python = _compute_period_stats(self.host, *window, 2)
+                for field in ("total_income", "occupied_nights", "adr", "occupancy_rate", "revpar"):
+                    with self.subTest(range=range, window=window, field=field):
+                        self.assertEqual(
+                            Decimal(getattr(from_sql, field)).quantize(Decimal("0.01")),
+                            Decimal(getattr(from_python, field)).quantize(Decimal("0.01")),
+                        )
+
+
+@NO_SILK
+class HostCalendarTests(TestCase):
+    url = "/api/v1/analytics/host-calendar/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        guest = make_user("guest@example.com")
+        property = make_property(cls.host)
+        cls.today = timezone.localdate()
+        cls.reservations = [
+            make_reservation(property, guest, cls.today + timedelta(days=offset), 2, Decimal("100.00"))
+            for offset in (-1, 3, 7)
+        ]
+        cls.params = {"start": cls.today - timedelta(days=5), "end": cls.today + timedelta(days=20)}
+
+    def setUp(self):
+        login(self.client, self.host)
+
+    def test_events_default_to_a_list(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e["id"] for e in response.json()], [str(r.id) for r in self.reservations])
+
+    def test_events_paginate_on_request(self):
+        first = self.client.get(self.url, {**self.params, "page_size": 2}).json()
+        self.assertEqual(len(first["results"]), 2)
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([e["id"] for e in first["results"] + second["results"]], [str(r.id) for r in self.reservations])
+
+    def test_etag_changes_on_status_transition(self):
+        etag = self.client.get(self.url, self.params)["ETag"]
+        self.assertEqual(self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # APPROVED -> ONGOING is a set-based update()
+        update_reservations_status_task()
+
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(ReservationStatus.ONGOING, [e["status"] for e in response.json()])
+
+    def test_property_filter(self):
+        other = make_property(self.host, title="Other")
+        response = self.client.get(self.url, {**self.params, "property_id": other.id})
+        self.assertEqual(response.json(), [])
+
+        response = self.client.get(self.url, {**self.params, "property_id": "abc", "view": "grid"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("property_id", response.json())
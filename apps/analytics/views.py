@@ -1,63 +1,169 @@
-from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from django.utils.dateparse import parse_date
-
-from .services import get_host_dashboard
-
-from apps.properties.models import Reservation
+import uuid
+from datetime import timedelta
 
+from django.db.models import Count, Max
 from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.properties.models import Reservation, ReservationStatus
+from apps.properties.models import Property, Reservation, ReservationStatus
+from apps.properties.pagination import KeysetPagination
+from apps.properties.response_cache import conditional_response, make_etag
+
+from .dashboard_cache import get_cached_dashboard
+
+CALENDAR_STATUSES = [ReservationStatus.APPROVED, ReservationStatus.ONGOING, ReservationStatus.COMPLETED]
+CALENDAR_MAX_DAYS = 366
+FREE = "FREE"
+
+# event field -> (model fields it needs, value)
+EVENT_FIELDS = {
+    "id": (["id"], lambda r: r.id),
+    "title": (["property__title"], lambda r: f"{r.property.title}"),
+    "start": (["start_date"], lambda r: r.start_date),
+    "end": (["end_date"], lambda r: r.end_date),
+    "status": (["status"], lambda r: r.status),
+    "property_id": (["property__id"], lambda r: r.property.id),
+    "guest": (["user__first_name", "user__last_name", "user__email"], lambda r: r.user.get_full_name()),
+    "guest_profile_picture": (
+        ["user__profile__profile_picture"],
+        lambda r: (
+            r.user.profile.profile_picture_url()
+            if hasattr(r.user, "profile") and r.user.profile
+            else None
+        ),
+    ),
+    "confirmation_code": (["confirmation_code"], lambda r: r.confirmation_code),
+}
+
+
+class CalendarPagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 500
+
+
+def run_length_encode(states):
+    """
+    ["FREE", "FREE", "APPROVED"] -> [["FREE", 2], ["APPROVED", 1]]
+    """
+    runs = []
+    for state in states:
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+    return runs
 
 
 class HostCalendarAPIView(APIView):
+    """
+    Reservations of the host's properties between `start` and `end`
+    (inclusive, at most CALENDAR_MAX_DAYS), optionally for one `property_id`.
+
+    ?view=events (default): events ordered by start date as a plain list;
+        passing `page_size` or `cursor` switches to cursor pages
+        ({next, previous, results}). `fields` selects a subset of
+        EVENT_FIELDS.
+    ?view=grid: one run-length encoded row of day states per property,
+        e.g. [["FREE", 3], ["APPROVED", 2]].
+
+    Both send an ETag and answer If-None-Match with 304.
+    """
     permission_classes = [IsAuthenticated]
+    pagination_class = CalendarPagination
 
     def get(self, request):
-        start = parse_date(request.query_params.get("start"))
-        end = parse_date(request.query_params.get("end"))
+        start = parse_date(request.query_params.get("start") or "")
+        end = parse_date(request.query_params.get("end") or "")
 
         if not start or not end:
             return Response(
                 {"detail": "start and end query params are required"},
                 status=400,
             )
+        if end < start:
+            raise ValidationError({"end": "end must not be before start."})
+        if (end - start).days + 1 > CALENDAR_MAX_DAYS:
+            raise ValidationError({"end": f"The range can span at most {CALENDAR_MAX_DAYS} days."})
 
-        reservations = (
-            Reservation.objects.filter(
-                property__user=request.user,
-                status__in=[ReservationStatus.APPROVED, ReservationStatus.ONGOING, ReservationStatus.COMPLETED],
-                start_date__lte=end,
-                end_date__gte=start,
-            )
-            .select_related("property", "user", "user__profile")
+        reservations = Reservation.objects.filter(
+            property__user=request.user,
+            status__in=CALENDAR_STATUSES,
+            start_date__lte=end,
+            end_date__gte=start,
         )
+        properties = Property.objects.filter(user=request.user)
 
-        return Response(
-            [
-                {
-                    "id": r.id,
-                    "title": f"{r.property.title}",
-                    "start": r.start_date,
-                    "end": r.end_date,
-                    "status": r.status,
-                    "property_id": r.property.id,
-                    "guest": r.user.get_full_name(),
-                    "guest_profile_picture": (
-                        r.user.profile.profile_picture_url()
-                        if hasattr(r.user, "profile") and r.user.profile
-                        else None
-                    ),
-                    "confirmation_code": r.confirmation_code,
-                }
-                for r in reservations
-            ]
-        )
+        property_id = request.query_params.get("property_id")
+        if property_id:
+            try:
+                property_id = uuid.UUID(property_id)
+            except ValueError:
+                raise ValidationError({"property_id": "Must be a valid UUID."})
+            reservations = reservations.filter(property__id=property_id)
+            properties = properties.filter(id=property_id)
+
+        # cheap fingerprint of everything the response is built from
+        fingerprint = reservations.aggregate(count=Count("pkid"), updated=Max("updated_at"))
+        fingerprint.update(properties.aggregate(properties=Count("pkid"), properties_updated=Max("updated_at")))
+        etag = make_etag(request.get_full_path(), fingerprint)
+        if etag in request.headers.get("If-None-Match", ""):
+            return conditional_response(request, None, etag)
+
+        if request.query_params.get("view") == "grid":
+            data = self.grid(properties, reservations, start, end)
+        else:
+            data = self.events(request, reservations)
+        return conditional_response(request, data, etag)
+
+    def grid(self, properties, reservations, start, end):
+        days = (end - start).days + 1
+        states = {pkid: [FREE] * days for pkid in properties.values_list("pkid", flat=True)}
+
+        # end_date is the checkout day, so nights run [start_date, end_date)
+        for property_pkid, res_start, res_end, status in reservations.values_list(
+            "property_id", "start_date", "end_date", "status"
+        ).iterator():
+            row = states.get(property_pkid)
+            if row is None:
+                continue
+            first = max((res_start - start).days, 0)
+            last = min((res_end - start).days, days)
+            row[first:last] = [status] * (last - first)
+
+        return {
+            "start": start,
+            "end": end,
+            "properties": [
+                {"property_id": id, "title": title, "runs": run_length_encode(states[pkid])}
+                for pkid, id, title in properties.order_by("pkid").values_list("pkid", "id", "title")
+            ],
+        }
+
+    def events(self, request, reservations):
+        requested = request.query_params.get("fields")
+        fields = [f for f in requested.split(",") if f in EVENT_FIELDS] if requested else list(EVENT_FIELDS)
+        if not fields:
+            raise ValidationError({"fields": f"Choose from {', '.join(EVENT_FIELDS)}."})
+
+        needed = {"pkid", "start_date"}.union(*(EVENT_FIELDS[f][0] for f in fields))
+        related = {name.rsplit("__", 1)[0] for name in needed if "__" in name}
+        queryset = reservations.select_related(*related).only(*needed).order_by("start_date")
+
+        def serialize(rows):
+            return [{f: EVENT_FIELDS[f][1](r) for f in fields} for r in rows]
+
+        # the range is already capped at CALENDAR_MAX_DAYS; pages are opt-in
+        # so existing clients keep getting a list
+        paginator = self.pagination_class()
+        paging = (paginator.page_size_query_param, paginator.cursor_query_param)
+        if not any(request.query_params.get(name) for name in paging):
+            return serialize(queryset.order_by("start_date", "pkid").iterator())
+
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(serialize(page)).data
 
 
 class HostDashboardAPIView(APIView):
@@ -68,4 +174,4 @@ class HostDashboardAPIView(APIView):
         if range not in ["week", "month", "year"]:
             range = "month"
 
-        return Response(get_host_dashboard(user=request.user, range=range))
+        return Response(get_cached_dashboard(request.user, range))
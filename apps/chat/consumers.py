@@ -1,18 +1,29 @@
 import json
+import uuid
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from apps.profiles.serializers import ProfileSerializer
 from .models import Conversation, Message
-from .serializers import MessageSerializer
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
+from .writer import get_writer
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
         self.room_group_name = f"chat_{self.room_name}"
+        self.user = self.scope["user"]
 
-        print("Joining group:", self.room_group_name)
+        # membership is checked once; messages are then attributed to
+        # self.user without touching the database
+        self.conversation_pkid = await self.get_conversation_pkid() if self.user.is_authenticated else None
+        if self.conversation_pkid is None:
+            await self.close()
+            return
+        self.sender = await self.get_sender()
 
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
@@ -22,44 +33,56 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         data = json.loads(text_data)
-
-        conversation_id = data.get("conversation_id")
-        sender_id = data.get("sender_id")
         text = data.get("text")
 
-        print(text)
-
-        if not text or not sender_id:
+        if not text:
             return
 
-        # Save message to database
-        message = await self.create_message(conversation_id, sender_id, text)
-
+        # broadcast first; the writer persists it with the next batch. The
+        # broadcast has the same shape and values as MessageSerializer, so
+        # clients can append it without fetching the thread again.
+        message = Message(
+            id=uuid.uuid4(),
+            conversation_id=self.conversation_pkid,
+            sender_id=self.user.pkid,
+            text=text,
+            created_at=timezone.now(),
+        )
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
                 "id": str(message.id),
-                "conversation_id": str(message.conversation.id),
-                "sender": {
-                    "id": str(message.sender.id),
-                    "username": message.sender.username,
-                },
-                "text": message.text,
-                "created_at": message.created_at.isoformat(),
+                "conversation_id": self.room_name,
+                "sender": self.sender,
+                "text": text,
+                "created_at": serializers.DateTimeField().to_representation(message.created_at),
             },
         )
+        await get_writer().submit(message)
 
     async def chat_message(self, event):
         await self.send(text_data=json.dumps(event))
 
     @database_sync_to_async
-    def create_message(self, conversation_id, sender_id, text):
-        conversation = Conversation.objects.get(id=conversation_id)
-        sender = User.objects.get(id=sender_id)
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=sender,
-            text=text,
-        )
-        return message
+    def get_conversation_pkid(self):
+        """
+        The room's conversation if the user is its guest or landlord.
+        """
+        try:
+            return (
+                Conversation.objects.filter(id=self.room_name)
+                .filter(Q(guest=self.user) | Q(landlord=self.user))
+                .values_list("pkid", flat=True)
+                .first()
+            )
+        except ValidationError:
+            # not a UUID
+            return None
+
+    @database_sync_to_async
+    def get_sender(self):
+        """
+        The user's profile as MessageSerializer renders a sender.
+        """
+        return dict(ProfileSerializer(self.user.profile).data)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+from channels.routing import URLRouter
+from rest_framework_simplejwt.tokens import AccessToken
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.chat.middleware import CookieJWTAuthMiddlewareStack
+from apps.chat.models import Conversation, Message
+from apps.chat.routing import websocket_urlpatterns
+from apps.chat.writer import get_writer
+from apps.properties.booking import book_stay
+from apps.properties.models import Property, PropertyStatus, Reservation
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {"capacity": 100_000},
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Push messages through ChatConsumer over the in-memory channel layer and "
+        "report messages/s and end-to-end latency (send -> broadcast received). "
+        "Creates throwaway users, a property and conversations and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=20)
+        parser.add_argument("--clients", type=int, default=2, help="connections per room")
+        parser.add_argument("--messages", type=int, default=100, help="messages sent per connection")
+        parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for a broadcast")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        host = User.objects.create_user(
+            email=f"bench-host-{tag}@example.com", password=None, first_name="Bench", last_name="Host"
+        )
+        property = Property.objects.create(
+            user=host,
+            title=f"Chat benchmark {tag}",
+            description="benchmark_chat",
+            location="Nowhere",
+            category="Test",
+            bedrooms=1,
+            beds=1,
+            bathrooms=1,
+            guests=1,
+            price_per_night=100,
+            status=PropertyStatus.ACTIVE,
+            is_instant_booking=True,
+        )
+        guests = []
+
+        try:
+            rooms = []
+            start = date.today() + timedelta(days=365)
+            for i in range(options["rooms"]):
+                guest = User.objects.create_user(
+                    email=f"bench-guest-{tag}-{i}@example.com", password=None, first_name="Bench", last_name="Guest"
+                )
+                guests.append(guest)
+                check_in = start + timedelta(days=i)
+                reservation = book_stay(guest, property.pkid, check_in, check_in + timedelta(days=1), guests=1)
+                conversation = Conversation.objects.get(reservation=reservation)
+                rooms.append((conversation, [guest, host]))
+
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+                sent, latencies, elapsed, write_lag = asyncio.run(self._run(rooms, options))
+
+            stored = Message.objects.filter(conversation__in=[c for c, _ in rooms]).count()
+        finally:
+            Reservation.objects.filter(property=property).delete()
+            property.delete()
+            User.objects.filter(pkid__in=[host.pkid] + [g.pkid for g in guests]).delete()
+
+        p50, p95, p99 = (statistics.quantiles(latencies, n=100)[q] for q in (49, 94, 98))
+        self.stdout.write(
+            f"{options['rooms']} rooms x {options['clients']} connections, {sent} messages in {elapsed:.2f}s: "
+            f"{sent / elapsed:.0f} messages/s, {len(latencies)} deliveries"
+        )
+        self.stdout.write(
+            f"latency p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms, max {max(latencies):.2f} ms"
+        )
+        self.stdout.write(f"writer caught up {write_lag * 1000:.0f} ms after the last broadcast")
+
+        if stored != sent:
+            raise CommandError(f"{sent} messages sent but {stored} stored")
+        self.stdout.write(self.style.SUCCESS(f"All {stored} messages stored"))
+
+    async def _run(self, rooms, options):
+        application = CookieJWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        per_room = options["clients"] * options["messages"]
+        sent_at = {}
+        echoes = {}
+        latencies = []
+
+        connections = []
+        for conversation, participants in rooms:
+            for i in range(options["clients"]):
+                sender = participants[i % len(participants)]
+                cookie = f"access_token={AccessToken.for_user(sender)}"
+                communicator = WebsocketCommunicator(
+                    application, f"/ws/chat/{conversation.id}/", headers=[(b"cookie", cookie.encode())]
+                )
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise CommandError(f"could not connect to {conversation.id}")
+                connections.append(communicator)
+
+        async def send(index, communicator):
+            # closed loop: wait for our own broadcast before the next send, so
+            # latency isn't just time spent queued behind our own burst
+            for n in range(options["messages"]):
+                text = f"benchmark {index}:{n}"
+                echoes[text] = asyncio.Event()
+                sent_at[text] = time.perf_counter()
+                await communicator.send_to(text_data=json.dumps({"text": text}))
+                await echoes[text].wait()
+
+        async def receive(communicator):
+            # every connection in the room gets every room message
+            for _ in range(per_room):
+                event = json.loads(await communicator.receive_from(timeout=options["timeout"]))
+                latencies.append((time.perf_counter() - sent_at[event["text"]]) * 1000)
+                echoes[event["text"]].set()
+
+        began = time.perf_counter()
+        await asyncio.gather(
+            *(send(i, communicator) for i, communicator in enumerate(connections)),
+            *(receive(communicator) for communicator in connections),
+        )
+        elapsed = time.perf_counter() - began
+
+        await get_writer().join()
+        write_lag = time.perf_counter() - began - elapsed
+
+        for communicator in connections:
+            await communicator.disconnect()
+
+        return len(sent_at), latencies, elapsed, write_lag
@@ -0,0 +1,33 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.sessions import CookieMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from apps.users.authentication import CookieJWTAuthentication
+
+
+@database_sync_to_async
+def get_user(token):
+    """
+    The user for an access token, validated like CookieJWTAuthentication.
+    """
+    authentication = CookieJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class CookieJWTAuthMiddleware(BaseMiddleware):
+    """
+    Sets scope["user"] from the access_token cookie, once per connection.
+    """
+    async def __call__(self, scope, receive, send):
+        token = scope.get("cookies", {}).get("access_token")
+        scope["user"] = await get_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def CookieJWTAuthMiddlewareStack(inner):
+    return CookieMiddleware(CookieJWTAuthMiddleware(inner))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation_last_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at', 'pkid'], name='chat_messag_convers_1a5ecb_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_message_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='guest_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='landlord_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
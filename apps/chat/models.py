@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 from apps.common.models import TimeStampedUUIDModel
@@ -11,11 +12,53 @@ class Conversation(TimeStampedUUIDModel):
     guest = models.ForeignKey(User, related_name='guest_conversations', on_delete=models.DO_NOTHING)
     landlord = models.ForeignKey(User, related_name='landlord_conversations', on_delete=models.DO_NOTHING)
 
-    @property
-    def last_message(self):
-        return self.messages.order_by('-created_at').first()
+    # denormalized on message insert, see signals.py
+    last_message = models.ForeignKey(
+        'Message',
+        related_name='+',
+        null=True, blank=True,
+        on_delete=models.SET_NULL
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    guest_unread_count = models.PositiveIntegerField(default=0)
+    landlord_unread_count = models.PositiveIntegerField(default=0)
+    # when the participant last read the thread; messages stamped before it
+    # but written after it (write-behind) don't count as unread
+    guest_read_at = models.DateTimeField(null=True, blank=True)
+    landlord_read_at = models.DateTimeField(null=True, blank=True)
+
+    def unread_count_for(self, user):
+        if user.pkid == self.guest_id:
+            return self.guest_unread_count
+        if user.pkid == self.landlord_id:
+            return self.landlord_unread_count
+        return 0
+
+    def mark_read(self, user):
+        """
+        Reset the user's unread counter and move their read mark to now.
+        """
+        if user.pkid == self.guest_id:
+            participant = 'guest'
+        elif user.pkid == self.landlord_id:
+            participant = 'landlord'
+        else:
+            return
+        fields = {f'{participant}_unread_count': 0, f'{participant}_read_at': timezone.now()}
+        Conversation.objects.filter(pkid=self.pkid).update(**fields)
+        for field, value in fields.items():
+            setattr(self, field, value)
 
 class Message(TimeStampedUUIDModel):
     conversation = models.ForeignKey(Conversation, related_name='messages', on_delete=models.CASCADE)
     sender = models.ForeignKey(User, on_delete=models.DO_NOTHING)
-    text = models.TextField(max_length=512)
\ No newline at end of file
+    text = models.TextField(max_length=512)
+    # not auto_now_add: ChatConsumer stamps the message when it is broadcast
+    # and the batched insert must keep that value, see writer.py
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # history pages and `since` sync, see views.MessagePagination
+            models.Index(fields=["conversation", "created_at", "pkid"]),
+        ]
\ No newline at end of file
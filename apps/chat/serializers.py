@@ -8,6 +8,7 @@ class ConversationSerializer(serializers.ModelSerializer):
     landlord = ProfileSerializer(source='landlord.profile', read_only=True)
     reservation = ReservationSerializer(read_only=True)
     last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
@@ -17,15 +18,24 @@ class ConversationSerializer(serializers.ModelSerializer):
             'landlord',
             'reservation',
             'last_message',
+            'unread_count',
             'created_at',
         ]
 
     def get_last_message(self, obj):
-        last_msg = obj.messages.order_by('-created_at').first()
+        last_msg = obj.last_message
         if last_msg:
+            # already loaded, don't fetch it again for conversation_id
+            last_msg.conversation = obj
             return MessageSerializer(last_msg).data
         return None
 
+    def get_unread_count(self, obj):
+        request = self.context.get("request")
+        if request is None:
+            return 0
+        return obj.unread_count_for(request.user)
+
 class MessageSerializer(serializers.ModelSerializer):
     sender = ProfileSerializer(source='sender.profile', read_only=True)
     conversation_id = serializers.CharField(source='conversation.id')
@@ -38,4 +48,77 @@ class MessageSerializer(serializers.ModelSerializer):
             'sender',
             'text',
             'created_at',
-        ]
\ No newline at end of file
+        ]
+
+class ConversationInboxSerializer(serializers.ModelSerializer):
+    """
+    Compact inbox row; the full thread is served by ConversationDetailView.
+    """
+    counterpart = serializers.SerializerMethodField()
+    property = serializers.SerializerMethodField()
+    reservation = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+
+    snippet_length = 120
+
+    class Meta:
+        model = Conversation
+        fields = [
+            'id',
+            'counterpart',
+            'property',
+            'reservation',
+            'last_message',
+            'unread_count',
+            'created_at',
+        ]
+
+    def _user(self):
+        return self.context["request"].user
+
+    def get_counterpart(self, obj):
+        other = obj.landlord if self._user().pkid == obj.guest_id else obj.guest
+        profile = getattr(other, "profile", None)
+        try:
+            avatar = profile.profile_picture_url() if profile else None
+        except Exception:
+            avatar = None
+        return {
+            "id": other.id,
+            "name": other.get_full_name(),
+            "avatar": avatar,
+        }
+
+    def get_property(self, obj):
+        property = obj.reservation.property
+        return {
+            "id": property.id,
+            "title": property.title,
+            "thumbnail": property.image_url(),
+        }
+
+    def get_reservation(self, obj):
+        reservation = obj.reservation
+        return {
+            "id": reservation.id,
+            "start_date": reservation.start_date,
+            "end_date": reservation.end_date,
+            "status": reservation.status,
+        }
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if message is None:
+            return None
+        text = message.text
+        if len(text) > self.snippet_length:
+            text = text[:self.snippet_length - 1] + "\u2026"
+        return {
+            "text": text,
+            "from_me": message.sender_id == self._user().pkid,
+            "created_at": serializers.DateTimeField().to_representation(message.created_at),
+        }
+
+    def get_unread_count(self, obj):
+        return obj.unread_count_for(self._user())
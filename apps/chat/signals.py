@@ -0,0 +1,64 @@
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Conversation, Message
+
+
+def _unread(participant, sent):
+    """
+    How many of the messages `participant` ("guest"/"landlord") hasn't read:
+    those they didn't send, stamped after their read mark. `sent` maps
+    sender pkid -> created_at of each message.
+    """
+    read_at = f"{participant}_read_at"
+    unread = Value(0)
+    for sender, times in sent.items():
+        times = sorted(times)
+        unread = unread + Case(
+            When(**{f"{participant}_id": sender}, then=Value(0)),
+            When(**{f"{read_at}__isnull": True}, then=Value(len(times))),
+            # newest first: read past the i-th message leaves the ones after it
+            *[
+                When(**{f"{read_at}__gte": created_at}, then=Value(len(times) - i - 1))
+                for i, created_at in reversed(list(enumerate(times)))
+            ],
+            default=Value(len(times)),
+        )
+    return unread
+
+
+def record_messages(messages):
+    """
+    Point each conversation at its newest message and add the messages to
+    the other participant's unread counter, one UPDATE per conversation.
+    Messages stamped before the participant's read mark are not added; the
+    writer can store a message after its reader has already seen it.
+    """
+    by_conversation = {}
+    for message in messages:
+        by_conversation.setdefault(message.conversation_id, []).append(message)
+
+    for conversation_pkid, batch in by_conversation.items():
+        latest = max(batch, key=lambda m: (m.created_at, m.pkid))
+        sent = {}
+        for message in batch:
+            sent.setdefault(message.sender_id, []).append(message.created_at)
+        # keep a newer pointer written by a concurrent insert
+        newer = When(last_message_at__gt=latest.created_at, then=F("last_message_at"))
+
+        Conversation.objects.filter(pkid=conversation_pkid).update(
+            last_message=Case(
+                When(last_message_at__gt=latest.created_at, then=F("last_message")),
+                default=Value(latest.pkid),
+            ),
+            last_message_at=Case(newer, default=Value(latest.created_at)),
+            guest_unread_count=F("guest_unread_count") + _unread("guest", sent),
+            landlord_unread_count=F("landlord_unread_count") + _unread("landlord", sent),
+        )
+
+
+@receiver(post_save, sender=Message)
+def record_message(sender, instance: Message, created: bool, **kwargs):
+    if created:
+        record_messages([instance])
@@ -1,3 +1,361 @@
-from django.test import TestCase
+import asyncio
+import json
+import uuid
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.properties.models import Reservation, ReservationStatus
+from apps.properties.tests import NO_SILK, login, make_property, make_user
+
+from . import writer
+from .middleware import CookieJWTAuthMiddlewareStack
+from .models import Conversation, Message
+from .routing import websocket_urlpatterns
+
+
+def make_conversation(host, guest):
+    start = date(2027, 1, 1)
+    reservation = Reservation.objects.create(
+        user=guest,
+        property=make_property(host),
+        status=ReservationStatus.APPROVED,
+        start_date=start,
+        end_date=start + timedelta(days=2),
+        number_of_nights=2,
+        guests=1,
+    )
+    return Conversation.objects.create(reservation=reservation, guest=guest, landlord=host)
+
+
+@NO_SILK
+class MessageListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.conversation = make_conversation(cls.host, cls.guest)
+        cls.messages = [
+            Message.objects.create(conversation=cls.conversation, sender=cls.guest, text=f"message {i}")
+            for i in range(5)
+        ]
+        cls.url = f"/api/v1/chat/{cls.conversation.id}/"
+
+    def setUp(self):
+        login(self.client, self.host)
+
+    def texts(self, rows):
+        return [row["text"] for row in rows]
+
+    def test_default_is_the_whole_thread_oldest_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.texts(response.json()), [f"message {i}" for i in range(5)])
+
+    def test_pages_are_opt_in(self):
+        first = self.client.get(self.url, {"page_size": 3}).json()
+        self.assertEqual(self.texts(first["results"]), ["message 4", "message 3", "message 2"])
+        older = self.client.get(first["next"]).json()
+        self.assertEqual(self.texts(older["results"]), ["message 1", "message 0"])
+        self.assertIsNone(older["sync"])
+
+        Message.objects.create(conversation=self.conversation, sender=self.guest, text="message 5")
+        caught_up = self.client.get(self.url, {"since": first["sync"]}).json()
+        # plus the overlap the client already has
+        self.assertEqual(self.texts(caught_up["results"])[-1], "message 5")
+        self.assertNotEqual(caught_up["sync"], first["sync"])
+
+    def test_since_returns_late_commits(self):
+        sync = self.client.get(self.url, {"page_size": 5}).json()["sync"]
+        # stamped before the newest message the client has, committed after
+        Message.objects.create(
+            conversation=self.conversation,
+            sender=self.host,
+            text="late",
+            created_at=self.messages[-1].created_at - timedelta(seconds=1),
+        )
+
+        caught_up = self.client.get(self.url, {"since": sync}).json()
+        self.assertIn("late", self.texts(caught_up["results"]))
+        # the overlap doesn't move the sync point backwards
+        self.assertEqual(caught_up["sync"], sync)
+
+    def test_non_participant_gets_404(self):
+        login(self.client, make_user("other@example.com"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        response = self.client.post(self.url, {"text": "hi"}, content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.conversation.messages.count(), 5)
+
+    def test_post(self):
+        body = {"conversation_id": str(self.conversation.id), "text": "hello"}
+        response = self.client.post(self.url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.conversation.messages.latest("created_at").sender, self.host)
+
+
+@NO_SILK
+class UnreadCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.conversation = make_conversation(cls.host, cls.guest)
+
+    def send(self, sender, text, **fields):
+        return Message.objects.create(conversation=self.conversation, sender=sender, text=text, **fields)
+
+    def test_counts_go_to_the_other_participant(self):
+        self.send(self.guest, "one")
+        self.send(self.guest, "two")
+        reply = self.send(self.host, "three")
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.landlord_unread_count, 2)
+        self.assertEqual(self.conversation.guest_unread_count, 1)
+        self.assertEqual(self.conversation.unread_count_for(self.host), 2)
+        self.assertEqual(self.conversation.last_message_id, reply.pkid)
+        self.assertEqual(self.conversation.last_message_at, reply.created_at)
+
+    def test_late_insert_keeps_the_newer_last_message(self):
+        newest = self.send(self.guest, "newest")
+        self.send(self.host, "older", created_at=newest.created_at - timedelta(seconds=1))
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, newest.pkid)
+        self.assertEqual(self.conversation.last_message_at, newest.created_at)
+        self.assertEqual(self.conversation.guest_unread_count, 1)
+
+    def test_reading_resets_only_the_readers_count(self):
+        self.send(self.guest, "hi")
+        self.send(self.host, "hello")
+
+        login(self.client, self.host)
+        self.assertEqual(self.client.get(f"/api/v1/chat/{self.conversation.id}/").status_code, 200)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.landlord_unread_count, 0)
+        self.assertEqual(self.conversation.guest_unread_count, 1)
+
+        login(self.client, self.guest)
+        response = self.client.post(f"/api/v1/chat/{self.conversation.id}/read/")
+        self.assertEqual(response.status_code, 204)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.guest_unread_count, 0)
+
+    def test_non_participant_cannot_mark_read(self):
+        self.send(self.guest, "hi")
+        login(self.client, make_user("other@example.com"))
+        response = self.client.post(f"/api/v1/chat/{self.conversation.id}/read/")
+        self.assertEqual(response.status_code, 404)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.landlord_unread_count, 1)
+
+
+@NO_SILK
+class InboxTests(TestCase):
+    url = "/api/v1/chat/inbox/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        # oldest activity first
+        cls.conversations = []
+        for i in range(5):
+            conversation = make_conversation(cls.host, cls.guest)
+            Message.objects.create(conversation=conversation, sender=cls.guest, text=f"message {i}")
+            cls.conversations.append(conversation)
+
+    def setUp(self):
+        login(self.client, self.host)
+
+    def ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def test_rows(self):
+        row = self.client.get(self.url).json()["results"][0]
+        self.assertEqual(row["id"], str(self.conversations[-1].id))
+        self.assertEqual(row["counterpart"]["id"], str(self.guest.id))
+        self.assertEqual(row["last_message"]["text"], "message 4")
+        self.assertFalse(row["last_message"]["from_me"])
+        self.assertEqual(row["unread_count"], 1)
+
+    def test_cursor_pages_follow_the_latest_activity(self):
+        # a reply moves the oldest conversation to the top
+        Message.objects.create(conversation=self.conversations[0], sender=self.host, text="reply")
+        expected = [str(c.id) for c in [self.conversations[0], *reversed(self.conversations[1:])]]
+
+        seen = []
+        page = self.client.get(self.url, {"page_size": 2}).json()
+        while True:
+            self.assertLessEqual(len(page["results"]), 2)
+            seen += self.ids(page["results"])
+            if page["next"] is None:
+                break
+            page = self.client.get(page["next"]).json()
+        self.assertEqual(seen, expected)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {"page_size": 1})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {"page_size": 5})
+        self.assertEqual(len(small), len(large))
+
+    def test_only_own_conversations(self):
+        login(self.client, make_user("other@example.com"))
+        self.assertEqual(self.client.get(self.url).json()["results"], [])
+
+
+class WriteMessagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.conversation = make_conversation(cls.host, cls.guest)
+
+    def message(self, **fields):
+        return Message(id=uuid.uuid4(), conversation=self.conversation, sender=self.guest, text="hi", **fields)
+
+    def test_keeps_the_broadcast_timestamp(self):
+        sent_at = timezone.now() - timedelta(seconds=5)
+        message = self.message(created_at=sent_at)
+
+        self.assertEqual(writer.write_messages([message]), 1)
+
+        self.assertEqual(Message.objects.get(id=message.id).created_at, sent_at)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_at, sent_at)
+
+    def test_rerun_skips_messages_already_written(self):
+        first, second = self.message(), self.message()
+        writer.write_messages([first])
+
+        with self.assertNoLogs(writer.logger, "ERROR"):
+            self.assertEqual(writer.write_messages([first, second]), 1)
+
+        self.assertEqual(self.conversation.messages.count(), 2)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.landlord_unread_count, 2)
+
+    @NO_SILK
+    def test_messages_read_before_they_are_written_stay_read(self):
+        now = timezone.now()
+        seen = self.message(created_at=now - timedelta(seconds=1))
+        # the host has the thread open and marks it read on the broadcast
+        login(self.client, self.host)
+        response = self.client.post(f"/api/v1/chat/{self.conversation.id}/read/")
+        self.assertEqual(response.status_code, 204)
+        unseen = self.message(created_at=timezone.now() + timedelta(seconds=1))
+
+        writer.write_messages([seen, unseen])
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.landlord_unread_count, 1)
+        self.assertEqual(self.conversation.guest_unread_count, 0)
+
+
+class MessageWriterTests(SimpleTestCase):
+    def write(self, side_effect):
+        batch = [Message(id=uuid.uuid4()) for _ in range(3)]
+        write_messages = mock.Mock(side_effect=side_effect)
+
+        def inline(function):
+            async def call(*args):
+                return function(*args)
+            return call
+
+        async def run():
+            await writer.MessageWriter(retry_delay=0)._write(batch)
+
+        with mock.patch.object(writer, "write_messages", write_messages), \
+                mock.patch.object(writer, "database_sync_to_async", inline):
+            asyncio.run(run())
+        return write_messages
+
+    def test_failed_batch_is_retried(self):
+        with self.assertLogs(writer.logger, "WARNING") as logs:
+            write_messages = self.write([OperationalError, OperationalError, 3])
+        self.assertEqual(write_messages.call_count, 3)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_batch_is_dropped_after_max_attempts(self):
+        with self.assertLogs(writer.logger, "WARNING") as logs:
+            write_messages = self.write(OperationalError)
+        self.assertEqual(write_messages.call_count, writer.MAX_ATTEMPTS)
+        self.assertIn("dropped batch of 3 messages", logs.output[-1])
+
+
+@NO_SILK
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.host = make_user("host@example.com")
+        self.guest = make_user("guest@example.com")
+        self.conversation = make_conversation(self.host, self.guest)
+
+    def communicator(self, user=None, token=None, room=None):
+        if user is not None:
+            token = AccessToken.for_user(user)
+        headers = [(b"cookie", f"access_token={token}".encode())] if token else []
+        return WebsocketCommunicator(
+            CookieJWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+            f"/ws/chat/{room or self.conversation.id}/",
+            headers=headers,
+        )
+
+    def connects(self, **kwargs):
+        async def run():
+            communicator = self.communicator(**kwargs)
+            connected, _ = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+        return async_to_sync(run)()
+
+    def test_only_members_with_a_valid_token_connect(self):
+        self.assertTrue(self.connects(user=self.guest))
+        self.assertTrue(self.connects(user=self.host))
+
+        self.assertFalse(self.connects())
+        self.assertFalse(self.connects(token="not-a-jwt"))
+        self.assertFalse(self.connects(user=make_user("other@example.com")))
+        self.assertFalse(self.connects(user=self.guest, room="not-a-uuid"))
+        self.assertFalse(self.connects(user=self.guest, room=uuid.uuid4()))
+
+    def exchange(self, payload):
+        async def run():
+            sender, receiver = self.communicator(user=self.guest), self.communicator(user=self.host)
+            for communicator in (sender, receiver):
+                connected, _ = await communicator.connect()
+                self.assertTrue(connected)
+            await sender.send_to(text_data=json.dumps(payload))
+            event = json.loads(await receiver.receive_from())
+            await writer.get_writer().join()
+            await sender.disconnect()
+            await receiver.disconnect()
+            return event
+        return async_to_sync(run)()
+
+    def test_broadcast_matches_the_stored_message(self):
+        event = self.exchange({"text": "hello"})
+
+        login(self.client, self.host)
+        stored = self.client.get(f"/api/v1/chat/{self.conversation.id}/").json()
+        event.pop("type")
+        self.assertEqual(stored, [event])
+
+    def test_client_sender_id_is_ignored(self):
+        event = self.exchange({"text": "hello", "sender_id": str(self.host.id), "conversation_id": str(uuid.uuid4())})
+
+        self.assertEqual(event["sender"]["user_id"], str(self.guest.id))
+        self.assertEqual(event["conversation_id"], str(self.conversation.id))
+        message = Message.objects.get()
+        self.assertEqual((message.sender_id, message.conversation_id), (self.guest.pkid, self.conversation.pkid))
@@ -1,8 +1,11 @@
 from django.urls import path
 
-from .views import ConversationListView, MessageListCreateView
+from .views import ConversationListView, ConversationInboxView, ConversationDetailView, ConversationReadView, MessageListCreateView
 
 urlpatterns = [
     path('', ConversationListView.as_view(), name='conversation-list'),
+    path('inbox/', ConversationInboxView.as_view(), name='conversation-inbox'),
     path('<uuid:id>/', MessageListCreateView.as_view(), name='message-list-create'),
+    path('<uuid:id>/detail/', ConversationDetailView.as_view(), name='conversation-detail'),
+    path('<uuid:id>/read/', ConversationReadView.as_view(), name='conversation-read'),
 ]
\ No newline at end of file
@@ -1,14 +1,16 @@
+from datetime import timedelta
+
 from rest_framework import generics, permissions, status
-from django.db.models import Max, Q, F, Value
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db.models import Q, Prefetch
 from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
+from apps.properties.models import Property
 from .models import Conversation, Message
-from .serializers import ConversationSerializer, MessageSerializer
+from apps.properties.pagination import KeysetPagination
+from .serializers import ConversationSerializer, ConversationInboxSerializer, MessageSerializer
 
-from django.db.models import Max
-from django.db.models.functions import Coalesce
-from rest_framework import generics, permissions
-from django.db.models import Q
 
 class ConversationListView(generics.ListAPIView):
     serializer_class = ConversationSerializer
@@ -16,49 +18,212 @@ class ConversationListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        
+
+        # last_message / last_message_at are kept up to date on insert, so
+        # neither sorting nor the preview touches the messages table
         conversations = Conversation.objects.filter(
             Q(guest=user) | Q(landlord=user)
         ).annotate(
-            latest_message_time=Max('messages__created_at'),
-            sort_time=Coalesce('latest_message_time', 'created_at')
+            sort_time=Coalesce('last_message_at', 'created_at')
         ).order_by('-sort_time')
-        
+
         # Select related for ForeignKey fields
         conversations = conversations.select_related(
-            'guest',
-            'landlord',
-            'reservation',
-            'reservation__user',
-            'reservation__property',
-            'reservation__property__user'
+            'guest__profile',
+            'landlord__profile',
+            'reservation__user__profile',
+            'last_message__sender__profile',
+        )
+
+        # one query for the properties, with the per-user flags annotated
+        properties = (
+            Property.objects.with_liked(user)
+            .with_reviewed(user)
+            .select_related('user__profile')
+            .prefetch_related('tags')
         )
-        
-        # Prefetch messages with sender
         conversations = conversations.prefetch_related(
-            'messages__sender__profile',  # all messages + sender profile
-            'reservation__property__tags',
-            'reservation__property__reviews'
+            Prefetch('reservation__property', queryset=properties),
         )
-        
+
         return conversations
 
 
+class InboxPagination(KeysetPagination):
+    page_size = 20
+
+
+class ConversationInboxView(generics.ListAPIView):
+    """
+    Compact, cursor-paginated inbox, newest activity first.
+    """
+    serializer_class = ConversationInboxSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InboxPagination
+
+    def get_queryset(self):
+        user = self.request.user
+
+        return Conversation.objects.filter(
+            Q(guest=user) | Q(landlord=user)
+        ).annotate(
+            sort_time=Coalesce('last_message_at', 'created_at')
+        ).order_by(
+            '-sort_time'
+        ).select_related(
+            'guest__profile',
+            'landlord__profile',
+            'reservation__property',
+            'last_message',
+        ).only(
+            'pkid', 'id', 'created_at', 'guest_id', 'landlord_id',
+            'guest_unread_count', 'landlord_unread_count',
+            'guest__id', 'guest__first_name', 'guest__last_name', 'guest__email', 'guest__profile__profile_picture',
+            'landlord__id', 'landlord__first_name', 'landlord__last_name', 'landlord__email', 'landlord__profile__profile_picture',
+            'reservation__id', 'reservation__start_date', 'reservation__end_date', 'reservation__status',
+            'reservation__property__id', 'reservation__property__title', 'reservation__property__image',
+            'last_message__text', 'last_message__sender_id', 'last_message__created_at',
+        )
+
+
+class ConversationDetailView(generics.RetrieveAPIView):
+    """
+    Full conversation, for when a thread is opened.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        user = self.request.user
+        properties = (
+            Property.objects.with_liked(user)
+            .with_reviewed(user)
+            .select_related('user__profile')
+            .prefetch_related('tags')
+        )
+        return Conversation.objects.filter(
+            Q(guest=user) | Q(landlord=user)
+        ).select_related(
+            'guest__profile',
+            'landlord__profile',
+            'reservation__user__profile',
+            'last_message__sender__profile',
+        ).prefetch_related(
+            Prefetch('reservation__property', queryset=properties),
+        )
+
+
+class MessagePagination(KeysetPagination):
+    """
+    Without `cursor`, `since` or `page_size` the whole thread is returned as
+    a plain list, oldest first, as before; pages are opt-in.
+
+    Pages are newest first. With `?since=<cursor>` it instead returns,
+    oldest first, only the messages after that cursor, so a client catching
+    up after a reconnect fetches just what it missed.
+
+    Responses carry a `sync` cursor pointing at the newest message the
+    client now has, to pass as `since` next time.
+
+    Messages are stamped when broadcast but committed later by the chat
+    writer, and with several processes not in created_at order, so a
+    message can appear behind the cursor after a sync. `since` therefore
+    reaches back `sync_overlap` before the cursor; clients drop the ids they
+    already have.
+    """
+    page_size = 50
+    max_page_size = 200
+    since_query_param = "since"
+    # well past FLUSH_INTERVAL plus the writer's retries, see writer.py
+    sync_overlap = timedelta(seconds=30)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        paging = (self.cursor_query_param, self.since_query_param, self.page_size_query_param)
+        if not any(request.query_params.get(name) for name in paging):
+            return None
+
+        self.since = request.query_params.get(self.since_query_param)
+
+        if self.since:
+            self.since_key = self.decode_cursor(self.since, Message._meta.get_field("created_at"))
+            queryset = queryset.filter(
+                created_at__gt=self.since_key[0] - self.sync_overlap
+            ).order_by("created_at")
+        else:
+            queryset = queryset.order_by("-created_at")
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_sync_cursor(self):
+        if self.since:
+            # the overlap must not move the sync point backwards
+            if not self.page or (self.page[-1].created_at, self.page[-1].pkid) <= self.since_key:
+                return self.since
+            newest = self.page[-1]
+        elif self.request.query_params.get(self.cursor_query_param):
+            # older pages don't move the sync point
+            return None
+        elif self.page:
+            newest = self.page[0]
+        else:
+            return None
+        return self.encode_cursor(newest.created_at, newest.pkid)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["sync"] = self.get_sync_cursor()
+        return response
+
+
 class MessageListCreateView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessagePagination
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # after authentication, so both GET and POST see a participant's thread
+        self.conversation = self.get_conversation()
+
+    def get_conversation(self):
+        user = self.request.user
+        return get_object_or_404(
+            Conversation.objects.filter(Q(guest=user) | Q(landlord=user)),
+            id=self.kwargs['id'],
+        )
 
     def get_queryset(self):
-        conversation_id = self.kwargs['id']
-        return Message.objects.filter(conversation__id=conversation_id).order_by('created_at')
+        # MessagePagination reorders pages; (conversation, created_at, pkid) index
+        return Message.objects.filter(
+            conversation=self.conversation
+        ).select_related('conversation', 'sender__profile').order_by('created_at', 'pkid')
+
+    def list(self, request, *args, **kwargs):
+        self.conversation.mark_read(request.user)
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        conversation_id = self.kwargs['id']
-        conversation = get_object_or_404(Conversation, id=conversation_id)
         text = self.request.data.get('text')
 
         serializer.save(
             sender=self.request.user,
-            conversation=conversation,
+            conversation=self.conversation,
             text=text,
-        )
\ No newline at end of file
+        )
+
+
+class ConversationReadView(APIView):
+    """
+    Mark a conversation read, e.g. when a message arrives in the open thread.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, id):
+        user = request.user
+        conversation = get_object_or_404(
+            Conversation.objects.filter(Q(guest=user) | Q(landlord=user)),
+            id=id,
+        )
+        conversation.mark_read(user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
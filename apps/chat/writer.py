@@ -0,0 +1,164 @@
+"""
+Write-behind for chat messages.
+
+ChatConsumer broadcasts a message as soon as it arrives and hands it to the
+process's MessageWriter, which inserts whatever is queued across all rooms
+with one bulk_create every FLUSH_INTERVAL (or MAX_BATCH messages, whichever
+comes first). bulk_create skips post_save, so the conversation pointers and
+unread counters are updated here through record_messages.
+
+The consumer assigns the message id and created_at, so the stored row
+matches the broadcast exactly.
+
+A batch that fails to write (database down, lost connection) is retried
+MAX_ATTEMPTS times with backoff; meanwhile the queue fills and receive()
+waits, so clients slow down instead of messages piling up. Rows the
+database rejects outright (e.g. the conversation was deleted meanwhile) are
+dropped one by one. What is still lost:
+
+- everything queued in a process that dies: normally one FLUSH_INTERVAL
+  worth of messages, at most MAX_PENDING plus the batch being written;
+- a batch that still fails after the last attempt, logged with its ids.
+
+Those messages were broadcast, so connected clients saw them, but they are
+missing from the history.
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.db import DataError, IntegrityError, transaction
+
+from .models import Message
+from .signals import record_messages
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 500
+FLUSH_INTERVAL = 0.05
+
+# receive() waits once this many messages are queued, rather than
+# buffering without bound when the database falls behind
+MAX_PENDING = 10_000
+
+# 0.5 + 1 + 2 + 4 seconds of backoff before a batch is given up
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+
+def write_messages(batch):
+    """
+    Insert `batch` in one statement. If the database rejects it, fall back
+    to one insert per message so a single bad row (e.g. its conversation was
+    deleted meanwhile) doesn't lose the rest. Returns the number written.
+
+    Other database errors propagate and the writer retries the batch, so
+    this must be safe to run again on a batch that was partly written.
+    """
+    for message in batch:
+        # a rolled back attempt may have assigned pkids
+        message.pkid = None
+        message._state.adding = True
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(batch)
+            record_messages(batch)
+        return len(batch)
+    except (IntegrityError, DataError):
+        logger.warning("chat: batch of %d failed, retrying one by one", len(batch), exc_info=True)
+
+    # written by an earlier attempt
+    stored = set(Message.objects.filter(id__in=[m.id for m in batch]).values_list("id", flat=True))
+    written = 0
+    for message in batch:
+        if message.id in stored:
+            continue
+        message.pkid = None
+        message._state.adding = True
+        try:
+            with transaction.atomic():
+                # post_save -> record_message
+                message.save()
+            written += 1
+        except (IntegrityError, DataError):
+            logger.exception("chat: dropped message %s", message.id)
+    return written
+
+
+class MessageWriter:
+    def __init__(
+        self,
+        max_batch=MAX_BATCH,
+        interval=FLUSH_INTERVAL,
+        max_pending=MAX_PENDING,
+        max_attempts=MAX_ATTEMPTS,
+        retry_delay=RETRY_DELAY,
+    ):
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.loop = asyncio.get_running_loop()
+        self._task = None
+
+    async def submit(self, message):
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+        await self.queue.put(message)
+
+    async def join(self):
+        """
+        Wait until everything submitted so far is written.
+        """
+        await self.queue.join()
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = self.loop.time() + self.interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await database_sync_to_async(write_messages)(batch)
+                return
+            except Exception:
+                if attempt == self.max_attempts:
+                    logger.exception(
+                        "chat: dropped batch of %d messages after %d attempts: %s",
+                        len(batch), attempt, ", ".join(str(m.id) for m in batch),
+                    )
+                    return
+                logger.warning("chat: writing %d messages failed, retrying", len(batch), exc_info=True)
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+
+_writer = None
+
+
+def get_writer():
+    """
+    The writer for the running event loop, one per process.
+    """
+    global _writer
+    if _writer is None or _writer.loop is not asyncio.get_running_loop():
+        _writer = MessageWriter()
+    return _writer
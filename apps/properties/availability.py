@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import BlockedNight, Reservation, ReservationStatus
+from .response_cache import invalidate_property
+
+# statuses that hold the nights of a reservation
+BLOCKING_STATUSES = [
+    ReservationStatus.PENDING,
+    ReservationStatus.APPROVED,
+    ReservationStatus.ONGOING,
+    ReservationStatus.COMPLETED,
+]
+
+# statuses a new booking can still collide with
+NON_TERMINAL_STATUSES = [
+    ReservationStatus.PENDING,
+    ReservationStatus.APPROVED,
+    ReservationStatus.ONGOING,
+]
+
+
+def _nights(start_date, end_date):
+    # end_date is the checkout date, so it is not a blocked night
+    for offset in range((end_date - start_date).days):
+        yield start_date + timedelta(days=offset)
+
+
+def _invalidate_listings():
+    # cached date searches were filtered on the old nights
+    transaction.on_commit(invalidate_property)
+
+
+def block_nights(reservations):
+    """
+    Write the blocked nights of the given reservations in one insert.
+    """
+    _invalidate_listings()
+    BlockedNight.objects.bulk_create(
+        [
+            BlockedNight(
+                property_id=r.property_id,
+                reservation_id=r.pkid,
+                date=night,
+            )
+            for r in reservations
+            for night in _nights(r.start_date, r.end_date)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def release_nights(reservation_pkids):
+    _invalidate_listings()
+    return BlockedNight.objects.filter(reservation_id__in=reservation_pkids).delete()
+
+
+def sync_blocked_nights(reservation):
+    """
+    Keep the index in line with the reservation status.
+    Reservation dates don't change after booking, so only the status matters.
+    """
+    if reservation.status in BLOCKING_STATUSES:
+        if not BlockedNight.objects.filter(reservation_id=reservation.pkid).exists():
+            block_nights([reservation])
+    else:
+        release_nights([reservation.pkid])
+
+
+def exclude_unavailable(queryset, start_date, end_date):
+    """
+    Exclude properties with any blocked night in [start_date, end_date).
+    """
+    blocked = BlockedNight.objects.filter(
+        date__gte=start_date,
+        date__lt=end_date,
+    ).values("property_id")
+
+    return queryset.exclude(pkid__in=blocked)
+
+
+def overlapping_reservations(property_pkid, start_date, end_date):
+    """
+    Non-terminal reservations of a property sharing a night with
+    [start_date, end_date). Checkout day == checkin day is not an overlap.
+    """
+    return Reservation.objects.filter(
+        property_id=property_pkid,
+        status__in=NON_TERMINAL_STATUSES,
+        start_date__lt=end_date,
+        end_date__gt=start_date,
+    )
@@ -0,0 +1,77 @@
+"""
+Reservation creation.
+
+Bookings for a property are serialized on the property row: the lock is
+taken before the overlap check and held until the reservation and its
+conversation are committed, so two requests for the same nights can't both
+pass the check.
+"""
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.chat.models import Conversation
+
+from . import pricing
+from .availability import overlapping_reservations
+from .models import Property, Reservation, ReservationStatus
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "These dates are no longer available."
+    default_code = "booking_conflict"
+
+
+def book_stay(user, property_pkid, start_date, end_date, save=None, **fields):
+    """
+    Create a reservation and its conversation in one transaction.
+
+    `save` creates the reservation from keyword arguments; it defaults to
+    Reservation.objects.create and the API passes serializer.save. Extra
+    `fields` (e.g. guests) are passed through to it.
+    Raises BookingConflict when the nights are taken.
+    """
+    save = save or Reservation.objects.create
+
+    with transaction.atomic():
+        property = Property.objects.select_for_update().get(pkid=property_pkid)
+
+        if overlapping_reservations(property.pkid, start_date, end_date).exists():
+            raise BookingConflict()
+
+        quote = pricing.quote(property, start_date, end_date)
+
+        if property.is_instant_booking:
+            reservation_status = ReservationStatus.APPROVED
+        else:
+            reservation_status = ReservationStatus.PENDING
+
+        reservation = save(
+            user=user,
+            property=property,
+            status=reservation_status,
+            start_date=start_date,
+            end_date=end_date,
+            checkin_time=property.checkin_time,
+            checkout_time=property.checkout_time,
+            is_instant_booking=property.is_instant_booking,
+            price_per_night=quote.price_per_night,
+            number_of_nights=quote.number_of_nights,
+            long_stay_discount=quote.long_stay_discount,
+            cleaning_fee=quote.cleaning_fee,
+            guest_service_fee_rate=quote.guest_service_fee_rate,
+            host_service_fee_rate=quote.host_service_fee_rate,
+            tax_rate=quote.tax_rate,
+            total_amount=quote.total_amount,
+            host_pay=quote.host_pay,
+            **fields,
+        )
+
+        Conversation.objects.create(
+            reservation=reservation,
+            guest=user,
+            landlord_id=property.user_id,
+        )
+
+    return reservation
@@ -0,0 +1,39 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.properties import reservation_io
+from apps.properties.models import Reservation
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream reservations as CSV or JSON Lines, optionally for one host or property."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", help="email of the host; all reservations when omitted")
+        parser.add_argument("--property", help="property id (UUID)")
+        parser.add_argument("--format", choices=reservation_io.FORMATS, default="csv")
+        parser.add_argument("--output", help="file path; stdout when omitted")
+
+    def handle(self, *args, **options):
+        queryset = Reservation.objects.all()
+
+        if options["host"]:
+            host = User.objects.filter(email=options["host"]).first()
+            if host is None:
+                raise CommandError(f"No user with email {options['host']}")
+            queryset = queryset.filter(property__user=host)
+
+        if options["property"]:
+            queryset = queryset.filter(property__id=options["property"])
+
+        lines = reservation_io.render_rows(reservation_io.export_rows(queryset), options["format"])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                out.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
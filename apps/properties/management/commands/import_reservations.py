@@ -0,0 +1,38 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.properties import reservation_io
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import reservations for a host's properties from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--host", required=True, help="email of the host who owns the properties")
+        parser.add_argument("--format", choices=reservation_io.FORMATS, help="defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=reservation_io.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        host = User.objects.filter(email=options["host"]).first()
+        if host is None:
+            raise CommandError(f"No user with email {options['host']}")
+
+        path = options["path"]
+        file_format = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = reservation_io.import_reservations(
+                host,
+                reservation_io.read_rows(stream, file_format),
+                batch_size=options["batch_size"],
+            )
+
+        for error in report["errors"]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+
+        self.stdout.write(f"Created {report['created']} reservations, {len(report['errors'])} rows rejected")
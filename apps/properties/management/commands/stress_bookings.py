@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.properties.availability import NON_TERMINAL_STATUSES
+from apps.properties.booking import BookingConflict, book_stay
+from apps.properties.models import Property, PropertyStatus, Reservation
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Book overlapping stays on one property from many threads and check that "
+        "no nights were double-booked. Creates throwaway users and a property and "
+        "deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=50, help="bookings tried per thread")
+        parser.add_argument("--window", type=int, default=60, help="days the stays are drawn from")
+        parser.add_argument("--max-nights", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        host = User.objects.create_user(
+            email=f"stress-host-{tag}@example.com", password=None, first_name="Stress", last_name="Host"
+        )
+        guests = [
+            User.objects.create_user(
+                email=f"stress-guest-{tag}-{i}@example.com", password=None, first_name="Stress", last_name="Guest"
+            )
+            for i in range(options["threads"])
+        ]
+        property = Property.objects.create(
+            user=host,
+            title=f"Stress test {tag}",
+            description="stress_bookings",
+            location="Nowhere",
+            category="Test",
+            bedrooms=1,
+            beds=1,
+            bathrooms=1,
+            guests=1,
+            price_per_night=100,
+            status=PropertyStatus.ACTIVE,
+            is_instant_booking=True,
+        )
+
+        try:
+            booked, conflicts, errors, elapsed = self._run(property, guests, options)
+            overlaps = self._double_bookings(property)
+        finally:
+            Reservation.objects.filter(property=property).delete()
+            property.delete()
+            User.objects.filter(pkid__in=[host.pkid] + [g.pkid for g in guests]).delete()
+
+        attempts = booked + conflicts + errors
+        self.stdout.write(
+            f"{options['threads']} threads, {attempts} attempts in {elapsed:.2f}s: "
+            f"{booked} booked, {conflicts} conflicts, {errors} errors, "
+            f"{attempts / elapsed:.0f} attempts/s, {booked / elapsed:.0f} bookings/s"
+        )
+
+        if overlaps:
+            raise CommandError(f"{len(overlaps)} double-booked pairs: {overlaps[:5]}")
+        self.stdout.write(self.style.SUCCESS("No double bookings"))
+
+    def _run(self, property, guests, options):
+        start = date.today() + timedelta(days=365)
+        counts = {"booked": 0, "conflicts": 0, "errors": 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(guests))
+
+        def worker(index, guest):
+            rng = random.Random(options["seed"] + index)
+            local = {"booked": 0, "conflicts": 0, "errors": 0}
+            try:
+                barrier.wait()
+                for _ in range(options["attempts"]):
+                    check_in = start + timedelta(days=rng.randrange(options["window"]))
+                    check_out = check_in + timedelta(days=rng.randint(1, options["max_nights"]))
+                    try:
+                        book_stay(guest, property.pkid, check_in, check_out, guests=1)
+                        local["booked"] += 1
+                    except BookingConflict:
+                        local["conflicts"] += 1
+                    except Exception as e:
+                        # e.g. lock timeouts / serialization failures
+                        local["errors"] += 1
+                        self.stderr.write(f"thread {index}: {e!r}")
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in local.items():
+                        counts[key] += value
+
+        threads = [threading.Thread(target=worker, args=(i, g)) for i, g in enumerate(guests)]
+        began = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - began
+
+        return counts["booked"], counts["conflicts"], counts["errors"], elapsed
+
+    def _double_bookings(self, property):
+        stays = sorted(
+            Reservation.objects.filter(property=property, status__in=NON_TERMINAL_STATUSES)
+            .values_list("start_date", "end_date", "confirmation_code")
+        )
+        overlaps = []
+        latest = None  # stay with the latest checkout so far
+        for stay in stays:
+            if latest and stay[0] < latest[1]:
+                overlaps.append((latest[2], stay[2]))
+            if latest is None or stay[1] > latest[1]:
+                latest = stay
+        return overlaps
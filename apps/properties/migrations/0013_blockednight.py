@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:01
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+BLOCKING_STATUSES = ["PENDING", "APPROVED", "ONGOING", "COMPLETED"]
+
+
+def backfill_blocked_nights(apps, schema_editor):
+    Reservation = apps.get_model("properties", "Reservation")
+    BlockedNight = apps.get_model("properties", "BlockedNight")
+
+    batch = []
+    reservations = (
+        Reservation.objects.filter(status__in=BLOCKING_STATUSES)
+        .values_list("pkid", "property_id", "start_date", "end_date")
+        .iterator(chunk_size=2000)
+    )
+    for pkid, property_id, start_date, end_date in reservations:
+        for offset in range((end_date - start_date).days):
+            batch.append(BlockedNight(
+                property_id=property_id,
+                reservation_id=pkid,
+                date=start_date + timedelta(days=offset),
+            ))
+        if len(batch) >= 5000:
+            BlockedNight.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    BlockedNight.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_alter_property_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_nights', to='properties.property')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_nights', to='properties.reservation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'property'], name='properties__date_b4029e_idx')],
+                'unique_together': {('reservation', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_blocked_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:02
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    # Full-text search is PostgreSQL only; other databases use the icontains fallback
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS properties_property_search_vector_idx "
+        "ON properties_property USING GIN (search_vector)"
+    )
+
+    Property = apps.get_model("properties", "Property")
+    Property.objects.update(
+        search_vector=(
+            SearchVector("location", weight="A", config="simple")
+            + SearchVector("title", weight="B", config="simple")
+            + SearchVector("category", weight="C", config="simple")
+        )
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS properties_property_search_vector_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_blockednight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_property_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at', 'pkid'], name='properties__created_4549ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['likes_count', 'pkid'], name='properties__likes_c_c4e26d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['views_count', 'pkid'], name='properties__views_c_622462_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['reservations_count', 'pkid'], name='properties__reserva_90c971_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['created_at', 'pkid'], name='properties__created_e43b60_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0016_reservation_status_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertyview',
+            index=models.Index(fields=['created_at'], name='properties__created_b01599_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, OuterRef, Value
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from autoslug import AutoSlugField
@@ -16,6 +18,13 @@ def generate_confirmation_code(length=8):
     chars = string.ascii_uppercase + string.digits
     return ''.join(random.choices(chars, k=length))
 
+# 36^8 codes, so a collision is rare and the unique index catches it; retry
+# with fresh codes instead of looking each one up first
+CONFIRMATION_CODE_ATTEMPTS = 5
+
+def _is_code_collision(error):
+    return "confirmation_code" in str(error)
+
 class PropertyStatus(models.TextChoices):
     DRAFT = "DRAFT", "Draft"
     ACTIVE = "ACTIVE", "Active"
@@ -32,6 +41,28 @@ class ReservationStatus(models.TextChoices):
     COMPLETED = "COMPLETED", "Completed"
     CANCELLED = "CANCELLED", "Cancelled"
 
+class PropertyQuerySet(models.QuerySet):
+    """
+    Per-user flags resolved in the listing query itself, so serializers
+    don't run an exists() per row.
+    """
+    def with_liked(self, user):
+        if not user.is_authenticated:
+            return self.annotate(user_liked=Value(False))
+        return self.annotate(
+            user_liked=Exists(PropertyLike.objects.filter(property=OuterRef("pk"), user=user))
+        )
+
+    def with_reviewed(self, user):
+        # reviews.models imports this module
+        from apps.reviews.models import Review
+
+        if not user.is_authenticated:
+            return self.annotate(user_reviewed=Value(False))
+        return self.annotate(
+            user_reviewed=Exists(Review.objects.filter(property=OuterRef("pk"), user=user))
+        )
+
 class PropertyTag(TimeStampedUUIDModel):
     name = models.CharField(max_length=50, unique=True)
     description = models.CharField(max_length=255, null=True, blank=True)
@@ -71,12 +102,48 @@ class Property(TimeStampedUUIDModel):
 
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'))
 
+    # maintained by apps.properties.search, see signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PropertyQuerySet.as_manager()
+
     def image_url(self):
         return f'{settings.WEBSITE_URL}{self.image.url}'
     
     class Meta:
         verbose_name = "Property"
         verbose_name_plural = "Properties"
+        # keyset pagination keys, see pagination.KeysetPagination
+        indexes = [
+            models.Index(fields=["created_at", "pkid"]),
+            models.Index(fields=["likes_count", "pkid"]),
+            models.Index(fields=["views_count", "pkid"]),
+            models.Index(fields=["reservations_count", "pkid"]),
+        ]
+
+class ReservationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Fill in missing confirmation codes, regenerating them if one
+        collides with an existing reservation.
+        """
+        objs = list(objs)
+        pending = [obj for obj in objs if not obj.confirmation_code]
+
+        for attempt in range(CONFIRMATION_CODE_ATTEMPTS):
+            codes = set()
+            for obj in pending:
+                code = generate_confirmation_code()
+                while code in codes:
+                    code = generate_confirmation_code()
+                codes.add(code)
+                obj.confirmation_code = code
+            try:
+                with transaction.atomic():
+                    return super().bulk_create(objs, *args, **kwargs)
+            except IntegrityError as e:
+                if not pending or not _is_code_collision(e) or attempt == CONFIRMATION_CODE_ATTEMPTS - 1:
+                    raise
 
 class Reservation(TimeStampedUUIDModel):
     user = models.ForeignKey(User, related_name='reservations', on_delete=models.CASCADE)
@@ -111,16 +178,31 @@ class Reservation(TimeStampedUUIDModel):
         editable=False
     )
 
-    def save(self, *args, **kwargs):
-        if not self.confirmation_code:
-            code = generate_confirmation_code()
+    objects = ReservationQuerySet.as_manager()
 
-            while Reservation.objects.filter(confirmation_code=code).exists():
-                code = generate_confirmation_code()
-
-            self.confirmation_code = code
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "pkid"]),
+            # lifecycle transitions, see tasks.update_reservations_status_task
+            models.Index(fields=["status", "end_date", "checkout_time"]),
+            models.Index(fields=["status", "start_date", "checkin_time"]),
+            models.Index(fields=["status", "created_at"]),
+        ]
 
-        super().save(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        if self.confirmation_code:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(CONFIRMATION_CODE_ATTEMPTS):
+            self.confirmation_code = generate_confirmation_code()
+            try:
+                # savepoint, so a collision doesn't break an outer transaction
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError as e:
+                if not _is_code_collision(e) or attempt == CONFIRMATION_CODE_ATTEMPTS - 1:
+                    self.confirmation_code = ""
+                    raise
 
 class PropertyView(TimeStampedUUIDModel):
     user = models.ForeignKey(
@@ -140,6 +222,8 @@ class PropertyView(TimeStampedUUIDModel):
         indexes = [
             models.Index(fields=["user", "property"]),
             models.Index(fields=["ip_address", "property"]),
+            # daily rollups, see apps.analytics.rollups
+            models.Index(fields=["created_at"]),
         ]
 
 class PropertyLike(TimeStampedUUIDModel):
@@ -148,3 +232,18 @@ class PropertyLike(TimeStampedUUIDModel):
 
     class Meta:
         unique_together = ("property", "user")
+
+class BlockedNight(models.Model):
+    """
+    One row per night held by a reservation. Date searches read this table
+    instead of joining reservations.
+    """
+    property = models.ForeignKey(Property, related_name="blocked_nights", on_delete=models.CASCADE)
+    reservation = models.ForeignKey(Reservation, related_name="blocked_nights", on_delete=models.CASCADE)
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ("reservation", "date")
+        indexes = [
+            models.Index(fields=["date", "property"]),
+        ]
@@ -1,5 +1,143 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination keyed on (ordering field, pkid).
+
+    The first ordering term of the queryset is the key and pkid breaks ties,
+    so every page is an index range scan with no OFFSET and no COUNT(*).
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.key, self.descending = self.get_key(queryset)
+
+        tiebreak = "-pkid" if self.descending else "pkid"
+        order = f"-{self.key}" if self.descending else self.key
+        queryset = queryset.order_by(order, tiebreak)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pkid = self.decode_cursor(cursor, self.get_key_field(queryset))
+            op = "lt" if self.descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.key}__{op}": value})
+                | Q(**{self.key: value, f"pkid__{op}": pkid})
+            )
+
+        # one extra row tells us whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": None,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_key(self, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or [self.default_ordering]
+        first = ordering[0]
+        if not isinstance(first, str) or first.lstrip("-") == "pkid":
+            first = self.default_ordering
+        return first.lstrip("-"), first.startswith("-")
+
+    def get_key_field(self, queryset):
+        annotation = queryset.query.annotations.get(self.key)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(self.key)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(getattr(last, self.key), last.pkid),
+        )
+
+    def encode_cursor(self, value, pkid):
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps([value, pkid], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, field):
+        """
+        (value, pkid) with the value converted by the key's model `field`, so
+        a tampered cursor is a 404 here rather than an error in the query.
+        """
+        try:
+            value, pkid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value = field.to_python(value)
+            if value is None:
+                raise ValueError
+            return value, int(pkid)
+        except (TypeError, ValueError, OverflowError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
 
 class PropertyPagination(PageNumberPagination):
+    """
+    Page-number pagination by default. Passing `?pagination=cursor` (or a
+    `cursor`) switches to KeysetPagination, which never counts the table.
+    """
     page_size = 10
     page_size_query_param = "page_size"
+    max_page_size = 100
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get("pagination") == "cursor" or request.query_params.get("cursor"):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
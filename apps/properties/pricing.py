@@ -0,0 +1,101 @@
+"""
+Stay pricing. Pure functions over a property's pricing fields, shared by
+reservation creation and the quote endpoint.
+"""
+from dataclasses import asdict, dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+GUEST_SERVICE_FEE_RATE = getattr(settings, "GUEST_SERVICE_FEE_RATE", Decimal("0.10"))
+HOST_SERVICE_FEE_RATE = getattr(settings, "HOST_SERVICE_FEE_RATE", Decimal("0.02"))
+TAX_RATE = getattr(settings, "TAX_RATE", Decimal("0.03"))
+
+WEEKLY_STAY_NIGHTS = 7
+MONTHLY_STAY_NIGHTS = 28
+MAX_STAY_NIGHTS = getattr(settings, "MAX_STAY_NIGHTS", 365)
+
+CENT = Decimal("0.01")
+
+# Property fields the quote needs; fetch only these for batches
+PRICING_FIELDS = [
+    "pkid",
+    "id",
+    "status",
+    "guests",
+    "price_per_night",
+    "cleaning_fee",
+    "weekly_discount_rate",
+    "monthly_discount_rate",
+]
+
+
+@dataclass(frozen=True)
+class Quote:
+    number_of_nights: int
+    price_per_night: Decimal
+    long_stay_discount: Decimal
+    cleaning_fee: Decimal
+    guest_service_fee_rate: Decimal
+    host_service_fee_rate: Decimal
+    tax_rate: Decimal
+    subtotal: Decimal
+    discounted_subtotal: Decimal
+    guest_service_fee: Decimal
+    tax: Decimal
+    total_amount: Decimal
+    host_service_fee: Decimal
+    host_pay: Decimal
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def to_cents(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def long_stay_discount(property, number_of_nights):
+    if number_of_nights >= MONTHLY_STAY_NIGHTS:
+        return property.monthly_discount_rate
+    if number_of_nights >= WEEKLY_STAY_NIGHTS:
+        return property.weekly_discount_rate
+    return Decimal("0.00")
+
+
+def quote(property, start_date, end_date):
+    """
+    Every amount is rounded to the cent (half up) before it is summed, so
+    the totals equal the sum of the parts shown to the guest and host.
+    """
+    number_of_nights = (end_date - start_date).days
+    discount = long_stay_discount(property, number_of_nights)
+
+    price_per_night = property.price_per_night
+    cleaning_fee = property.cleaning_fee
+
+    subtotal = price_per_night * number_of_nights
+    discounted_subtotal = to_cents(subtotal - (subtotal * discount))
+    guest_service_fee = to_cents(discounted_subtotal * GUEST_SERVICE_FEE_RATE)
+    tax = to_cents((discounted_subtotal + cleaning_fee + guest_service_fee) * TAX_RATE)
+    total_amount = discounted_subtotal + cleaning_fee + guest_service_fee + tax
+
+    host_service_fee = to_cents(discounted_subtotal * HOST_SERVICE_FEE_RATE)
+    host_pay = (discounted_subtotal + cleaning_fee) - host_service_fee
+
+    return Quote(
+        number_of_nights=number_of_nights,
+        price_per_night=price_per_night,
+        long_stay_discount=discount,
+        cleaning_fee=cleaning_fee,
+        guest_service_fee_rate=GUEST_SERVICE_FEE_RATE,
+        host_service_fee_rate=HOST_SERVICE_FEE_RATE,
+        tax_rate=TAX_RATE,
+        subtotal=subtotal,
+        discounted_subtotal=discounted_subtotal,
+        guest_service_fee=guest_service_fee,
+        tax=tax,
+        total_amount=total_amount,
+        host_service_fee=host_service_fee,
+        host_pay=host_pay,
+    )
@@ -0,0 +1,282 @@
+"""
+Bulk reservation import/export for hosts.
+
+Import reads CSV or JSON Lines lazily and works in batches. Each batch is
+validated with one query each for properties, guests, codes and blocked
+nights, checked for overlaps while the property rows are locked, priced
+with pricing.quote and written with bulk_create. Export streams rows from
+a chunked iterator, so neither side holds the whole file or table.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+
+from apps.analytics.signals import refresh_property_days
+from apps.chat.models import Conversation
+
+from . import pricing, response_cache
+from .availability import BLOCKING_STATUSES, _nights, block_nights
+from .models import BlockedNight, Property, Reservation
+from .serializers import ReservationImportSerializer
+
+User = get_user_model()
+
+FORMATS = ["csv", "jsonl"]
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+
+# (column, lookup); the first columns are also valid import columns
+EXPORT_FIELDS = [
+    ("confirmation_code", "confirmation_code"),
+    ("property_id", "property__id"),
+    ("guest_email", "user__email"),
+    ("start_date", "start_date"),
+    ("end_date", "end_date"),
+    ("guests", "guests"),
+    ("status", "status"),
+    ("property_title", "property__title"),
+    ("checkin_time", "checkin_time"),
+    ("checkout_time", "checkout_time"),
+    ("number_of_nights", "number_of_nights"),
+    ("price_per_night", "price_per_night"),
+    ("long_stay_discount", "long_stay_discount"),
+    ("cleaning_fee", "cleaning_fee"),
+    ("total_amount", "total_amount"),
+    ("host_pay", "host_pay"),
+    ("created_at", "created_at"),
+]
+
+
+# ----------------------------
+# Import
+# ----------------------------
+def read_rows(stream, format):
+    """
+    Rows of a text stream as dicts. Empty values are dropped so defaults
+    apply; a malformed JSON line yields None and is reported as such.
+    """
+    if format == "csv":
+        rows = csv.DictReader(stream)
+    else:
+        rows = (_json_line(line) for line in stream if line.strip())
+
+    for row in rows:
+        if isinstance(row, dict):
+            row = {k: v for k, v in row.items() if k is not None and v not in ("", None)}
+        yield row
+
+
+def _json_line(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_reservations(host, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import rows for properties owned by `host`. Valid rows are created and
+    invalid ones are reported as {"row": 1-based data row, "errors": {...}}.
+    """
+    report = {"created": 0, "errors": []}
+
+    for batch in _batches(enumerate(rows, start=1), batch_size):
+        try:
+            created, errors = _import_batch(host, batch)
+        except IntegrityError as e:
+            # e.g. a confirmation code taken by a concurrent insert
+            created, errors = 0, [{"row": number, "errors": {"non_field_errors": [f"Batch failed: {e}"]}} for number, _ in batch]
+
+        report["created"] += created
+        report["errors"].extend(errors)
+
+    return report
+
+
+def _validate(batch):
+    valid, errors = [], []
+    for number, row in batch:
+        if row is None:
+            errors.append({"row": number, "errors": {"non_field_errors": ["Malformed row."]}})
+            continue
+
+        serializer = ReservationImportSerializer(data=row)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            data["guest_email"] = User.objects.normalize_email(data["guest_email"])
+            valid.append((number, data))
+        else:
+            errors.append({"row": number, "errors": serializer.errors})
+    return valid, errors
+
+
+def _import_batch(host, batch):
+    valid, errors = _validate(batch)
+    if not valid:
+        return 0, errors
+
+    with transaction.atomic():
+        # locked in pkid order like book_stay, so bookings can't slip in
+        properties = {
+            p.id: p
+            for p in Property.objects.select_for_update()
+            .filter(user=host, id__in={data["property_id"] for _, data in valid})
+            .order_by("pkid")
+        }
+        guests = {
+            u.email: u
+            for u in User.objects.filter(email__in={data["guest_email"] for _, data in valid}).only("pkid", "email")
+        }
+        taken_codes = set(
+            Reservation.objects.filter(
+                confirmation_code__in=[data["confirmation_code"] for _, data in valid if data.get("confirmation_code")]
+            ).values_list("confirmation_code", flat=True)
+        )
+        blocked = set(
+            BlockedNight.objects.filter(
+                property_id__in=[p.pkid for p in properties.values()],
+                date__gte=min(data["start_date"] for _, data in valid),
+                date__lt=max(data["end_date"] for _, data in valid),
+            ).values_list("property_id", "date")
+        )
+
+        reservations = []
+        for number, data in valid:
+            property = properties.get(data["property_id"])
+            guest = guests.get(data["guest_email"])
+            code = data.get("confirmation_code")
+
+            if property is None:
+                error = {"property_id": ["Property not found."]}
+            elif guest is None:
+                error = {"guest_email": ["No user with this email."]}
+            elif data["guests"] > property.guests:
+                error = {"guests": [f"This property allows at most {property.guests} guests."]}
+            elif code and code in taken_codes:
+                error = {"confirmation_code": ["Confirmation code already exists."]}
+            else:
+                error = None
+
+            nights = [(property.pkid, night) for night in _nights(data["start_date"], data["end_date"])] if property else []
+            if error is None and data["status"] in BLOCKING_STATUSES:
+                if blocked.intersection(nights):
+                    error = {"non_field_errors": ["Overlaps an existing reservation."]}
+                else:
+                    blocked.update(nights)
+
+            if error:
+                errors.append({"row": number, "errors": error})
+                continue
+
+            if code:
+                taken_codes.add(code)
+            quote = pricing.quote(property, data["start_date"], data["end_date"])
+            reservations.append(
+                Reservation(
+                    user=guest,
+                    property=property,
+                    status=data["status"],
+                    start_date=data["start_date"],
+                    end_date=data["end_date"],
+                    guests=data["guests"],
+                    confirmation_code=code or "",
+                    checkin_time=property.checkin_time,
+                    checkout_time=property.checkout_time,
+                    is_instant_booking=property.is_instant_booking,
+                    price_per_night=quote.price_per_night,
+                    number_of_nights=quote.number_of_nights,
+                    long_stay_discount=quote.long_stay_discount,
+                    cleaning_fee=quote.cleaning_fee,
+                    guest_service_fee_rate=quote.guest_service_fee_rate,
+                    host_service_fee_rate=quote.host_service_fee_rate,
+                    tax_rate=quote.tax_rate,
+                    total_amount=quote.total_amount,
+                    host_pay=quote.host_pay,
+                )
+            )
+
+        if reservations:
+            _create(reservations)
+
+    errors.sort(key=lambda error: error["row"])
+    return len(reservations), errors
+
+
+def _create(reservations):
+    # bulk_create skips post_save, so do what the signals and book_stay would
+    Reservation.objects.bulk_create(reservations)
+    block_nights([r for r in reservations if r.status in BLOCKING_STATUSES])
+
+    Conversation.objects.bulk_create(
+        [
+            Conversation(reservation=r, guest_id=r.user_id, landlord_id=r.property.user_id)
+            for r in reservations
+        ],
+        batch_size=IMPORT_BATCH_SIZE,
+    )
+
+    touched = {r.property_id for r in reservations}
+    Property.objects.filter(pkid__in=touched).update(
+        reservations_count=Subquery(
+            Reservation.objects.filter(property=OuterRef("pkid"))
+            .order_by()
+            .values("property")
+            .annotate(count=Count("pkid"))
+            .values("count")
+        )
+    )
+
+    property_ids = {r.property.id for r in reservations}
+    transaction.on_commit(lambda: [response_cache.invalidate_property(id) for id in property_ids])
+
+    # created today, so the range starts at the earliest stay or today
+    today = timezone.localdate()
+    for pkid in touched:
+        stays = [r for r in reservations if r.property_id == pkid]
+        refresh_property_days(
+            pkid,
+            min([today] + [r.start_date for r in stays]),
+            max([today] + [r.end_date for r in stays]),
+        )
+
+
+# ----------------------------
+# Export
+# ----------------------------
+def export_rows(queryset):
+    columns = [column for column, _ in EXPORT_FIELDS]
+    values = queryset.order_by("pkid").values_list(*[lookup for _, lookup in EXPORT_FIELDS])
+    for row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield dict(zip(columns, row))
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_rows(rows, format):
+    """
+    Encode rows lazily, one line per yield, for a StreamingHttpResponse.
+    """
+    if format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow([column for column, _ in EXPORT_FIELDS])
+        for row in rows:
+            yield writer.writerow(row.values())
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
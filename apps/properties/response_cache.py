@@ -0,0 +1,114 @@
+"""
+Public response cache for the property list and detail endpoints.
+
+Entries hold the anonymous representation (liked/reviewed = False) and are
+shared by every visitor; per-user flags are overlaid after a hit. Listing
+keys carry a global version that is bumped whenever a property, review or
+like changes, detail keys are deleted directly. See signals.py.
+"""
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.reviews.models import Review
+
+from .models import PropertyLike
+
+CACHE_TTL = 60 * 5
+LIST_VERSION_KEY = "property_cache:list_version"
+
+
+# ----------------------------
+# Keys / invalidation
+# ----------------------------
+def _list_version():
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(LIST_VERSION_KEY, version, None)
+    return version
+
+
+def list_cache_key(request):
+    # sorted params so ?a=1&b=2 and ?b=2&a=1 share an entry
+    params = sorted(
+        (k, v) for k in request.query_params for v in request.query_params.getlist(k)
+    )
+    raw = f"{request.get_host()}{request.path}?{urlencode(params)}"
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"property_cache:list:{_list_version()}:{digest}"
+
+
+def detail_cache_key(property_id):
+    return f"property_cache:detail:{property_id}"
+
+
+def invalidate_property(property_id=None):
+    cache.set(LIST_VERSION_KEY, time.time_ns(), None)
+    if property_id is not None:
+        cache.delete(detail_cache_key(property_id))
+
+
+# ----------------------------
+# Entries
+# ----------------------------
+def make_etag(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def make_entry(data, **extra):
+    return {"data": data, "etag": make_etag(data), **extra}
+
+
+def get_entry(key):
+    return cache.get(key)
+
+
+def set_entry(key, entry):
+    cache.set(key, entry, CACHE_TTL)
+
+
+# ----------------------------
+# Per-user overlay
+# ----------------------------
+def overlay_liked(results, user):
+    """
+    Copy `results` with `liked` resolved for `user` in one query.
+    Returns (results, liked ids) so the ids can feed the ETag.
+    """
+    if not user.is_authenticated or not results:
+        return results, []
+
+    liked = set(
+        str(pid)
+        for pid in PropertyLike.objects.filter(
+            user=user,
+            property__id__in=[item["id"] for item in results],
+        ).values_list("property__id", flat=True)
+    )
+    return [{**item, "liked": str(item["id"]) in liked} for item in results], sorted(liked)
+
+
+def detail_flags(property_pkid, user):
+    if not user.is_authenticated:
+        return {"liked": False, "reviewed": False}
+    return {
+        "liked": PropertyLike.objects.filter(property_id=property_pkid, user=user).exists(),
+        "reviewed": Review.objects.filter(property_id=property_pkid, user=user).exists(),
+    }
+
+
+def conditional_response(request, data, etag):
+    """
+    304 when the client already holds this representation.
+    """
+    headers = {"ETag": etag, "Vary": "Cookie"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
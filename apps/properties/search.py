@@ -0,0 +1,70 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+SEARCH_CONFIG = "simple"
+
+# fields that feed the search box, location first
+SEARCH_FIELDS = {"title", "location", "category"}
+
+SEARCH_VECTOR = (
+    SearchVector("location", weight="A", config=SEARCH_CONFIG)
+    + SearchVector("title", weight="B", config=SEARCH_CONFIG)
+    + SearchVector("category", weight="C", config=SEARCH_CONFIG)
+)
+
+
+def uses_full_text_search():
+    return connection.vendor == "postgresql"
+
+
+def update_search_vector(queryset):
+    """
+    Recompute the stored search vector for the given properties.
+    No-op on databases without tsvector support.
+    """
+    if uses_full_text_search():
+        queryset.update(search_vector=SEARCH_VECTOR)
+
+
+def _prefix_query(value):
+    # "mak cit" -> "mak:* & cit:*" so results show up while typing
+    terms = re.findall(r"\w+", value)
+    if not terms:
+        return None
+    return SearchQuery(
+        " & ".join(f"{term}:*" for term in terms),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+
+
+def search_properties(queryset, value):
+    """
+    Filter by the search box value and annotate `search_rank`.
+
+    PostgreSQL matches against the indexed search vector. Other databases
+    fall back to icontains with a fixed rank per matched field.
+    """
+    if uses_full_text_search():
+        query = _prefix_query(value)
+        if query is None:
+            return queryset
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+
+    return queryset.filter(
+        Q(location__icontains=value)
+        | Q(title__icontains=value)
+        | Q(category__icontains=value)
+    ).annotate(
+        search_rank=Case(
+            When(location__icontains=value, then=Value(1.0)),
+            When(title__icontains=value, then=Value(0.4)),
+            default=Value(0.2),
+            output_field=FloatField(),
+        )
+    )
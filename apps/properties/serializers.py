@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Property, Reservation, PropertyLike, PropertyTag, PropertyStatus
+from . import pricing
+from .models import Property, Reservation, PropertyLike, PropertyTag, PropertyStatus, ReservationStatus
 
 from apps.profiles.serializers import ProfileSerializer
 from apps.reviews.serializers import ReviewSerializer
@@ -42,6 +43,9 @@ class PropertyListSerializer(serializers.ModelSerializer):
         return None
     
     def get_liked(self, obj):
+        # annotated by PropertyQuerySet.with_liked on listing views
+        if hasattr(obj, "user_liked"):
+            return obj.user_liked
         user = self.context["request"].user
         if user.is_authenticated:
             return obj.likes.filter(user=user).exists()
@@ -88,12 +92,18 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ["__all__"]
 
     def get_liked(self, obj):
+        # annotated by PropertyQuerySet.with_liked in PropertyDetailView
+        if hasattr(obj, "user_liked"):
+            return obj.user_liked
         user = self.context["request"].user
         if user.is_authenticated:
             return obj.likes.filter(user=user).exists()
         return False
 
     def get_reviewed(self, obj):
+        # annotated by PropertyQuerySet.with_reviewed in PropertyDetailView
+        if hasattr(obj, "user_reviewed"):
+            return obj.user_reviewed
         user = self.context["request"].user
         if user.is_authenticated:
             return obj.reviews.filter(user=user).exists()
@@ -121,6 +131,19 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
         ]
     # Use field 'image' for creating instance of property
         
+def validate_stay(attrs):
+    """
+    Check the stay's dates: at least one night, at most MAX_STAY_NIGHTS.
+    """
+    start_date, end_date = attrs.get("start_date"), attrs.get("end_date")
+    if start_date is None or end_date is None:
+        return attrs
+    if end_date <= start_date:
+        raise serializers.ValidationError({"end_date": "end_date must be after start_date."})
+    if (end_date - start_date).days > pricing.MAX_STAY_NIGHTS:
+        raise serializers.ValidationError({"end_date": f"Stays are limited to {pricing.MAX_STAY_NIGHTS} nights."})
+    return attrs
+
 class ReservationSerializer(serializers.ModelSerializer):
     user = ProfileSerializer(source="user.profile", read_only=True)
     property = PropertyDetailSerializer(read_only=True)
@@ -167,6 +190,9 @@ class ReservationSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
 
+    def validate(self, attrs):
+        return validate_stay(attrs)
+
 class PropertyLikeSerializer(serializers.ModelSerializer):
     id = serializers.SerializerMethodField()
 
@@ -182,4 +208,40 @@ class PropertyStatusUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        fields = ["status"]
\ No newline at end of file
+        fields = ["status"]
+
+class QuoteRequestSerializer(serializers.Serializer):
+    property_id = serializers.UUIDField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, attrs):
+        return validate_stay(attrs)
+
+class QuoteSerializer(serializers.Serializer):
+    number_of_nights = serializers.IntegerField()
+    price_per_night = serializers.DecimalField(max_digits=8, decimal_places=2)
+    long_stay_discount = serializers.DecimalField(max_digits=4, decimal_places=2)
+    cleaning_fee = serializers.DecimalField(max_digits=6, decimal_places=2)
+    guest_service_fee_rate = serializers.DecimalField(max_digits=4, decimal_places=2)
+    host_service_fee_rate = serializers.DecimalField(max_digits=4, decimal_places=2)
+    tax_rate = serializers.DecimalField(max_digits=4, decimal_places=2)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discounted_subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    guest_service_fee = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tax = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class ReservationImportSerializer(serializers.Serializer):
+    property_id = serializers.UUIDField()
+    guest_email = serializers.EmailField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=ReservationStatus.choices, default=ReservationStatus.APPROVED)
+    confirmation_code = serializers.CharField(max_length=16, required=False)
+
+    def validate(self, attrs):
+        return validate_stay(attrs)
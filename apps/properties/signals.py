@@ -1,9 +1,14 @@
 from decimal import Decimal
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.db.models import Avg
 from django.dispatch import receiver
+from django.db import transaction
 
-from .models import Property
+from .models import Property, Reservation, PropertyLike
+from .availability import sync_blocked_nights
+from .search import SEARCH_FIELDS, update_search_vector
+from .response_cache import invalidate_property
+from .tasks import schedule_transition
 
 from apps.reviews.models import Review
 from apps.profiles.models import HostStatus
@@ -18,6 +23,7 @@ def update_property_average_rating(property_instance):
     )['avg_rating'] or 0
     property_instance.average_rating = Decimal(avg).quantize(Decimal('0.01'))
     property_instance.save(update_fields=['average_rating'])
+    # the save above also invalidates the cached responses
 
 @receiver(post_save, sender=Review)
 def update_average_on_save(sender, instance, **kwargs):
@@ -53,3 +59,41 @@ def set_host_onboarding_after_listing_created(sender, instance: Property, create
     if profile.host_status != HostStatus.ONBOARDING:
         profile.host_status = HostStatus.ONBOARDING
         profile.save(update_fields=["host_status"])
+
+
+@receiver(post_save, sender=Reservation)
+def sync_availability_on_save(sender, instance: Reservation, **kwargs):
+    sync_blocked_nights(instance)
+
+@receiver(post_save, sender=Reservation)
+def schedule_reservation_transition(sender, instance: Reservation, **kwargs):
+    # created (PENDING/APPROVED) or approved: arm the next lifecycle timer
+    transaction.on_commit(lambda: schedule_transition(instance))
+
+
+@receiver(post_save, sender=Property)
+def update_search_vector_on_save(sender, instance: Property, created: bool, update_fields=None, **kwargs):
+    # counter updates use update_fields and don't touch searchable text
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+
+    update_search_vector(Property.objects.filter(pkid=instance.pkid))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_cached_property(sender, instance: Property, **kwargs):
+    invalidate_property(instance.id)
+
+@receiver(m2m_changed, sender=Property.tags.through)
+def invalidate_cached_property_tags(sender, instance, action, **kwargs):
+    if action.startswith("post_") and isinstance(instance, Property):
+        invalidate_property(instance.id)
+
+@receiver(post_save, sender=PropertyLike)
+@receiver(post_delete, sender=PropertyLike)
+def invalidate_cached_property_like(sender, instance: PropertyLike, **kwargs):
+    # `liked` is overlaid per user and likes_count is saved on the property,
+    # which drops its detail entry, so don't fetch the property just for its id
+    property_id = instance.property.id if PropertyLike.property.is_cached(instance) else None
+    invalidate_property(property_id)
@@ -1,66 +1,220 @@
+import logging
+import time
 from celery import shared_task
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
 from django.utils import timezone
+from django.utils.dateparse import parse_time
 from datetime import datetime, timedelta
 from .models import Reservation, ReservationStatus
+from .availability import release_nights
+from .view_buffer import flush_views
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_BATCH_SIZE = 1000
+
+# PENDING requests expire this long after they are made
+PENDING_EXPIRY = timedelta(hours=24)
+
+# Transition jobs are enqueued with an ETA only once the event is this close.
+# The reconciliation sweep runs more often than this, so every event gets a
+# timer before it is due without parking months of ETAs in the broker.
+SCHEDULE_HORIZON = timedelta(minutes=20)
+
+
+# ------------------------------------
+# Event-driven transitions
+# ------------------------------------
+def _local_datetime(day, at):
+    # unsaved/unrefreshed instances can still hold the "15:00" field default
+    if isinstance(at, str):
+        at = parse_time(at)
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def due_status(reservation, now):
+    """
+    Status the reservation should be in at `now`, or None if unchanged.
+    """
+    status = reservation.status
+    if status == ReservationStatus.PENDING:
+        if now >= reservation.created_at + PENDING_EXPIRY:
+            return ReservationStatus.EXPIRED
+        return None
+
+    if status in [ReservationStatus.APPROVED, ReservationStatus.ONGOING]:
+        if now > _local_datetime(reservation.end_date, reservation.checkout_time):
+            return ReservationStatus.COMPLETED
+        if status == ReservationStatus.APPROVED and now >= _local_datetime(reservation.start_date, reservation.checkin_time):
+            return ReservationStatus.ONGOING
+    return None
+
+
+def next_transition_at(reservation):
+    status = reservation.status
+    if status == ReservationStatus.PENDING:
+        return reservation.created_at + PENDING_EXPIRY
+    if status == ReservationStatus.APPROVED:
+        return _local_datetime(reservation.start_date, reservation.checkin_time)
+    if status == ReservationStatus.ONGOING:
+        # completes once checkout has passed
+        return _local_datetime(reservation.end_date, reservation.checkout_time) + timedelta(seconds=1)
+    return None
+
+
+def schedule_transition(reservation, now=None):
+    """
+    Enqueue the reservation's next transition if it falls inside the
+    horizon. Later events are picked up by the sweep.
+    """
+    now = now or timezone.now()
+    at = next_transition_at(reservation)
+    if at is None or at > now + SCHEDULE_HORIZON:
+        return False
+
+    transition_reservation_task.apply_async((reservation.pkid,), eta=max(at, now))
+    return True
 
 
 @shared_task
-def update_reservations_status_task():
+def transition_reservation_task(reservation_pkid):
+    """
+    Apply whatever transition is due. Idempotent: the update is guarded by
+    the status that was read, so duplicate or late deliveries are no-ops.
+    The row is locked, as in approve/decline, so a host action can't slip
+    in between.
+    """
     now = timezone.now()
 
-    # ------------------------------------
-    # 1. COMPLETE RESERVATIONS
-    # ------------------------------------
-    completed = []
-
-    for r in Reservation.objects.filter(
-        status__in=[ReservationStatus.APPROVED, ReservationStatus.ONGOING]
-    ):
-        checkout_dt = timezone.make_aware(
-            datetime.combine(r.end_date, r.checkout_time)
+    with transaction.atomic():
+        reservation = (
+            Reservation.objects.select_for_update()
+            .filter(pkid=reservation_pkid)
+            .first()
         )
+        if reservation is None:
+            return
 
-        if now > checkout_dt:
-            completed.append(r.id)
+        target = due_status(reservation, now)
+        if target is not None:
+            Reservation.objects.filter(pkid=reservation.pkid, status=reservation.status).update(status=target, updated_at=Now())
+            if target == ReservationStatus.EXPIRED:
+                release_nights([reservation.pkid])
+            reservation.status = target
 
-    Reservation.objects.filter(id__in=completed).update(
-        status=ReservationStatus.COMPLETED
-    )
+    # e.g. now ONGOING -> arm completion. A timer that fired early is left
+    # to the sweep rather than re-armed, so it can't spin.
+    if target is not None:
+        schedule_transition(reservation, now)
+    return target
 
-    # ------------------------------------
-    # 2. MARK ONGOING
-    # ------------------------------------
-    ongoing = []
 
-    for r in Reservation.objects.filter(
-        status=ReservationStatus.APPROVED
-    ):
-        checkin_dt = timezone.make_aware(
-            datetime.combine(r.start_date, r.checkin_time)
-        )
-        checkout_dt = timezone.make_aware(
-            datetime.combine(r.end_date, r.checkout_time)
-        )
+def _timed(label, update):
+    start = time.monotonic()
+    count = update()
+    logger.info("reservation status: %s=%d in %.1fms", label, count, (time.monotonic() - start) * 1000)
+    return count
+
 
-        if checkin_dt <= now <= checkout_dt:
-            ongoing.append(r.id)
+def _complete(today, now_time):
+    # checkout (end_date + checkout_time, local time) has passed
+    return Reservation.objects.filter(
+        Q(end_date__lt=today) | Q(end_date=today, checkout_time__lt=now_time),
+        status__in=[ReservationStatus.APPROVED, ReservationStatus.ONGOING],
+    ).update(status=ReservationStatus.COMPLETED, updated_at=Now())
 
-    Reservation.objects.filter(id__in=ongoing).update(
-        status=ReservationStatus.ONGOING
+
+def _start(today, now_time):
+    # checked in and not yet checked out (completed ones were moved above)
+    return Reservation.objects.filter(
+        Q(start_date__lt=today) | Q(start_date=today, checkin_time__lte=now_time),
+        status=ReservationStatus.APPROVED,
+    ).update(status=ReservationStatus.ONGOING, updated_at=Now())
+
+
+def _expire(expiration_time):
+    """
+    Expire PENDING reservations older than 24h in bounded batches. Rows are
+    locked, and approve/decline lock the row before checking it is still
+    PENDING, so neither can overwrite the other.
+    """
+    expired = 0
+    while True:
+        with transaction.atomic():
+            pkids = list(
+                Reservation.objects.select_for_update(skip_locked=True)
+                .filter(status=ReservationStatus.PENDING, created_at__lt=expiration_time)
+                .values_list("pkid", flat=True)[:EXPIRE_BATCH_SIZE]
+            )
+            if not pkids:
+                return expired
+
+            # update() skips post_save, so free the nights here
+            expired += Reservation.objects.filter(pkid__in=pkids).update(
+                status=ReservationStatus.EXPIRED, updated_at=Now()
+            )
+            release_nights(pkids)
+
+
+def _between(date_field, time_field, start, end):
+    """
+    Rows whose local (date, time) falls in (start, end].
+    """
+    return (
+        (Q(**{f"{date_field}__gt": start.date()}) | Q(**{date_field: start.date(), f"{time_field}__gt": start.time()}))
+        & (Q(**{f"{date_field}__lt": end.date()}) | Q(**{date_field: end.date(), f"{time_field}__lte": end.time()}))
     )
 
-    # ------------------------------------
-    # 3. EXPIRE PENDING > 24 HOURS
-    # ------------------------------------
-    expiration_time = now - timedelta(hours=24)
 
-    expired_count = Reservation.objects.filter(
-        status=ReservationStatus.PENDING,
-        created_at__lt=expiration_time
-    ).update(status=ReservationStatus.EXPIRED)
+def _schedule_upcoming(now):
+    """
+    Enqueue timers for transitions due within the horizon.
+    """
+    local_now = timezone.localtime(now)
+    local_end = timezone.localtime(now + SCHEDULE_HORIZON)
+
+    upcoming = Reservation.objects.filter(
+        Q(status=ReservationStatus.PENDING, created_at__gt=now - PENDING_EXPIRY, created_at__lte=now + SCHEDULE_HORIZON - PENDING_EXPIRY)
+        | Q(_between("start_date", "checkin_time", local_now, local_end), status=ReservationStatus.APPROVED)
+        | Q(_between("end_date", "checkout_time", local_now, local_end), status=ReservationStatus.ONGOING)
+    ).only("pkid", "status", "created_at", "start_date", "end_date", "checkin_time", "checkout_time")
+
+    scheduled = 0
+    for reservation in upcoming.iterator():
+        scheduled += schedule_transition(reservation, now)
+    return scheduled
+
+
+@shared_task
+def update_reservations_status_task():
+    """
+    Reconciliation sweep for the event-driven transitions.
+
+    Catches up anything whose timer was missed with set-based updates, then
+    enqueues timers for events due within SCHEDULE_HORIZON. Reservation
+    dates/times are wall-clock times in the site timezone (TIME_ZONE), so
+    they are compared against the local date and time.
+    """
+    now = timezone.now()
+    local_now = timezone.localtime(now)
+    today, now_time = local_now.date(), local_now.time()
+
+    completed = _timed("completed", lambda: _complete(today, now_time))
+    ongoing = _timed("ongoing", lambda: _start(today, now_time))
+    expired_count = _timed("expired", lambda: _expire(now - PENDING_EXPIRY))
+    scheduled = _timed("scheduled", lambda: _schedule_upcoming(now))
 
     return (
-        f"Completed {len(completed)}, "
-        f"Marked {len(ongoing)} Ongoing, "
-        f"Expired {expired_count}"
+        f"Completed {completed}, "
+        f"Marked {ongoing} Ongoing, "
+        f"Expired {expired_count}, "
+        f"Scheduled {scheduled}"
     )
+
+
+@shared_task
+def flush_property_views_task():
+    written = flush_views()
+    return f"Flushed {written} property views"
@@ -1,3 +1,807 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, modify_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.chat.models import Conversation
+from apps.reviews.models import Review
+
+from . import pricing, reservation_io, response_cache, search, tasks, view_buffer
+from .booking import BookingConflict, book_stay
+from .models import (
+    CONFIRMATION_CODE_ATTEMPTS,
+    BlockedNight,
+    Property,
+    PropertyLike,
+    PropertyStatus,
+    PropertyView,
+    Reservation,
+    ReservationStatus,
+)
+
+User = get_user_model()
+
+# silk records its own queries on every request
+NO_SILK = modify_settings(MIDDLEWARE={"remove": "silk.middleware.SilkyMiddleware"})
+
+
+def make_user(email):
+    return User.objects.create_user(email=email, password=None, first_name="Test", last_name="User")
+
+
+def make_property(user, title="Test property", **fields):
+    fields.setdefault("status", PropertyStatus.ACTIVE)
+    fields.setdefault("location", "Manila")
+    fields.setdefault("category", "Test")
+    return Property.objects.create(
+        user=user,
+        title=title,
+        description="test",
+        bedrooms=1,
+        beds=1,
+        bathrooms=1,
+        guests=2,
+        **fields,
+    )
+
+
+def login(client, user):
+    client.cookies["access_token"] = str(AccessToken.for_user(user))
+
+
+@NO_SILK
+class PropertyListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        for i in range(25):
+            property = make_property(cls.host, title=f"Property {i}")
+            if i % 2:
+                PropertyLike.objects.create(property=property, user=cls.guest)
+
+    def setUp(self):
+        cache.clear()
+        login(self.client, self.guest)
+
+    def test_constant_queries_per_page(self):
+        # auth user, COUNT(*), page
+        for page_size in (5, 20):
+            cache.clear()
+            with self.assertNumQueries(3):
+                response = self.client.get("/api/v1/properties/", {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+            self.assertTrue(any(item["liked"] for item in response.data["results"]))
+
+    def test_constant_queries_per_cursor_page(self):
+        # auth user, page (no COUNT(*))
+        for page_size in (5, 20):
+            cache.clear()
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/v1/properties/", {"pagination": "cursor", "page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+
+
+@NO_SILK
+class UserFavoritesQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.few = make_user("few@example.com")
+        cls.many = make_user("many@example.com")
+        for i in range(20):
+            property = make_property(cls.host, title=f"Property {i}")
+            PropertyLike.objects.create(property=property, user=cls.many)
+            if i < 3:
+                PropertyLike.objects.create(property=property, user=cls.few)
+
+    def test_constant_queries_per_favorite(self):
+        for user, expected in ((self.few, 3), (self.many, 20)):
+            login(self.client, user)
+            # auth user, favorites
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/v1/properties/likes/")
+            self.assertEqual(len(response.data), expected)
+            self.assertTrue(all(item["liked"] for item in response.data))
+
+
+@NO_SILK
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        for i in range(5):
+            make_property(cls.host, title=f"Property {i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_next_cursor_round_trip(self):
+        first = self.client.get("/api/v1/properties/", {"pagination": "cursor", "page_size": 3})
+        second = self.client.get(first.data["next"])
+        self.assertEqual(second.status_code, 200)
+        titles = [p["title"] for p in first.data["results"] + second.data["results"]]
+        self.assertEqual(titles, [f"Property {i}" for i in range(4, -1, -1)])
+
+    def test_invalid_cursor_is_404(self):
+        cursors = [
+            "not base64!",
+            "WyJhYmMiLCAxXQ==",  # ["abc", 1]
+            base64.urlsafe_b64encode(b'["2026-01-01T00:00:00+00:00", "x"]').decode(),
+            base64.urlsafe_b64encode(b"[null, 1]").decode(),
+            base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/v1/properties/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+@NO_SILK
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = make_user("host@example.com")
+        # "makati" in the location, the title, the category, or nowhere
+        make_property(host, title="By the category", category="Makati lofts")
+        make_property(host, title="By the location", location="Makati City")
+        make_property(host, title="Near Makati")
+        make_property(host, title="Elsewhere")
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, **params):
+        response = self.client.get("/api/v1/properties/", params)
+        return [item["title"] for item in response.data["results"]]
+
+    def test_relevance_order(self):
+        # location before title before category
+        self.assertEqual(self.titles(location="makati"), ["By the location", "Near Makati", "By the category"])
+
+    def test_explicit_ordering_wins(self):
+        titles = self.titles(location="makati", ordering="created_at")
+        self.assertEqual(titles, ["By the category", "By the location", "Near Makati"])
+
+    @skipIf(search.uses_full_text_search(), "icontains fallback")
+    def test_fallback_matches_substrings(self):
+        self.assertEqual(search.search_properties(Property.objects.all(), "akat").count(), 3)
+        self.assertEqual(self.titles(location="nowhere"), [])
+
+    @skipUnless(search.uses_full_text_search(), "PostgreSQL full-text search")
+    def test_prefix_matches_while_typing(self):
+        self.assertEqual(self.titles(location="mak"), ["By the location", "Near Makati", "By the category"])
+        self.assertEqual(self.titles(location="near mak"), ["Near Makati"])
+
+
+@NO_SILK
+@mock.patch.object(tasks.transition_reservation_task, "apply_async")
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.booked, cls.adjacent, cls.free = (
+            make_property(cls.host, title=title) for title in ("Booked", "Adjacent", "Free")
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def book(self, property, start, end, status=ReservationStatus.APPROVED):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                user=self.guest,
+                property=property,
+                status=status,
+                start_date=start,
+                end_date=end,
+                number_of_nights=(end - start).days,
+                guests=1,
+            )
+
+    def available(self, start, end):
+        response = self.client.get("/api/v1/properties/", {"start_date": start, "end_date": end})
+        return sorted(item["title"] for item in response.data["results"])
+
+    def test_search_excludes_only_blocked_properties(self, apply_async):
+        self.book(self.booked, date(2027, 1, 10), date(2027, 1, 13))
+        self.book(self.adjacent, date(2027, 1, 13), date(2027, 1, 15))
+        self.book(self.free, date(2027, 1, 10), date(2027, 1, 13), status=ReservationStatus.DECLINED)
+
+        self.assertEqual(self.available("2027-01-11", "2027-01-12"), ["Adjacent", "Free"])
+        # checkout day is free for the next guest
+        self.assertEqual(self.available("2027-01-13", "2027-01-14"), ["Booked", "Free"])
+        self.assertEqual(self.available("2027-01-09", "2027-01-16"), ["Free"])
+        self.assertEqual(self.available("2027-02-01", "2027-02-05"), ["Adjacent", "Booked", "Free"])
+
+    def test_declining_releases_the_nights(self, apply_async):
+        reservation = self.book(self.booked, date(2027, 1, 10), date(2027, 1, 13), status=ReservationStatus.PENDING)
+        self.assertEqual(self.available("2027-01-11", "2027-01-12"), ["Adjacent", "Free"])
+
+        login(self.client, self.host)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/v1/properties/reservation/{reservation.id}/decline/")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(BlockedNight.objects.exists())
+        self.assertEqual(self.available("2027-01-11", "2027-01-12"), ["Adjacent", "Booked", "Free"])
+
+    def test_expiring_releases_the_nights(self, apply_async):
+        reservation = self.book(self.booked, date(2027, 1, 10), date(2027, 1, 13), status=ReservationStatus.PENDING)
+        Reservation.objects.filter(pkid=reservation.pkid).update(created_at=timezone.now() - timedelta(hours=25))
+        self.assertEqual(self.available("2027-01-11", "2027-01-12"), ["Adjacent", "Free"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.update_reservations_status_task()
+
+        self.assertFalse(BlockedNight.objects.exists())
+        self.assertEqual(self.available("2027-01-11", "2027-01-12"), ["Adjacent", "Booked", "Free"])
+
+
+@NO_SILK
+class ResponseCacheTests(TestCase):
+    list_url = "/api/v1/properties/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.property = make_property(cls.host, title="Cached")
+        cls.other = make_property(cls.host, title="Other")
+        cls.detail_url = f"/api/v1/properties/{cls.property.id}/"
+
+    def setUp(self):
+        cache.clear()
+
+    def detail_cached(self):
+        return response_cache.get_entry(response_cache.detail_cache_key(self.property.id)) is not None
+
+    def test_etag_and_304(self):
+        for url in (self.list_url, self.detail_url):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+    def test_user_flags_on_a_cache_hit(self):
+        PropertyLike.objects.create(property=self.property, user=self.guest)
+        Review.objects.create(property=self.property, user=self.guest, rating=4)
+        anonymous = self.client.get(self.detail_url)
+        self.client.get(self.list_url)
+        self.assertTrue(self.detail_cached())
+
+        login(self.client, self.guest)
+        detail = self.client.get(self.detail_url)
+        self.assertEqual((detail.data["liked"], detail.data["reviewed"]), (True, True))
+        self.assertNotEqual(detail["ETag"], anonymous["ETag"])
+        liked = {item["title"]: item["liked"] for item in self.client.get(self.list_url).data["results"]}
+        self.assertEqual(liked, {"Cached": True, "Other": False})
+
+        # and the shared entry still holds the anonymous flags
+        self.client.cookies.clear()
+        detail = self.client.get(self.detail_url)
+        self.assertEqual((detail.data["liked"], detail.data["reviewed"]), (False, False))
+
+    def test_property_save_and_delete_invalidate(self):
+        self.client.get(self.detail_url)
+        self.property.title = "Renamed"
+        self.property.save()
+        self.assertFalse(self.detail_cached())
+        titles = [item["title"] for item in self.client.get(self.list_url).data["results"]]
+        self.assertIn("Renamed", titles)
+        self.assertEqual(self.client.get(self.detail_url).data["title"], "Renamed")
+
+        self.other.delete()
+        titles = [item["title"] for item in self.client.get(self.list_url).data["results"]]
+        self.assertEqual(titles, ["Renamed"])
+
+    def test_like_and_review_changes_invalidate_listings(self):
+        changes = [
+            lambda: PropertyLike.objects.create(property=self.property, user=self.guest),
+            lambda: PropertyLike.objects.get().delete(),
+            lambda: Review.objects.create(property=self.property, user=self.guest, rating=5),
+            lambda: Review.objects.get().delete(),
+        ]
+        for change in changes:
+            self.client.get(self.list_url)
+            version = response_cache._list_version()
+            change()
+            self.assertNotEqual(response_cache._list_version(), version)
+
+        # the review save refreshed average_rating, which drops the detail entry
+        self.client.get(self.detail_url)
+        Review.objects.create(property=self.property, user=self.guest, rating=3)
+        self.assertFalse(self.detail_cached())
+        self.assertEqual(self.client.get(self.detail_url).data["average_rating"], "3.00")
+
+    def test_like_invalidation_does_not_fetch_the_property(self):
+        like = PropertyLike.objects.create(property=self.property, user=self.guest)
+        like = PropertyLike.objects.get(pkid=like.pkid)
+        with CaptureQueriesContext(connection) as queries:
+            like.delete()
+        # (the dashboard signal reads only the host's user_id)
+        self.assertFalse([q for q in queries if '"properties_property"."id"' in q["sql"]])
+
+
+class ViewBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.property = make_property(cls.host)
+
+    def setUp(self):
+        self.store = view_buffer.InMemoryViewStore()
+        patcher = mock.patch.object(view_buffer, "_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_missing_or_invalid_ip_is_not_buffered(self):
+        for ip in (None, "", "unknown"):
+            self.assertFalse(view_buffer.record_view(self.property.pkid, None, ip))
+        self.assertEqual(self.store.drain(10), [])
+
+    def test_failed_flush_keeps_the_batch(self):
+        view_buffer.record_view(self.property.pkid, None, "10.0.0.1")
+        view_buffer.record_view(self.property.pkid, None, "10.0.0.2")
+
+        with mock.patch.object(PropertyView.objects, "bulk_create", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                view_buffer.flush_views()
+
+        self.assertEqual(view_buffer.flush_views(), 2)
+        self.assertEqual(PropertyView.objects.filter(property=self.property).count(), 2)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.views_count, 2)
+
+
+class QuoteTests(SimpleTestCase):
+    start = date(2026, 3, 1)
+
+    def quote(self, nights, **fields):
+        fields.setdefault("price_per_night", Decimal("100.00"))
+        property = Property(**fields)
+        return pricing.quote(property, self.start, self.start + timedelta(days=nights))
+
+    def test_long_stay_discount_thresholds(self):
+        for nights, discount in ((6, "0.00"), (7, "0.10"), (27, "0.10"), (28, "0.20")):
+            with self.subTest(nights=nights):
+                quote = self.quote(nights)
+                self.assertEqual(quote.long_stay_discount, Decimal(discount))
+                self.assertEqual(quote.discounted_subtotal, Decimal(100 * nights) * (1 - Decimal(discount)))
+
+    def test_cleaning_fee(self):
+        quote = self.quote(2, cleaning_fee=Decimal("50.00"))
+        # fee on the nights only; tax on nights + cleaning + fee
+        self.assertEqual(quote.guest_service_fee, Decimal("20.00"))
+        self.assertEqual(quote.tax, Decimal("8.10"))
+        self.assertEqual(quote.total_amount, Decimal("278.10"))
+        self.assertEqual(quote.host_service_fee, Decimal("4.00"))
+        self.assertEqual(quote.host_pay, Decimal("246.00"))
+
+    def test_amounts_round_to_cents(self):
+        quote = self.quote(1, price_per_night=Decimal("33.33"))
+        self.assertEqual(quote.guest_service_fee, Decimal("3.33"))
+        self.assertEqual(quote.tax, Decimal("1.10"))
+        self.assertEqual(quote.host_service_fee, Decimal("0.67"))
+        self.assertEqual(quote.total_amount, Decimal("37.76"))
+        self.assertEqual(quote.host_pay, Decimal("32.66"))
+        self.assertEqual(
+            quote.total_amount,
+            quote.discounted_subtotal + quote.cleaning_fee + quote.guest_service_fee + quote.tax,
+        )
+
+    def test_half_cent_rounds_up(self):
+        # 10.05 * 0.10 = 1.005
+        self.assertEqual(self.quote(1, price_per_night=Decimal("10.05")).guest_service_fee, Decimal("1.01"))
+
+
+@NO_SILK
+class QuoteViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.property = make_property(cls.host, price_per_night=Decimal("100.00"))
+
+    def post(self, nights, start=date(2026, 3, 1)):
+        item = {
+            "property_id": str(self.property.id),
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=nights)).isoformat(),
+        }
+        return self.client.post("/api/v1/properties/quote/", {"items": [item]}, content_type="application/json")
+
+    def test_quote(self):
+        response = self.post(7)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["quote"]["total_amount"], "713.79")
+
+    def test_stay_length_is_capped(self):
+        self.assertEqual(self.post(pricing.MAX_STAY_NIGHTS).status_code, 200)
+        self.assertEqual(self.post(pricing.MAX_STAY_NIGHTS + 1).status_code, 400)
+        self.assertEqual(self.post((date(9999, 1, 1) - date(2026, 3, 1)).days).status_code, 400)
+
+    def test_booking_stay_length_is_capped(self):
+        guest = make_user("guest@example.com")
+        login(self.client, guest)
+        response = self.client.post("/api/v1/properties/reservation/", {
+            "property_id": str(self.property.id),
+            "start_date": "2026-03-01",
+            "end_date": "9999-03-01",
+            "guests": 1,
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Reservation.objects.exists())
+
+
+def local(day, at):
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+class DueStatusTests(SimpleTestCase):
+    checkin = local(date(2027, 1, 1), time(15))
+    checkout = local(date(2027, 1, 3), time(11))
+    tick = timedelta(microseconds=1)
+
+    def reservation(self, status, **fields):
+        return Reservation(
+            status=status,
+            start_date=date(2027, 1, 1),
+            end_date=date(2027, 1, 3),
+            checkin_time=time(15),
+            checkout_time=time(11),
+            **fields,
+        )
+
+    def assertDue(self, reservation, expected):
+        for now, status in expected:
+            with self.subTest(status=reservation.status, now=now):
+                self.assertEqual(tasks.due_status(reservation, now), status)
+
+    def test_pending_expires_after_24h(self):
+        created = local(date(2026, 12, 1), time(9))
+        reservation = self.reservation(ReservationStatus.PENDING, created_at=created)
+
+        expires = created + tasks.PENDING_EXPIRY
+        self.assertEqual(tasks.next_transition_at(reservation), expires)
+        self.assertDue(reservation, [(expires - self.tick, None), (expires, ReservationStatus.EXPIRED)])
+
+    def test_approved_starts_at_checkin(self):
+        reservation = self.reservation(ReservationStatus.APPROVED)
+
+        self.assertEqual(tasks.next_transition_at(reservation), self.checkin)
+        self.assertDue(reservation, [
+            (self.checkin - self.tick, None),
+            (self.checkin, ReservationStatus.ONGOING),
+            (self.checkout, ReservationStatus.ONGOING),
+            # the sweep can find it after checkout without having started it
+            (self.checkout + self.tick, ReservationStatus.COMPLETED),
+        ])
+
+    def test_ongoing_completes_after_checkout(self):
+        reservation = self.reservation(ReservationStatus.ONGOING)
+
+        at = tasks.next_transition_at(reservation)
+        self.assertGreater(at, self.checkout)
+        self.assertDue(reservation, [(self.checkout, None), (at, ReservationStatus.COMPLETED)])
+
+    def test_final_statuses_stay(self):
+        for status in (ReservationStatus.COMPLETED, ReservationStatus.DECLINED, ReservationStatus.EXPIRED):
+            reservation = self.reservation(status)
+            self.assertIsNone(tasks.next_transition_at(reservation))
+            self.assertDue(reservation, [(self.checkout + timedelta(days=1), None)])
+
+
+@mock.patch.object(tasks.transition_reservation_task, "apply_async")
+class ReservationLifecycleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.property = make_property(cls.host)
+
+    def reservation(self, status, start, nights=2, age=timedelta(0)):
+        reservation = Reservation.objects.create(
+            user=self.guest,
+            property=self.property,
+            status=status,
+            start_date=start,
+            end_date=start + timedelta(days=nights),
+            number_of_nights=nights,
+            guests=1,
+        )
+        if age:
+            Reservation.objects.filter(pkid=reservation.pkid).update(created_at=timezone.now() - age)
+        return reservation
+
+    def status(self, reservation):
+        return Reservation.objects.values_list("status", flat=True).get(pkid=reservation.pkid)
+
+    def test_transition_task_is_idempotent(self, apply_async):
+        reservation = self.reservation(ReservationStatus.PENDING, date(2027, 1, 1), age=timedelta(hours=25))
+
+        self.assertEqual(tasks.transition_reservation_task(reservation.pkid), ReservationStatus.EXPIRED)
+        self.assertFalse(BlockedNight.objects.filter(reservation=reservation).exists())
+        # a duplicate or late delivery changes nothing
+        self.assertIsNone(tasks.transition_reservation_task(reservation.pkid))
+        self.assertEqual(self.status(reservation), ReservationStatus.EXPIRED)
+
+    def test_early_timer_is_a_no_op(self, apply_async):
+        reservation = self.reservation(ReservationStatus.APPROVED, timezone.localdate() + timedelta(days=3))
+
+        self.assertIsNone(tasks.transition_reservation_task(reservation.pkid))
+        self.assertEqual(self.status(reservation), ReservationStatus.APPROVED)
+        apply_async.assert_not_called()
+
+    def test_sweep_catches_up_missed_transitions(self, apply_async):
+        today = timezone.localdate()
+        started = self.reservation(ReservationStatus.APPROVED, today - timedelta(days=1))
+        finished = self.reservation(ReservationStatus.APPROVED, today - timedelta(days=5))
+        stale = self.reservation(ReservationStatus.PENDING, today + timedelta(days=10), age=timedelta(hours=25))
+        fresh = self.reservation(ReservationStatus.PENDING, today + timedelta(days=20))
+
+        tasks.update_reservations_status_task()
+
+        self.assertEqual(self.status(started), ReservationStatus.ONGOING)
+        self.assertEqual(self.status(finished), ReservationStatus.COMPLETED)
+        self.assertEqual(self.status(stale), ReservationStatus.EXPIRED)
+        self.assertEqual(self.status(fresh), ReservationStatus.PENDING)
+        self.assertFalse(BlockedNight.objects.filter(reservation=stale).exists())
+        self.assertTrue(BlockedNight.objects.filter(reservation=fresh).exists())
+
+    @NO_SILK
+    def test_expired_reservation_cannot_be_approved(self, apply_async):
+        reservation = self.reservation(ReservationStatus.PENDING, date(2027, 1, 1), age=timedelta(hours=25))
+        tasks.update_reservations_status_task()
+        login(self.client, self.host)
+
+        for action in ("approve", "decline"):
+            response = self.client.post(f"/api/v1/properties/reservation/{reservation.id}/{action}/")
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.status(reservation), ReservationStatus.EXPIRED)
+
+    @NO_SILK
+    def test_approve(self, apply_async):
+        reservation = self.reservation(ReservationStatus.PENDING, date(2027, 1, 1))
+        login(self.client, make_user("other@example.com"))
+        self.assertEqual(self.client.post(f"/api/v1/properties/reservation/{reservation.id}/approve/").status_code, 403)
+
+        login(self.client, self.host)
+        self.assertEqual(self.client.post(f"/api/v1/properties/reservation/{reservation.id}/approve/").status_code, 200)
+        self.assertEqual(self.status(reservation), ReservationStatus.APPROVED)
+
+
+class ConfirmationCodeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = make_user("guest@example.com")
+        cls.property = make_property(make_user("host@example.com"))
+
+    def reservation(self, day, **fields):
+        start = date(2027, 1, day)
+        return Reservation(
+            user=self.guest,
+            property=self.property,
+            start_date=start,
+            end_date=start + timedelta(days=1),
+            number_of_nights=1,
+            guests=1,
+            **fields,
+        )
+
+    def codes(self, *codes):
+        return mock.patch("apps.properties.models.generate_confirmation_code", side_effect=codes)
+
+    def test_save_retries_a_colliding_code(self):
+        self.reservation(1, confirmation_code="TAKEN001").save()
+
+        with self.codes("TAKEN001", "FRESH001") as generate:
+            reservation = self.reservation(2)
+            reservation.save()
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(Reservation.objects.get(pkid=reservation.pkid).confirmation_code, "FRESH001")
+
+    def test_save_gives_up_after_max_attempts(self):
+        self.reservation(1, confirmation_code="TAKEN001").save()
+
+        with self.codes(*["TAKEN001"] * CONFIRMATION_CODE_ATTEMPTS):
+            reservation = self.reservation(2)
+            with self.assertRaises(IntegrityError):
+                reservation.save()
+        self.assertEqual(reservation.confirmation_code, "")
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_bulk_create_fills_missing_codes(self):
+        self.reservation(1, confirmation_code="TAKEN001").save()
+
+        with self.codes("TAKEN001", "NEW00001", "NEW00002", "NEW00003"):
+            Reservation.objects.bulk_create([
+                self.reservation(2),
+                self.reservation(3, confirmation_code="KEEP0001"),
+                self.reservation(4),
+            ])
+
+        self.assertEqual(
+            list(Reservation.objects.order_by("start_date").values_list("confirmation_code", flat=True)),
+            ["TAKEN001", "NEW00002", "KEEP0001", "NEW00003"],
+        )
+
+
+@NO_SILK
+class ReservationImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.guest = make_user("guest@example.com")
+        cls.property = make_property(cls.host, price_per_night=Decimal("100.00"))
+
+    def setUp(self):
+        login(self.client, self.host)
+
+    def upload(self, rows, name="reservations.csv"):
+        if name.endswith(".csv"):
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=["property_id", "guest_email", "start_date", "end_date", "guests"])
+            writer.writeheader()
+            writer.writerows(rows)
+            content = out.getvalue()
+        else:
+            content = "".join(json.dumps(row) + "\n" for row in rows)
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post("/api/v1/properties/reservation/import/", {"file": file})
+
+    def row(self, start, end, **fields):
+        return {
+            "property_id": str(self.property.id),
+            "guest_email": "guest@example.com",
+            "start_date": start,
+            "end_date": end,
+            "guests": 1,
+            **fields,
+        }
+
+    def test_reports_errors_per_row(self):
+        response = self.upload([
+            self.row("2027-01-01", "2027-01-04"),
+            self.row("2027-01-03", "2027-01-05"),  # overlaps row 1
+            self.row("2027-02-01", "2027-02-02", guest_email="nobody@example.com"),
+            self.row("2027-02-01", "2027-02-02", start_date="soon"),
+            self.row("2027-02-01", "2027-02-02", guests=5),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        errors = {error["row"]: set(error["errors"]) for error in response.data["errors"]}
+        self.assertEqual(errors, {
+            2: {"non_field_errors"},
+            3: {"guest_email"},
+            4: {"start_date"},
+            5: {"guests"},
+        })
+
+    def test_rejects_overlap_with_an_existing_booking(self):
+        self.upload([self.row("2027-01-01", "2027-01-04")])
+        response = self.upload([self.row("2027-01-03", "2027-01-05")], name="more.jsonl")
+
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(response.data["errors"][0]["errors"], {"non_field_errors": ["Overlaps an existing reservation."]})
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_imported_bookings_block_nights_and_get_a_conversation(self):
+        self.upload([self.row("2027-01-01", "2027-01-04")])
+
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.user, self.guest)
+        self.assertTrue(reservation.confirmation_code)
+        self.assertEqual(
+            list(BlockedNight.objects.filter(reservation=reservation).order_by("date").values_list("date", flat=True)),
+            [date(2027, 1, 1), date(2027, 1, 2), date(2027, 1, 3)],
+        )
+        conversation = Conversation.objects.get(reservation=reservation)
+        self.assertEqual((conversation.guest, conversation.landlord), (self.guest, self.host))
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.reservations_count, 1)
+
+    def test_other_hosts_properties_are_not_found(self):
+        other = make_property(make_user("other@example.com"))
+        response = self.upload([self.row("2027-01-01", "2027-01-04", property_id=str(other.id))])
+        self.assertEqual(response.data["errors"][0]["errors"], {"property_id": ["Property not found."]})
+
+
+@NO_SILK
+class ReservationExportTests(TestCase):
+    url = "/api/v1/properties/reservation/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        guest = make_user("guest@example.com")
+        cls.properties = [make_property(cls.host, title=f"Property {i}") for i in range(2)]
+        reservation_io.import_reservations(cls.host, [
+            {
+                "property_id": str(property.id),
+                "guest_email": "guest@example.com",
+                "start_date": "2027-01-01",
+                "end_date": "2027-01-03",
+                "guests": "1",
+            }
+            for property in cls.properties
+        ])
+        # someone else's booking
+        other = make_property(make_user("other@example.com"))
+        book_stay(guest, other.pkid, date(2027, 1, 1), date(2027, 1, 3), guests=1)
+
+    def setUp(self):
+        login(self.client, self.host)
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+        self.assertEqual(list(rows[0]), [column for column, _ in reservation_io.EXPORT_FIELDS])
+        self.assertEqual([row["property_title"] for row in rows], ["Property 0", "Property 1"])
+        self.assertEqual(rows[0]["guest_email"], "guest@example.com")
+        self.assertEqual(rows[0]["number_of_nights"], "2")
+
+    def test_jsonl_for_one_property(self):
+        lines = self.export(file_format="jsonl", property_id=self.properties[1].id).splitlines()
+        self.assertEqual([json.loads(line)["property_id"] for line in lines], [str(self.properties[1].id)])
+
+    def test_bad_parameters_are_400(self):
+        self.assertEqual(self.client.get(self.url, {"file_format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"property_id": "abc"}).status_code, 400)
+
+
+# the property row lock (FOR UPDATE) serializes the bookings; SQLite has none
+# and fails concurrent writers with "database table is locked" instead
+@skipUnlessDBFeature("has_select_for_update")
+class BookStayRaceTests(TransactionTestCase):
+    threads = 8
+
+    def test_one_booking_wins(self):
+        host = make_user("host@example.com")
+        guests = [make_user(f"guest{i}@example.com") for i in range(self.threads)]
+        property = make_property(host, is_instant_booking=True)
+        barrier = threading.Barrier(self.threads)
+        outcomes = []
+
+        def book(index, guest):
+            # overlapping stays, none identical
+            start = date(2027, 1, 1) + timedelta(days=index % 3)
+            try:
+                barrier.wait()
+                book_stay(guest, property.pkid, start, start + timedelta(days=5), guests=1)
+                outcomes.append("booked")
+            except BookingConflict:
+                outcomes.append("conflict")
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=book, args=(i, g)) for i, g in enumerate(guests)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sorted(outcomes), ["booked"] + ["conflict"] * (self.threads - 1))
+        self.assertEqual(Reservation.objects.filter(property=property).count(), 1)
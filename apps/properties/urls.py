@@ -17,15 +17,21 @@ from .views import (
     ToggleFavoriteView,
     PropertyTagListView,
     PropertyStatusUpdateView,
+    PropertyQuoteView,
+    ReservationImportView,
+    ReservationExportView,
 )
 urlpatterns = [
     path('', PropertyListView.as_view(), name='property-list'),
     path('<uuid:property_id>/', PropertyDetailView.as_view(), name='property-details'),
     path('create/', PropertyCreateView.as_view(), name='property-create'),
+    path('quote/', PropertyQuoteView.as_view(), name='property-quote'),
     path('<uuid:property_id>/update/', PropertyUpdateView.as_view(), name='property-update'),
     path('<uuid:property_id>/delete/', PropertyDeleteView.as_view(), name='property-delete'),
     path('reservation/', ReservationListCreateView.as_view(), name='reservation-list-create'),
     path('reservation/<uuid:reservation_id>/', ReservationDetailView.as_view(), name='reservation-details'),
+    path('reservation/import/', ReservationImportView.as_view(), name='reservation-import'),
+    path('reservation/export/', ReservationExportView.as_view(), name='reservation-export'),
     path('reservation/requests/', PendingReservationListView.as_view(), name='reservation-requests'),
     path('<uuid:property_id>/reservation/', ReservationHostListView.as_view(), name='reservation-host-property'),
     path('reservation/host/', ReservationHostListView.as_view(), name='reservation-host'),
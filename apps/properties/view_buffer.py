@@ -0,0 +1,182 @@
+"""
+Write-behind buffer for property views.
+
+PropertyDetailView records a view here instead of writing to the database.
+Views are deduplicated per user/IP for VIEW_WINDOW and pushed onto a buffer
+that flush_property_views_task drains into PropertyView rows and
+views_count increments.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.db import transaction
+from django.db.models import F
+
+from .models import Property, PropertyView
+
+User = get_user_model()
+
+# 1 view per 15 minutes per user/IP
+VIEW_WINDOW = timedelta(minutes=15)
+BUFFER_KEY = "property_views:buffer"
+
+
+class InMemoryViewStore:
+    """
+    Process-local stand-in for Redis, used when PROPERTY_VIEWS_REDIS_URL
+    is not set (tests, single-process runs).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._buffer = []
+
+    def add(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            expires = self._keys.get(key)
+            if expires and expires > now:
+                return False
+            self._keys[key] = now + ttl
+            return True
+
+    def push(self, item):
+        with self._lock:
+            self._buffer.append(item)
+
+    def requeue(self, items):
+        with self._lock:
+            self._buffer[:0] = items
+
+    def drain(self, limit):
+        with self._lock:
+            items, self._buffer = self._buffer[:limit], self._buffer[limit:]
+            # drop expired dedup keys while we're here
+            now = time.monotonic()
+            self._keys = {k: v for k, v in self._keys.items() if v > now}
+        return items
+
+
+class RedisViewStore:
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def add(self, key, ttl):
+        return bool(self.client.set(key, 1, nx=True, ex=ttl))
+
+    def push(self, item):
+        self.client.rpush(BUFFER_KEY, item)
+
+    def requeue(self, items):
+        # back at the head, in their original order
+        self.client.lpush(BUFFER_KEY, *reversed(items))
+
+    def drain(self, limit):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(BUFFER_KEY, 0, limit - 1)
+        pipe.ltrim(BUFFER_KEY, limit, -1)
+        items, _ = pipe.execute()
+        return items
+
+
+_store = None
+
+
+def get_view_store():
+    global _store
+    if _store is None:
+        url = getattr(settings, "PROPERTY_VIEWS_REDIS_URL", None)
+        _store = RedisViewStore(url) if url else InMemoryViewStore()
+    return _store
+
+
+def record_view(property_pkid, user, ip):
+    """
+    Buffer a view unless this user/IP already viewed the property within
+    VIEW_WINDOW. Returns True when the view was counted.
+
+    Views without a valid client IP aren't counted: PropertyView.ip_address
+    is required, and one bad row would fail the whole flush batch.
+    """
+    ip = (ip or "").strip()
+    try:
+        validate_ipv46_address(ip)
+    except ValidationError:
+        return False
+
+    store = get_view_store()
+    ttl = int(VIEW_WINDOW.total_seconds())
+
+    counted = store.add(f"property_views:{property_pkid}:ip:{ip}", ttl)
+    if user is not None:
+        counted = store.add(f"property_views:{property_pkid}:user:{user.pkid}", ttl) and counted
+
+    if counted:
+        store.push(json.dumps({
+            "property": property_pkid,
+            "user": user.pkid if user is not None else None,
+            "ip": ip,
+        }))
+    return counted
+
+
+def flush_views(batch_size=5000):
+    """
+    Drain buffered views into PropertyView rows and views_count increments.
+    Returns the number of views written. A batch that fails to write is
+    pushed back onto the buffer for the next flush.
+    """
+    store = get_view_store()
+    written = 0
+
+    while True:
+        raw = store.drain(batch_size)
+        if not raw:
+            break
+        try:
+            written += _write_views([json.loads(item) for item in raw])
+        except Exception:
+            store.requeue(raw)
+            raise
+
+    return written
+
+
+def _write_views(items):
+    # the property or user may have been deleted since the view
+    property_ids = set(
+        Property.objects.filter(pkid__in={i["property"] for i in items})
+        .values_list("pkid", flat=True)
+    )
+    user_ids = set(
+        User.objects.filter(pkid__in={i["user"] for i in items if i["user"]})
+        .values_list("pkid", flat=True)
+    )
+    # entries buffered without an IP before record_view checked for one
+    items = [i for i in items if i["property"] in property_ids and i["ip"]]
+
+    with transaction.atomic():
+        PropertyView.objects.bulk_create([
+            PropertyView(
+                property_id=i["property"],
+                user_id=i["user"] if i["user"] in user_ids else None,
+                ip_address=i["ip"],
+            )
+            for i in items
+        ])
+
+        for property_id, count in Counter(i["property"] for i in items).items():
+            Property.objects.filter(pkid=property_id).update(
+                views_count=F("views_count") + count
+            )
+
+    return len(items)
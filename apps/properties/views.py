@@ -1,4 +1,6 @@
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.db import transaction
 from django.db.models import Q, F
 from rest_framework.response import Response
 from rest_framework import generics, permissions, status
@@ -8,14 +10,21 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from decimal import Decimal
 from django.utils import timezone
 from datetime import datetime, timedelta
+import io
+import uuid
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 
 from .models import Property, Reservation, PropertyView, PropertyLike, ReservationStatus, PropertyTag, PropertyStatus
 from .pagination import PropertyPagination
-from apps.chat.models import Conversation
-from .serializers import PropertyListSerializer, PropertyDetailSerializer, PropertyCreateSerializer, ReservationSerializer, PropertyTagSerializer, PropertyStatusUpdateSerializer
+from .availability import exclude_unavailable
+from .search import search_properties
+from .view_buffer import record_view
+from .booking import book_stay
+from . import reservation_io
+from . import response_cache, pricing
+from .serializers import PropertyListSerializer, PropertyDetailSerializer, PropertyCreateSerializer, ReservationSerializer, PropertyTagSerializer, PropertyStatusUpdateSerializer, QuoteRequestSerializer, QuoteSerializer
 
 class PropertyFilter(django_filters.FilterSet):
     user = django_filters.UUIDFilter(field_name='user__id')
@@ -32,32 +41,27 @@ class PropertyFilter(django_filters.FilterSet):
         fields = ['user', 'location', 'guests', 'status', 'min_price_per_night', 'max_price_per_night', 'start_date', 'end_date']
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(location__icontains=value)
-            | Q(title__icontains=value)
-            | Q(category__icontains=value)
-        )
+        return search_properties(queryset, value)
 
     def filter_by_dates(self, queryset, name, value):
         """
-        Exclude properties that have reservations overlapping with the search range.
+        Exclude properties that have blocked nights inside the search range.
         """
-        start_date = self.data.get('start_date')
-        end_date = self.data.get('end_date')
+        # Both date filters route here; apply the exclusion only once.
+        if name != "end_date":
+            return queryset
+
+        start_date = self.form.cleaned_data.get('start_date')
+        end_date = value
 
         if start_date and end_date:
-            # Exclude properties that have conflicting reservations
-            queryset = queryset.exclude(
-                reservations__start_date__lt=end_date,
-                reservations__end_date__gt=start_date
-            )
+            queryset = exclude_unavailable(queryset, start_date, end_date)
         return queryset
 
 class ReservationFilter(django_filters.FilterSet):
     status = django_filters.CharFilter(field_name='status')
 
 class PropertyListView(generics.ListAPIView):
-    queryset = Property.objects.all()
     serializer_class = PropertyListSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -67,14 +71,44 @@ class PropertyListView(generics.ListAPIView):
     ordering_fields = ["likes_count", "reservations_count", "views_count", "created_at"]
     ordering = ["-created_at"]
 
+    def get_queryset(self):
+        return Property.objects.with_liked(self.request.user)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        # Rank search results by relevance unless the client picked an order
+        if "search_rank" in queryset.query.annotations and not self.request.query_params.get("ordering"):
+            queryset = queryset.order_by("-search_rank", "-created_at")
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache.list_cache_key(request)
+        entry = response_cache.get_entry(key)
+
+        if entry is None:
+            data = super().list(request, *args, **kwargs).data
+            liked = sorted(str(item["id"]) for item in data["results"] if item["liked"])
+
+            public = {**data, "results": [{**item, "liked": False} for item in data["results"]]}
+            entry = response_cache.make_entry(public)
+            response_cache.set_entry(key, entry)
+        else:
+            data = entry["data"]
+            results, liked = response_cache.overlay_liked(data["results"], request.user)
+            data = {**data, "results": results}
+
+        etag = response_cache.make_etag(entry["etag"], liked)
+        return response_cache.conditional_response(request, data, etag)
+
 class PropertyDetailView(generics.RetrieveAPIView):
     serializer_class = PropertyDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_url_kwarg = "property_id"
 
     def get_queryset(self):
-        qs = Property.objects.all()
         user = self.request.user
+        qs = Property.objects.with_liked(user).with_reviewed(user).select_related("user__profile").prefetch_related("tags")
 
         if user.is_authenticated:
             return qs.filter(
@@ -91,41 +125,28 @@ class PropertyDetailView(generics.RetrieveAPIView):
         )
 
     def retrieve(self, request, *args, **kwargs):
-        property = self.get_object()
-        ip = self.get_client_ip(request)
-        user = request.user if request.user.is_authenticated else None
-
-        # 1 view per 15 minutes per user/IP
-        fifteen_minutes_ago = timezone.now() - timedelta(minutes=15)
-
-        already_viewed = PropertyView.objects.filter(
-            property=property,
-            ip_address=ip,
-            created_at__gte=fifteen_minutes_ago
-        )
-
-        if user:
-            already_viewed = already_viewed | PropertyView.objects.filter(
-                property=property,
-                user=user,
-                created_at__gte=fifteen_minutes_ago
-            )
-
-        if not already_viewed.exists():
-            # create view
-            PropertyView.objects.create(
-                property=property,
-                user=user,
-                ip_address=ip
-            )
+        key = response_cache.detail_cache_key(self.kwargs.get(self.lookup_url_kwarg))
+        entry = response_cache.get_entry(key)
+
+        if entry is None:
+            property = self.get_object()
+            data = self.get_serializer(property).data
+            flags = {"liked": data["liked"], "reviewed": data["reviewed"]}
+
+            entry = response_cache.make_entry({**data, "liked": False, "reviewed": False}, pkid=property.pkid)
+            # only public listings are shared between users
+            if property.status == PropertyStatus.ACTIVE:
+                response_cache.set_entry(key, entry)
+        else:
+            flags = response_cache.detail_flags(entry["pkid"], request.user)
+            data = {**entry["data"], **flags}
 
-            # increment view count
-            Property.objects.filter(id=property.id).update(
-                views_count=F("views_count") + 1
-            )
+        # counted in a write-behind buffer, flushed by flush_property_views_task
+        user = request.user if request.user.is_authenticated else None
+        record_view(entry["pkid"], user, self.get_client_ip(request))
 
-        serializer = self.get_serializer(property)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        etag = response_cache.make_etag(entry["etag"], flags)
+        return response_cache.conditional_response(request, data, etag)
 
     def get_client_ip(self, request):
         """Extract real client IP address."""
@@ -192,63 +213,15 @@ class ReservationListCreateView(generics.ListCreateAPIView):
 
         start_date_ = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date_ = datetime.strptime(end_date, "%Y-%m-%d").date()
-        number_of_nights = (end_date_ - start_date_).days
-
-        checkin_time = property.checkin_time
-        checkout_time = property.checkout_time
-        is_instant_booking = property.is_instant_booking
-
-        if number_of_nights >= 28:
-            long_stay_discount = property.monthly_discount_rate
-        elif number_of_nights >= 7:
-            long_stay_discount = property.weekly_discount_rate
-        else:
-            long_stay_discount = Decimal("0.00")
-        
-        price_per_night = property.price_per_night
-        cleaning_fee = property.cleaning_fee
-        guest_service_fee_rate = Decimal("0.10")
-        host_service_fee_rate = Decimal("0.02")
-        tax_rate = Decimal("0.03")
-
-        subtotal = price_per_night * number_of_nights
-        discounted_subtotal = subtotal - (subtotal * long_stay_discount)
-        guest_service_fee = discounted_subtotal * guest_service_fee_rate
-        tax = (discounted_subtotal + cleaning_fee + guest_service_fee) * tax_rate
-        total_amount = discounted_subtotal + cleaning_fee + guest_service_fee + tax
-
-        host_service_fee = discounted_subtotal * host_service_fee_rate
-        host_pay = (discounted_subtotal + cleaning_fee) - host_service_fee
-
-        if property.is_instant_booking:
-            status = ReservationStatus.APPROVED
-        else:
-            status = ReservationStatus.PENDING
-
-        reservation = serializer.save(
-            user=self.request.user,
-            property=property,
-            status=status,
-            price_per_night=price_per_night,
-            start_date=start_date,
-            end_date=end_date,
-            checkin_time = checkin_time,
-            checkout_time = checkout_time,
-            is_instant_booking = is_instant_booking,
-            number_of_nights=number_of_nights,
-            long_stay_discount=long_stay_discount,
-            cleaning_fee=cleaning_fee, 
-            guest_service_fee_rate=guest_service_fee_rate,
-            host_service_fee_rate=host_service_fee_rate,
-            tax_rate=tax_rate,
-            total_amount=total_amount,
-            host_pay=host_pay
-        )
-
-        Conversation.objects.create(
-            reservation=reservation,
-            guest=self.request.user,
-            landlord=property.user
+        if end_date_ <= start_date_:
+            raise ValidationError({"end_date": "end_date must be after start_date."})
+
+        book_stay(
+            self.request.user,
+            property.pkid,
+            start_date_,
+            end_date_,
+            save=serializer.save,
         )
 
 class ReservationDetailView(generics.RetrieveAPIView):
@@ -288,6 +261,61 @@ class ReservationHostListView(generics.ListAPIView):
         return queryset.order_by("-created_at")
 
 
+class ReservationImportView(APIView):
+    """
+    Upload a CSV or JSON Lines `file` of bookings for your properties.
+    Columns: property_id, guest_email, start_date, end_date, guests and
+    optionally status (default APPROVED) and confirmation_code.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "A CSV or JSON Lines file is required."})
+
+        file_format = request.data.get("file_format") or (
+            "jsonl" if upload.name.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        if file_format not in reservation_io.FORMATS:
+            raise ValidationError({"file_format": f"Must be one of {', '.join(reservation_io.FORMATS)}."})
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        report = reservation_io.import_reservations(request.user, reservation_io.read_rows(stream, file_format))
+
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ReservationExportView(APIView):
+    """
+    Stream reservations of your properties as CSV (default) or JSON Lines
+    (?file_format=jsonl), optionally for one ?property_id=.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in reservation_io.FORMATS:
+            raise ValidationError({"file_format": f"Must be one of {', '.join(reservation_io.FORMATS)}."})
+
+        queryset = Reservation.objects.filter(property__user=request.user)
+        property_id = request.query_params.get("property_id")
+        if property_id:
+            try:
+                property_id = uuid.UUID(property_id)
+            except ValueError:
+                raise ValidationError({"property_id": "Must be a valid UUID."})
+            queryset = queryset.filter(property__id=property_id)
+
+        response = StreamingHttpResponse(
+            reservation_io.render_rows(reservation_io.export_rows(queryset), file_format),
+            content_type="text/csv" if file_format == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="reservations.{file_format}"'
+        return response
+
+
 class PendingReservationListView(generics.ListAPIView):
     serializer_class = ReservationSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -304,16 +332,22 @@ class ApproveReservationView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, reservation_id):
-        reservation = get_object_or_404(Reservation, id=reservation_id)
+        # the lock orders this with the expiry sweep and the transition task,
+        # so the status checked below is the one overwritten
+        with transaction.atomic():
+            reservation = get_object_or_404(
+                Reservation.objects.select_for_update(of=("self",)).select_related("property"),
+                id=reservation_id,
+            )
 
-        if reservation.property.user != request.user:
-            return Response({"detail": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
+            if reservation.property.user != request.user:
+                return Response({"detail": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
 
-        if reservation.status != ReservationStatus.PENDING:
-            return Response({"detail": "Reservation is not pending"}, status=status.HTTP_400_BAD_REQUEST)
+            if reservation.status != ReservationStatus.PENDING:
+                return Response({"detail": "Reservation is not pending"}, status=status.HTTP_400_BAD_REQUEST)
 
-        reservation.status = ReservationStatus.APPROVED
-        reservation.save()
+            reservation.status = ReservationStatus.APPROVED
+            reservation.save()
 
         reservation.property.reservations_count = reservation.property.reservations.count()
         reservation.property.save(update_fields=["reservations_count"])
@@ -326,16 +360,21 @@ class DeclineReservationView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, reservation_id):
-        reservation = get_object_or_404(Reservation, id=reservation_id)
+        # locked like approve, see ApproveReservationView
+        with transaction.atomic():
+            reservation = get_object_or_404(
+                Reservation.objects.select_for_update(of=("self",)).select_related("property"),
+                id=reservation_id,
+            )
 
-        if reservation.property.user != request.user:
-            return Response({"detail": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
+            if reservation.property.user != request.user:
+                return Response({"detail": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
 
-        if reservation.status != ReservationStatus.PENDING:
-            return Response({"detail": "Reservation is not pending"}, status=status.HTTP_400_BAD_REQUEST)
+            if reservation.status != ReservationStatus.PENDING:
+                return Response({"detail": "Reservation is not pending"}, status=status.HTTP_400_BAD_REQUEST)
 
-        reservation.status = ReservationStatus.DECLINED
-        reservation.save()
+            reservation.status = ReservationStatus.DECLINED
+            reservation.save()
 
         # TODO: send notification to guest
 
@@ -347,7 +386,7 @@ class UserFavoritesView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Property.objects.filter(likes__user=user).distinct()
+        return Property.objects.filter(likes__user=user).with_liked(user).distinct()
 
 class ToggleFavoriteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -389,4 +428,55 @@ class PropertyStatusUpdateView(generics.UpdateAPIView):
         return get_object_or_404(
             self.get_queryset(),
             id=self.kwargs["property_id"]
-        )
\ No newline at end of file
+        )
+
+class PropertyQuoteView(APIView):
+    """
+    Price many stays at once:
+    {"items": [{"property_id", "start_date", "end_date", "guests"}, ...]}
+    Results come back in request order, each with a quote or an error.
+    """
+    permission_classes = [permissions.AllowAny]
+    max_items = 100
+
+    def post(self, request):
+        items = request.data.get("items") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"items": "A non-empty list of stays is required."})
+        if len(items) > self.max_items:
+            raise ValidationError({"items": f"At most {self.max_items} stays per request."})
+
+        serializer = QuoteRequestSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        stays = serializer.validated_data
+
+        # one fetch for the whole batch
+        properties = {
+            p.id: p
+            for p in Property.objects.filter(
+                id__in={stay["property_id"] for stay in stays},
+                status=PropertyStatus.ACTIVE,
+            ).only(*pricing.PRICING_FIELDS)
+        }
+
+        results = []
+        for stay in stays:
+            result = {
+                "property_id": stay["property_id"],
+                "start_date": stay["start_date"],
+                "end_date": stay["end_date"],
+                "guests": stay["guests"],
+            }
+            property = properties.get(stay["property_id"])
+
+            if property is None:
+                result["error"] = "Property not found."
+            elif stay["guests"] > property.guests:
+                result["error"] = f"This property allows at most {property.guests} guests."
+            else:
+                quote = pricing.quote(property, stay["start_date"], stay["end_date"])
+                result["quote"] = QuoteSerializer(quote).data
+
+            results.append(result)
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,170 @@
+"""
+Versioned on-disk recommendation model.
+
+Each build is written to its own directory of .npy arrays and published by
+atomically replacing the CURRENT pointer file. Web workers memory-map the
+arrays, so every process on a host shares the same pages, and pick up a new
+version on their next check without restarting.
+
+    RECOMMENDATION_MODEL_DIR/
+        CURRENT                 -> "20260101T030000_123456"
+        20260101T030000_123456/
+            meta.json
+            interactions_*.npy
+            neighbours_*.npy
+            user_ids.npy / user_order.npy / property_ids.npy
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.utils import timezone
+
+from .services import Interactions, ItemNeighbours
+
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+
+# how often a worker looks for a newer version
+RECHECK_SECONDS = 30
+
+
+def model_dir():
+    return Path(settings.RECOMMENDATION_MODEL_DIR)
+
+
+# ----------------------------
+# Write
+# ----------------------------
+def _save_csr(path, prefix, matrix):
+    np.save(path / f"{prefix}_data.npy", matrix.data)
+    np.save(path / f"{prefix}_indices.npy", matrix.indices)
+    np.save(path / f"{prefix}_indptr.npy", matrix.indptr)
+
+
+def save_model(interactions, neighbours):
+    """
+    Write a new version and point CURRENT at it. Returns the version name.
+    """
+    root = model_dir()
+    root.mkdir(parents=True, exist_ok=True)
+
+    version = timezone.now().strftime("%Y%m%dT%H%M%S_%f")
+    tmp = root / f".{version}.tmp"
+    tmp.mkdir()
+
+    n_items = len(interactions.property_ids)
+    if neighbours is None:
+        neighbours = ItemNeighbours(
+            matrix=sp.csr_matrix((n_items, n_items)),
+            property_ids=interactions.property_ids,
+        )
+
+    _save_csr(tmp, "interactions", interactions.matrix)
+    _save_csr(tmp, "neighbours", neighbours.matrix)
+    np.save(tmp / "user_ids.npy", interactions.user_ids)
+    np.save(tmp / "user_order.npy", interactions.user_order)
+    np.save(tmp / "property_ids.npy", interactions.property_ids)
+
+    meta = {
+        "built_at": interactions.built_at.isoformat(),
+        "shape": list(interactions.matrix.shape),
+        "has_neighbours": neighbours.matrix.nnz > 0,
+        "source_counts": interactions.source_counts,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+
+    os.rename(tmp, root / version)
+
+    pointer = root / f".{CURRENT_FILE}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT_FILE)
+
+    prune_versions()
+    return version
+
+
+def prune_versions(keep=KEEP_VERSIONS):
+    # workers still mapping an old version keep their pages until they swap
+    root = model_dir()
+    current = current_version()
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for path in versions[:-keep]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# ----------------------------
+# Read
+# ----------------------------
+def current_version():
+    try:
+        return (model_dir() / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _load_csr(path, prefix, shape):
+    arrays = [np.load(path / f"{prefix}_{name}.npy", mmap_mode="r") for name in ("data", "indices", "indptr")]
+    return sp.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+
+def load_model(version):
+    path = model_dir() / version
+    meta = json.loads((path / "meta.json").read_text())
+
+    user_ids = np.load(path / "user_ids.npy", mmap_mode="r")
+    user_order_path = path / "user_order.npy"
+    property_ids = np.load(path / "property_ids.npy", mmap_mode="r")
+    n_items = len(property_ids)
+
+    interactions = Interactions(
+        matrix=_load_csr(path, "interactions", tuple(meta["shape"])),
+        user_ids=user_ids,
+        property_ids=property_ids,
+        built_at=datetime.fromisoformat(meta["built_at"]),
+        # versions written before the index existed compute it on load
+        user_order=np.load(user_order_path, mmap_mode="r") if user_order_path.exists() else None,
+        # missing on older versions, which makes the next build a full one
+        source_counts=meta.get("source_counts"),
+    )
+    neighbours = (
+        ItemNeighbours(
+            matrix=_load_csr(path, "neighbours", (n_items, n_items)),
+            property_ids=property_ids,
+        )
+        if meta["has_neighbours"]
+        else None
+    )
+    return interactions, neighbours
+
+
+_lock = threading.Lock()
+_loaded = {"version": None, "model": None, "checked_at": 0.0}
+
+
+def get_model():
+    """
+    The current (interactions, neighbours) for this process, or None when no
+    model has been built yet. Swaps to a newer version at most every
+    RECHECK_SECONDS.
+    """
+    now = time.monotonic()
+    if _loaded["model"] is not None and now - _loaded["checked_at"] < RECHECK_SECONDS:
+        return _loaded["model"]
+
+    with _lock:
+        _loaded["checked_at"] = now
+        version = current_version()
+        if version and version != _loaded["version"]:
+            _loaded["model"] = load_model(version)
+            _loaded["version"] = version
+
+    return _loaded["model"]
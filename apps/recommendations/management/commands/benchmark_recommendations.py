@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.recommendations.services import (
+    TOP_K,
+    Interactions,
+    ItemNeighbours,
+    recommend_properties,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark recommend_properties on a synthetic model (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--interactions", type=int, default=1_000_000)
+        parser.add_argument("--top-k", type=int, default=TOP_K)
+        parser.add_argument("--requests", type=int, default=5_000)
+        parser.add_argument("--target-p99-ms", type=float, default=10.0)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        n_props = options["properties"]
+        n_users = options["users"]
+        top_k = options["top_k"]
+
+        # popularity-skewed interactions, like real traffic
+        cols = (rng.zipf(1.3, options["interactions"]) - 1) % n_props
+        rows = rng.integers(0, n_users, options["interactions"])
+        scores = rng.choice([1.0, 3.0, 5.0], options["interactions"])
+        matrix = sp.coo_matrix((scores, (rows, cols)), shape=(n_users, n_props)).tocsr()
+
+        neighbours = sp.csr_matrix(
+            (
+                rng.random(n_props * top_k),
+                rng.integers(0, n_props, n_props * top_k),
+                np.arange(0, n_props * top_k + 1, top_k),
+            ),
+            shape=(n_props, n_props),
+        )
+        neighbours.sum_duplicates()
+
+        property_ids = np.arange(1, n_props + 1)
+        interactions = Interactions(
+            matrix=matrix,
+            user_ids=rng.permutation(np.arange(1, n_users + 1)),
+            property_ids=property_ids,
+            built_at=timezone.now(),
+        )
+        model = ItemNeighbours(matrix=neighbours, property_ids=property_ids)
+
+        self.stdout.write(
+            f"{n_props} properties, {n_users} users, {matrix.nnz} user/item pairs, "
+            f"{neighbours.nnz} neighbour entries"
+        )
+
+        users = rng.choice(interactions.user_ids, options["requests"])
+        recommend_properties(int(users[0]), interactions, model)  # warm-up
+
+        timings = np.empty(len(users))
+        for i, user_pkid in enumerate(users):
+            start = time.perf_counter()
+            recommend_properties(int(user_pkid), interactions, model)
+            timings[i] = (time.perf_counter() - start) * 1000
+
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        self.stdout.write(f"p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms, max {timings.max():.2f} ms")
+
+        if p99 > options["target_p99_ms"]:
+            raise CommandError(f"p99 {p99:.2f} ms is above the {options['target_p99_ms']} ms target")
+
+        self.stdout.write(self.style.SUCCESS("p99 within target"))
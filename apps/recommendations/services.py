@@ -1,6 +1,10 @@
-import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
 from django.db.models import Count, Avg
-from sklearn.metrics.pairwise import cosine_similarity
+from django.utils import timezone
 
 from apps.properties.models import Reservation, PropertyLike, PropertyView
 from apps.reviews.models import Review
@@ -13,152 +17,383 @@ LIKE_W = 3.0
 VIEW_W = 1.0
 RATING_W = 1.0
 
+# neighbours kept per item
+TOP_K = 50
+
+# items per block when multiplying the similarity matrix
+SIMILARITY_BLOCK = 1024
+
+INTERACTION_DTYPE = [("user", "i8"), ("property", "i8"), ("score", "f8")]
+
+
+@dataclass
+class Interactions:
+    """
+    User x item score matrix. Rows/columns map to User/Property pkids
+    through `user_ids` / `property_ids`.
+    """
+    matrix: sp.csr_matrix
+    user_ids: np.ndarray
+    property_ids: np.ndarray
+    built_at: datetime
+    # argsort of user_ids, the user pkid -> row index
+    user_order: np.ndarray = None
+    # rows per source created up to built_at, see source_counts()
+    source_counts: list = None
+
+    def __post_init__(self):
+        if self.user_order is None:
+            self.user_order = np.argsort(self.user_ids, kind="stable")
+
+    @property
+    def empty(self):
+        return self.matrix.nnz == 0
+
+    def user_row(self, user_pkid):
+        """
+        Row index for a user, or None. O(log users).
+        """
+        pos = np.searchsorted(self.user_ids, user_pkid, sorter=self.user_order)
+        if pos < len(self.user_ids):
+            row = self.user_order[pos]
+            if self.user_ids[row] == user_pkid:
+                return int(row)
+        return None
+
+
+@dataclass
+class ItemNeighbours:
+    """
+    Top-K cosine neighbours per item, as an items x items CSR matrix that
+    shares column order with Interactions.property_ids.
+    """
+    matrix: sp.csr_matrix
+    property_ids: np.ndarray
+
 
 # =========================
-# 1. Build interaction DF
+# 1. Build interactions
 # =========================
-def extract_interactions():
-    rows = []
-
-    # BOOKINGS
-    for r in (
-        Reservation.objects
-        .values("user_id", "property_id")
-        .annotate(cnt=Count("id"))
-    ):
-        rows.append({
-            "user_id": str(r["user_id"]),       # UUID-safe
-            "property_id": r["property_id"],
-            "score": r["cnt"] * BOOKING_W,
-        })
-
-    # LIKES
-    for l in (
-        PropertyLike.objects
-        .values("user_id", "property_id")
-        .annotate(cnt=Count("id"))
-    ):
-        rows.append({
-            "user_id": str(l["user_id"]),
-            "property_id": l["property_id"],
-            "score": l["cnt"] * LIKE_W,
-        })
-
-    # VIEWS (logged-in only)
-    for v in (
-        PropertyView.objects
-        .filter(user__isnull=False)
-        .values("user_id", "property_id")
-        .annotate(cnt=Count("id"))
-    ):
-        rows.append({
-            "user_id": str(v["user_id"]),
-            "property_id": v["property_id"],
-            "score": v["cnt"] * VIEW_W,
-        })
-
-    # RATINGS
-    for r in (
-        Review.objects
-        .values("user_id", "property_id")
-        .annotate(avg_rating=Avg("rating"))
-    ):
-        rows.append({
-            "user_id": str(r["user_id"]),
-            "property_id": r["property_id"],
-            "score": r["avg_rating"] * RATING_W,
-        })
-
-    if not rows:
-        return pd.DataFrame(columns=["user_id", "property_id", "score"])
-
-    df = pd.DataFrame(rows)
-
-    # Aggregate multiple signals
-    df = (
-        df.groupby(["user_id", "property_id"], as_index=False)
-        .agg({"score": "sum"})
+def _interaction_sources(since=None, user_pkid=None):
+    """
+    (queryset, weight) pairs yielding (user pkid, property pkid, value),
+    aggregated per user/property in the database.
+    """
+    def recent(qs):
+        if user_pkid is not None:
+            qs = qs.filter(user_id=user_pkid)
+        return qs.filter(created_at__gt=since) if since else qs
+
+    return [
+        # BOOKINGS
+        (recent(Reservation.objects.all())
+            .values_list("user_id", "property_id")
+            .annotate(value=Count("pkid")), BOOKING_W),
+        # LIKES
+        (recent(PropertyLike.objects.all())
+            .values_list("user_id", "property_id")
+            .annotate(value=Count("pkid")), LIKE_W),
+        # VIEWS (logged-in only)
+        (recent(PropertyView.objects.filter(user__isnull=False))
+            .values_list("user_id", "property_id")
+            .annotate(value=Count("pkid")), VIEW_W),
+        # RATINGS
+        (recent(Review.objects.all())
+            .values_list("user_id", "property_id")
+            .annotate(value=Avg("rating")), RATING_W),
+    ]
+
+
+def _source_rows():
+    """
+    The raw rows behind each interaction source, in _interaction_sources order.
+    """
+    return [
+        Reservation.objects.all(),
+        PropertyLike.objects.all(),
+        PropertyView.objects.filter(user__isnull=False),
+        Review.objects.all(),
+    ]
+
+
+def source_counts(until):
+    return [qs.filter(created_at__lte=until).count() for qs in _source_rows()]
+
+
+def needs_full_build(base):
+    """
+    True when rows already folded into `base` were deleted (unlikes, deleted
+    reviews or bookings) or edited (review ratings) since it was built.
+    An incremental build can only add rows, so these need a full rebuild.
+    """
+    if base.source_counts is None:
+        return True
+    if source_counts(base.built_at) != list(base.source_counts):
+        return True
+    return Review.objects.filter(
+        created_at__lte=base.built_at, updated_at__gt=base.built_at
+    ).exists()
+
+
+def _stream(queryset, weight):
+    rows = np.fromiter(
+        queryset.order_by().iterator(chunk_size=10000),
+        dtype=INTERACTION_DTYPE,
     )
+    rows["score"] *= weight
+    return rows
+
+
+def _to_matrix(rows, user_ids, property_ids):
+    """
+    Sum (user, property, score) rows into a CSR matrix over the given id
+    orders. Every id in `rows` must be present in the orders.
+    """
+    user_index = np.argsort(user_ids)
+    prop_index = np.argsort(property_ids)
+    r = user_index[np.searchsorted(user_ids, rows["user"], sorter=user_index)]
+    c = prop_index[np.searchsorted(property_ids, rows["property"], sorter=prop_index)]
+
+    # coo -> csr sums duplicate (user, property) pairs across signals
+    return sp.coo_matrix(
+        (rows["score"], (r, c)),
+        shape=(len(user_ids), len(property_ids)),
+    ).tocsr()
+
+
+def extract_interactions(since=None):
+    built_at = timezone.now()
+    rows = np.concatenate([_stream(qs, w) for qs, w in _interaction_sources(since)])
+
+    user_ids = np.unique(rows["user"])
+    property_ids = np.unique(rows["property"])
+
+    return Interactions(
+        matrix=_to_matrix(rows, user_ids, property_ids),
+        user_ids=user_ids,
+        property_ids=property_ids,
+        built_at=built_at,
+        source_counts=None if since else source_counts(built_at),
+    )
+
 
-    return df
+def merge_interactions(base, delta):
+    """
+    Fold `delta` into `base`. Existing rows/columns keep their position and
+    new users/properties are appended, so neighbour rows stay aligned.
+    """
+    new_users = np.setdiff1d(delta.user_ids, base.user_ids)
+    new_props = np.setdiff1d(delta.property_ids, base.property_ids)
+    user_ids = np.concatenate([base.user_ids, new_users])
+    property_ids = np.concatenate([base.property_ids, new_props])
+
+    delta_coo = delta.matrix.tocoo()
+    rows = np.empty(delta_coo.nnz, dtype=INTERACTION_DTYPE)
+    rows["user"] = delta.user_ids[delta_coo.row]
+    rows["property"] = delta.property_ids[delta_coo.col]
+    rows["score"] = delta_coo.data
+
+    matrix = base.matrix.copy()
+    matrix.resize((len(user_ids), len(property_ids)))
+
+    return Interactions(
+        matrix=(matrix + _to_matrix(rows, user_ids, property_ids)).tocsr(),
+        user_ids=user_ids,
+        property_ids=property_ids,
+        built_at=delta.built_at,
+        source_counts=source_counts(delta.built_at),
+    )
 
 
 # =========================
-# 2. Item similarity
+# 2. Item similarity (top-K)
 # =========================
-def compute_item_similarity(df):
-    if df.empty:
-        return None
-
-    user_item = df.pivot_table(
-        index="user_id",
-        columns="property_id",
-        values="score",
-        fill_value=0,
+def _normalized_items(interactions):
+    matrix = interactions.matrix.tocsc().astype(np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    return (matrix @ sp.diags(1.0 / norms)).tocsc()
+
+
+def _top_k_rows(normalized, items, top_k):
+    """
+    Cosine top-K neighbours for `items`, one block of rows at a time so the
+    full items x items product is never materialized.
+    Returns {item index: (neighbour indices, similarities)}.
+    """
+    normalized_t = normalized.T.tocsr()
+    result = {}
+
+    for start in range(0, len(items), SIMILARITY_BLOCK):
+        block = items[start:start + SIMILARITY_BLOCK]
+        sims = (normalized_t[block] @ normalized).tocsr()
+
+        for offset, item in enumerate(block):
+            lo, hi = sims.indptr[offset], sims.indptr[offset + 1]
+            cols = sims.indices[lo:hi]
+            vals = sims.data[lo:hi]
+
+            keep = (cols != item) & (vals > 0)
+            cols, vals = cols[keep], vals[keep]
+
+            if len(vals) > top_k:
+                best = np.argpartition(-vals, top_k)[:top_k]
+                cols, vals = cols[best], vals[best]
+
+            result[item] = (cols, vals)
+
+    return result
+
+
+def _neighbour_matrix(rows, n_items):
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    cols, vals = zip(*(rows.get(item, empty) for item in range(n_items))) if n_items else ((), ())
+    lengths = [len(c) for c in cols]
+
+    return sp.csr_matrix(
+        (
+            np.concatenate(vals) if n_items else empty[1],
+            np.concatenate(cols) if n_items else empty[0],
+            np.concatenate([[0], np.cumsum(lengths)]),
+        ),
+        shape=(n_items, n_items),
     )
 
-    if user_item.shape[1] < 2:
+
+def compute_item_similarity(interactions, top_k=TOP_K):
+    if interactions.empty or len(interactions.property_ids) < 2:
         return None
 
-    sim = cosine_similarity(user_item.T)
+    normalized = _normalized_items(interactions)
+    n_items = len(interactions.property_ids)
+    rows = _top_k_rows(normalized, np.arange(n_items), top_k)
 
-    return pd.DataFrame(
-        sim,
-        index=user_item.columns,
-        columns=user_item.columns,
+    return ItemNeighbours(
+        matrix=_neighbour_matrix(rows, n_items),
+        property_ids=interactions.property_ids,
     )
 
 
+def update_item_similarity(neighbours, interactions, touched, top_k=TOP_K):
+    """
+    Recompute neighbour rows affected by changes to the `touched` columns:
+    the touched items themselves and every item that co-occurs with them.
+    All other rows are carried over unchanged.
+    """
+    if neighbours is None:
+        return compute_item_similarity(interactions, top_k)
+
+    n_items = len(interactions.property_ids)
+    normalized = _normalized_items(interactions)
+
+    touched = np.asarray(touched, dtype=np.int64)
+    users = np.unique(normalized[:, touched].tocoo().row)
+    co_occurring = np.unique(normalized.tocsr()[users].tocoo().col) if len(users) else touched
+    affected = np.union1d(touched, co_occurring)
+
+    previous = neighbours.matrix.copy()
+    previous.resize((n_items, n_items))
+    rows = {
+        item: (previous.indices[previous.indptr[item]:previous.indptr[item + 1]],
+               previous.data[previous.indptr[item]:previous.indptr[item + 1]])
+        for item in range(n_items)
+    }
+    rows.update(_top_k_rows(normalized, affected, top_k))
+
+    return ItemNeighbours(
+        matrix=_neighbour_matrix(rows, n_items),
+        property_ids=interactions.property_ids,
+    )
+
+
+def build_model(previous=None, top_k=TOP_K):
+    """
+    Full build, or incremental when `previous` (interactions, neighbours)
+    is given: only interactions newer than the last build are read and only
+    the affected neighbour rows are recomputed. Only additions are folded
+    in; callers check needs_full_build(previous[0]) first.
+    """
+    if previous is None:
+        interactions = extract_interactions()
+        return interactions, compute_item_similarity(interactions, top_k)
+
+    base, neighbours = previous
+    delta = extract_interactions(since=base.built_at)
+    interactions = merge_interactions(base, delta)
+
+    if delta.empty:
+        return interactions, neighbours
+
+    touched = np.flatnonzero(np.isin(interactions.property_ids, delta.property_ids))
+    return interactions, update_item_similarity(neighbours, interactions, touched, top_k)
+
+
 # =========================
 # 3. Recommend (NO fallback)
 # =========================
-def recommend_properties(user_id, df, similarity_matrix, top_n=10):
-    user_id = str(user_id)
+def _rank(user_row, neighbours, top_n):
+    """
+    Score = user's interaction row x item neighbour matrix, i.e. for every
+    candidate the sum of similarity * score over the items the user touched.
+    """
+    if not user_row.nnz:
+        return [], "no_interactions"
 
-    if df.empty:
-        return [], "no_data"
+    if neighbours is None:
+        return [], "no_similarity_matrix"
 
-    user_item = df.pivot_table(
-        index="user_id",
-        columns="property_id",
-        values="score",
-        fill_value=0,
-    )
+    scores = (user_row @ neighbours.matrix).tocsr()
+    candidates, values = scores.indices, scores.data
 
-    if user_id not in user_item.index:
-        return [], "cold_start_user"
+    # drop items the user already interacted with
+    keep = ~np.isin(candidates, user_row.indices) & (values > 0)
+    candidates, values = candidates[keep], values[keep]
 
-    user_scores = user_item.loc[user_id]
-    interacted = user_scores[user_scores > 0].index.tolist()
+    if not len(candidates):
+        return [], "no_cf_signal"
 
-    if not interacted:
-        return [], "no_interactions"
+    if len(values) > top_n:
+        best = np.argpartition(-values, top_n)[:top_n]
+        candidates, values = candidates[best], values[best]
+
+    ranked = candidates[np.argsort(-values, kind="stable")]
+    return [int(pid) for pid in neighbours.property_ids[ranked]], "cf"
 
-    if similarity_matrix is None:
-        return [], "no_similarity_matrix"
 
-    candidate_scores = {}
+def recommend_properties(user_pkid, interactions, neighbours, top_n=10):
+    if interactions.empty:
+        return [], "no_data"
 
-    for prop in interacted:
-        if prop not in similarity_matrix.columns:
-            continue
+    row = interactions.user_row(user_pkid)
+    if row is None:
+        return [], "cold_start_user"
 
-        for other_prop, sim in similarity_matrix[prop].items():
-            if other_prop in interacted:
-                continue
-            if sim <= 0:
-                continue
+    return _rank(interactions.matrix[row], neighbours, top_n)
 
-            candidate_scores.setdefault(other_prop, 0)
-            candidate_scores[other_prop] += sim * user_scores[prop]
 
-    if not candidate_scores:
-        return [], "no_cf_signal"
+def recommend_properties_live(user_pkid, interactions, neighbours, top_n=10):
+    """
+    Same scoring, but with the user's interactions read from the database
+    instead of the model, so activity since the last build counts.
+    """
+    if neighbours is None:
+        return [], "no_similarity_matrix"
 
-    ranked = sorted(
-        candidate_scores.items(),
-        key=lambda x: x[1],
-        reverse=True,
-    )
+    rows = np.concatenate([_stream(qs, w) for qs, w in _interaction_sources(user_pkid=user_pkid)])
+
+    # properties the model hasn't seen yet have no neighbours
+    order = np.argsort(neighbours.property_ids)
+    pos = np.searchsorted(neighbours.property_ids, rows["property"], sorter=order)
+    pos = np.minimum(pos, len(order) - 1)
+    cols = order[pos]
+    known = neighbours.property_ids[cols] == rows["property"]
+
+    user_row = sp.coo_matrix(
+        (rows["score"][known], (np.zeros(known.sum(), dtype=np.int64), cols[known])),
+        shape=(1, len(neighbours.property_ids)),
+    ).tocsr()
+
+    if not user_row.nnz:
+        return [], "cold_start_user"
 
-    return [pid for pid, _ in ranked[:top_n]], "cf"
+    return _rank(user_row, neighbours, top_n)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.properties.models import Reservation, PropertyLike
+from apps.reviews.models import Review
+
+from .tasks import refresh_user_recommendations_task
+
+
+def _refresh_user(user_pkid):
+    transaction.on_commit(lambda: refresh_user_recommendations_task.delay(user_pkid))
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_on_booking(sender, instance: Reservation, created: bool, **kwargs):
+    if created:
+        _refresh_user(instance.user_id)
+
+@receiver(post_save, sender=PropertyLike)
+@receiver(post_delete, sender=PropertyLike)
+def refresh_on_like(sender, instance: PropertyLike, **kwargs):
+    _refresh_user(instance.user_id)
+
+@receiver(post_save, sender=Review)
+def refresh_on_review(sender, instance: Review, **kwargs):
+    _refresh_user(instance.user_id)
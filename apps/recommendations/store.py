@@ -0,0 +1,76 @@
+"""
+Precomputed recommendations.
+
+Per-user ranked property pkids are written in bulk by
+refresh_recommendations_task and refreshed for a single user when they book,
+like or review. Users without a CF signal get the cached popularity ranking.
+"""
+from django.core.cache import cache
+from django.db.models import F
+
+from apps.properties.models import Property, PropertyStatus
+
+from .services import BOOKING_W, LIKE_W, VIEW_W
+
+# stored per user; more than the page so inactive listings can be dropped
+STORE_SIZE = 30
+USER_TTL = 60 * 60 * 24
+# cold-start users are scored again soon, so a first like or booking that
+# the model hasn't seen yet doesn't pin them to the popular list for a day
+EMPTY_TTL = 60 * 5
+POPULAR_TTL = 60 * 15
+POPULAR_KEY = "recommendations:popular"
+
+
+def user_key(user_pkid):
+    return f"recommendations:user:{user_pkid}"
+
+
+def get_recommendations(user_pkid):
+    return cache.get(user_key(user_pkid))
+
+
+def store_recommendations(recommendations):
+    """
+    `recommendations` maps user pkid -> ranked property pkids.
+    """
+    for ttl, entries in (
+        (USER_TTL, {user_key(pkid): ids for pkid, ids in recommendations.items() if ids}),
+        (EMPTY_TTL, {user_key(pkid): ids for pkid, ids in recommendations.items() if not ids}),
+    ):
+        if entries:
+            cache.set_many(entries, ttl)
+
+
+def compute_popular(limit=STORE_SIZE):
+    ids = list(
+        Property.objects.filter(status=PropertyStatus.ACTIVE)
+        .annotate(
+            popularity=F("reservations_count") * BOOKING_W
+            + F("likes_count") * LIKE_W
+            + F("views_count") * VIEW_W
+        )
+        .order_by("-popularity", "-pkid")
+        .values_list("pkid", flat=True)[:limit]
+    )
+    cache.set(POPULAR_KEY, ids, POPULAR_TTL)
+    return ids
+
+
+def get_popular():
+    ids = cache.get(POPULAR_KEY)
+    if ids is None:
+        ids = compute_popular()
+    return ids
+
+
+def active_properties(ids, user, limit):
+    """
+    ACTIVE properties for `ids`, in the same order.
+    """
+    properties = (
+        Property.objects.filter(status=PropertyStatus.ACTIVE)
+        .with_liked(user)
+        .in_bulk(ids)
+    )
+    return [properties[pkid] for pkid in ids if pkid in properties][:limit]
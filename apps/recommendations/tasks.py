@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .artifacts import current_version, get_model, load_model, save_model
+from .services import build_model, needs_full_build, recommend_properties, recommend_properties_live
+from . import store
+
+User = get_user_model()
+
+# users seen within this window get precomputed recommendations
+ACTIVE_USER_WINDOW = timedelta(days=30)
+REFRESH_CHUNK = 1000
+
+
+@shared_task
+def build_recommendation_model_task(full=False):
+    """
+    Publish a new model version. Incremental by default: folds interactions
+    newer than the current version into it. Rebuilds in full when rows the
+    current version counted were deleted or edited since (unlikes, deleted
+    reviews, changed ratings), which a fold can't subtract.
+    """
+    previous = None
+    version = current_version()
+    if version and not full:
+        previous = load_model(version)
+        if needs_full_build(previous[0]):
+            previous = None
+
+    interactions, neighbours = build_model(previous=previous)
+    new_version = save_model(interactions, neighbours)
+
+    refresh_recommendations_task.delay()
+
+    mode = "incremental" if previous else "full"
+    return f"Built recommendation model {new_version} ({mode})"
+
+
+@shared_task
+def refresh_recommendations_task():
+    """
+    Recompute stored recommendations for every active user from the current
+    model, plus the popularity ranking used for cold-start users.
+    """
+    store.compute_popular()
+
+    model = get_model()
+    if model is None:
+        return "No recommendation model yet"
+
+    users = (
+        User.objects.filter(is_active=True, last_login__gte=timezone.now() - ACTIVE_USER_WINDOW)
+        .values_list("pkid", flat=True)
+        .iterator(chunk_size=REFRESH_CHUNK)
+    )
+
+    refreshed = 0
+    batch = {}
+    for user_pkid in users:
+        batch[user_pkid], _ = recommend_properties(user_pkid, *model, top_n=store.STORE_SIZE)
+        if len(batch) >= REFRESH_CHUNK:
+            store.store_recommendations(batch)
+            refreshed += len(batch)
+            batch = {}
+
+    store.store_recommendations(batch)
+    refreshed += len(batch)
+
+    return f"Refreshed recommendations for {refreshed} users"
+
+
+@shared_task
+def refresh_user_recommendations_task(user_pkid):
+    """
+    Re-rank one user after they book, like or review, using their current
+    interactions rather than the last model build.
+    """
+    model = get_model()
+    if model is None:
+        return
+
+    ids, _ = recommend_properties_live(user_pkid, *model, top_n=store.STORE_SIZE)
+    store.store_recommendations({user_pkid: ids})
@@ -1,3 +1,86 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from apps.properties.models import PropertyLike
+from apps.properties.tests import NO_SILK, login, make_property, make_user
+from apps.reviews.models import Review
+
+from . import services, store
+
+
+@NO_SILK
+class RecommendationQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.user = make_user("user@example.com")
+        cls.properties = [make_property(cls.host, title=f"Property {i}") for i in range(10)]
+        for property in cls.properties[::2]:
+            PropertyLike.objects.create(property=property, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        login(self.client, self.user)
+
+    def test_constant_queries_per_recommendation(self):
+        for size in (3, 10):
+            store.store_recommendations({self.user.pkid: [p.pkid for p in self.properties[:size]]})
+            # auth user, properties (liked annotated)
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/v1/recommendations/")
+            self.assertEqual(len(response.data), size)
+            self.assertEqual([item["liked"] for item in response.data[:2]], [True, False])
+
+
+def scores(interactions):
+    matrix = interactions.matrix.tocoo()
+    return {
+        (int(interactions.user_ids[r]), int(interactions.property_ids[c])): round(float(v), 6)
+        for r, c, v in zip(matrix.row, matrix.col, matrix.data)
+    }
+
+
+class IncrementalBuildTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user("host@example.com")
+        cls.users = [make_user(f"user{i}@example.com") for i in range(3)]
+        cls.properties = [make_property(cls.host, title=f"Property {i}") for i in range(4)]
+        for user in cls.users:
+            for property in cls.properties[:3]:
+                PropertyLike.objects.create(property=property, user=user)
+
+    def test_additions_fold_in(self):
+        base = services.build_model()
+        PropertyLike.objects.create(property=self.properties[3], user=self.users[0])
+
+        self.assertFalse(services.needs_full_build(base[0]))
+        interactions, _ = services.build_model(previous=base)
+        self.assertEqual(scores(interactions), scores(services.build_model()[0]))
+
+    def test_unlike_needs_full_build(self):
+        base = services.build_model()
+        PropertyLike.objects.filter(user=self.users[0], property=self.properties[0]).delete()
+
+        self.assertTrue(services.needs_full_build(base[0]))
+
+    def test_rating_edit_needs_full_build(self):
+        review = Review.objects.create(user=self.users[1], property=self.properties[1], rating=5)
+        base = services.build_model()
+        review.rating = 1
+        review.save()
+
+        self.assertTrue(services.needs_full_build(base[0]))
+
+
+class StoreTests(TestCase):
+    def test_empty_recommendations_expire_sooner(self):
+        with mock.patch.object(store.cache, "set_many") as set_many:
+            store.store_recommendations({1: [10, 11], 2: []})
+
+        set_many.assert_has_calls([
+            mock.call({store.user_key(1): [10, 11]}, store.USER_TTL),
+            mock.call({store.user_key(2): []}, store.EMPTY_TTL),
+        ])
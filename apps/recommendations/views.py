@@ -1,34 +1,41 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .services import extract_interactions, compute_item_similarity, recommend_properties
-from apps.properties.models import Property
-from apps.properties.serializers import PropertyListSerializer
+from django.core.cache import cache
 
-# Optional: cache similarity matrix in memory
-SIMILARITY_MATRIX = None
-INTERACTIONS_DF = None
+from .artifacts import get_model
+from .services import recommend_properties
+from .tasks import build_recommendation_model_task
+from . import store
+from apps.properties.serializers import PropertyListSerializer
 
 class RecommendationView(APIView):
     def get(self, request, format=None):
-        global SIMILARITY_MATRIX, INTERACTIONS_DF
-
         user = request.user
         if not user.is_authenticated:
             return Response({"detail": "Authentication required"}, status=401)
 
-        # Load/calc df and similarity
-        if INTERACTIONS_DF is None:
-            INTERACTIONS_DF = extract_interactions()
-        if SIMILARITY_MATRIX is None:
-            SIMILARITY_MATRIX = compute_item_similarity(INTERACTIONS_DF)
+        recommended_ids = store.get_recommendations(user.pkid)
+
+        if recommended_ids is None:
+            # not precomputed yet (new or inactive user), score now and keep it
+            model = get_model()
+            if model is None:
+                # first deploy: build once in the background instead of per worker
+                if cache.add("recommendations:initial_build", True, 60 * 10):
+                    build_recommendation_model_task.delay(full=True)
+                recommended_ids = []
+            else:
+                recommended_ids, _ = recommend_properties(user.pkid, *model, top_n=store.STORE_SIZE)
+                store.store_recommendations({user.pkid: recommended_ids})
 
-        recommended_ids = recommend_properties(user.id, INTERACTIONS_DF, SIMILARITY_MATRIX, top_n=10)
+        # cold start: most popular listings
+        if not recommended_ids:
+            recommended_ids = store.get_popular()
 
-        # Fetch property details
-        properties = Property.objects.filter(id__in=recommended_ids)
+        properties = store.active_properties(recommended_ids, user, limit=10)
         serializer = PropertyListSerializer(
                     properties,
                     many=True,
                     context={"request": request}
                     )
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
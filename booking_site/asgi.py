@@ -1,6 +1,5 @@
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -11,12 +10,13 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_site.settings.developme
 django_asgi_app = get_asgi_application()
 
 # Import your routing
+from apps.chat.middleware import CookieJWTAuthMiddlewareStack
 from apps.chat.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        CookieJWTAuthMiddlewareStack(
             URLRouter(
                 websocket_urlpatterns
             )
@@ -16,8 +16,27 @@ app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 app.conf.beat_scheduler = "django_celery_beat.schedulers:DatabaseScheduler"
 
 app.conf.beat_schedule = {
+    # reconciliation sweep; transitions themselves are ETA jobs (transition_reservation_task)
     "complete-reservations-daily": {
         "task": "apps.properties.tasks.update_reservations_status_task",
+        "schedule": crontab(minute="*/10"),
+    },
+    "flush-property-views": {
+        "task": "apps.properties.tasks.flush_property_views_task",
         "schedule": crontab(minute="*"),
     },
+    "update-recommendation-model": {
+        "task": "apps.recommendations.tasks.build_recommendation_model_task",
+        "schedule": crontab(minute="*/15"),
+    },
+    "rebuild-recommendation-model": {
+        "task": "apps.recommendations.tasks.build_recommendation_model_task",
+        "schedule": crontab(hour=3, minute=30),
+        "kwargs": {"full": True},
+    },
+    # host dashboard rollups; reservation/like changes refresh their own days
+    "refresh-recent-daily-stats": {
+        "task": "apps.analytics.tasks.refresh_recent_daily_stats_task",
+        "schedule": crontab(minute="*/5"),
+    },
 }
@@ -118,6 +118,14 @@ STATICFILES_DIRS =[]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Versioned recommendation model artifacts, shared by web and celery workers
+RECOMMENDATION_MODEL_DIR = env("RECOMMENDATION_MODEL_DIR", default=str(BASE_DIR / "recommendation_models"))
+
+# Serve the host dashboard from the daily rollups. Turn on only after
+# `manage.py rebuild_daily_stats` has backfilled them; until then the
+# dashboard is computed from the raw tables.
+HOST_DASHBOARD_USE_ROLLUPS = env.bool("HOST_DASHBOARD_USE_ROLLUPS", default=False)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User' # no need to have apps here since we already define apps.user in installed apps
@@ -25,6 +25,14 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Shared cache (property response cache, see apps/properties/response_cache.py)
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="redis://redis:6379/3"),
+}
+
+# Write-behind buffer for property views (see apps/properties/view_buffer.py)
+PROPERTY_VIEWS_REDIS_URL = env("PROPERTY_VIEWS_REDIS_URL", default="redis://redis:6379/2")
+
 CORS_ALLOW_CREDENTIALS = True
 
 CSRF_TRUSTED_ORIGINS = env("CSRF_TRUSTED_ORIGINS").split(" ")
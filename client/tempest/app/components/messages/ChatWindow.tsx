@@ -3,9 +3,11 @@
 import { useEffect, useRef, useState } from "react";
 import { useAppSelector, useAppDispatch } from "@/app/lib/hooks";
 import {
+  addMessage,
   getConversationList,
   getConversationMessages,
 } from "@/app/lib/features/messages/messageSlice";
+import messageService from "@/app/lib/features/messages/messageService";
 import { ArrowLeftOutlined } from "@ant-design/icons";
 import { Avatar, Drawer } from "antd";
 import ChatReservationDetailsDrawer from "./ChatReservationDetailsDrawer";
@@ -47,9 +49,15 @@ export default function ChatWindow({ conversation, onBack }: Props) {
       `${process.env.NEXT_PUBLIC_API_HOST_WEB_SOCKET}/ws/chat/${conversationId}/`,
     );
 
-    ws.onmessage = () => {
-      dispatch(getConversationMessages(conversationId));
-      dispatch(getConversationList());
+    // the broadcast is the message as the API returns it; append it rather
+    // than refetching the thread, which may not have it stored yet. The
+    // thread is open, so mark it read before refreshing the unread counts.
+    ws.onmessage = (event) => {
+      dispatch(addMessage(JSON.parse(event.data)));
+      messageService
+        .markConversationRead(conversationId)
+        .catch(() => undefined)
+        .finally(() => dispatch(getConversationList()));
     };
 
     socketRef.current = ws;
@@ -15,8 +15,14 @@ const getConversationMessages = async (conversationId: string) => {
   return response.data;
 };
 
+// resets the unread count of a thread the user has open
+const markConversationRead = async (conversationId: string) => {
+  await api.post(`${GET_CONVERSATION_LIST_URL}/${conversationId}/read/`);
+};
+
 const messageService = {
   getConversationList,
   getConversationMessages,
+  markConversationRead,
 };
 export default messageService;
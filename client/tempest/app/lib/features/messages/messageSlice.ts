@@ -95,9 +95,14 @@ export const messageSlice = createSlice({
     // resetCreateMessage: (state) => {
     //   state.createMessage = initialAsyncState(null);
     // },
-    // addMessage: (state, action: PayloadAction<Message>) => {
-    //   state.messageList.data.push(action.payload);
-    // },
+    // a message broadcast over the chat socket; the same message can also
+    // arrive with a fetch of the thread
+    addMessage: (state, action: PayloadAction<Message>) => {
+      const message = action.payload;
+      if (!state.messageList.data.some((m) => m.id === message.id)) {
+        state.messageList.data.push(message);
+      }
+    },
   },
   extraReducers: (builder) => {
     // Conversation List
@@ -124,14 +129,17 @@ export const messageSlice = createSlice({
       .addCase(getConversationMessages.pending, (state) => {
         state.messageList.loading = true;
       })
-      .addCase(
-        getConversationMessages.fulfilled,
-        (state, action: PayloadAction<Message[]>) => {
-          state.messageList.loading = false;
-          state.messageList.success = true;
-          state.messageList.data = action.payload;
-        }
-      )
+      .addCase(getConversationMessages.fulfilled, (state, action) => {
+        state.messageList.loading = false;
+        state.messageList.success = true;
+        // keep messages broadcast while the fetch was in flight; the server
+        // writes them shortly after broadcasting, so the fetch can miss them
+        const fetched = new Set(action.payload.map((m) => m.id));
+        const pending = state.messageList.data.filter(
+          (m) => m.conversation_id === action.meta.arg && !fetched.has(m.id)
+        );
+        state.messageList.data = [...action.payload, ...pending];
+      })
       .addCase(getConversationMessages.rejected, (state, action) => {
         state.messageList.loading = false;
         state.messageList.error = true;
@@ -163,7 +171,7 @@ export const {
   resetConversationList,
   resetMessageList,
   // resetCreateMessage,
-  // addMessage,
+  addMessage,
 } = messageSlice.actions;
 
 export default messageSlice.reducer;